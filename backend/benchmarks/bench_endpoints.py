@@ -0,0 +1,232 @@
+"""Endpoint latency/throughput benchmark.
+
+Seeds a throwaway database with synthetic data (see ``synthetic.py``), then drives
+the FastAPI app in-process through ``httpx.ASGITransport`` at a fixed concurrency and
+reports p50/p95/p99 latency and throughput per endpoint. Results are written as JSON
+so runs can be compared over time (``--compare`` prints the p95 change against an
+earlier result file).
+
+``--mongo url`` (default) uses the server at MONGO_URL and drops the benchmark
+database afterwards unless ``--keep`` is given. ``--mongo mongomock`` runs against the
+in-process mongomock_motor stand-in: useful to profile the Python side offline, but
+its query costs say nothing about a real server. Endpoints it can't serve (see
+MONGOMOCK_UNSUPPORTED) are skipped and listed under "skipped" in the results.
+
+Usage:
+    python backend/benchmarks/bench_endpoints.py [--mongo url|mongomock] [--concurrency 10]
+        [--requests 200] [--endpoints sales,dashboard] [--output results.json] [--compare old.json]
+        [--users 2] [--sales 5000] ...
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import asdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+import synthetic
+from synthetic import server
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# name -> (path, query params); dates are relative so seeded data is always in range
+_today = date.today()
+ENDPOINTS: Dict[str, Tuple[str, dict]] = {
+    "categories": ("/api/categories", {}),
+    "sales": ("/api/sales", {}),
+    "sales_month": ("/api/sales", {"date_from": (_today - timedelta(days=30)).isoformat()}),
+    "sales_search": ("/api/sales", {"description": "coffee"}),
+    "sales_search_indexed": ("/api/sales", {"description": "coffee", "search_mode": "indexed"}),
+    "expenses": ("/api/expenses", {}),
+    "dashboard_summary": ("/api/dashboard/summary", {}),
+    "dashboard_comparison": ("/api/dashboard/comparison", {"months": 6}),
+    "analytics_report": ("/api/analytics/report", {"filter_type": "year"}),
+    "checks": ("/api/checks", {}),
+    "checks_in_transit": ("/api/checks/in-transit-report", {}),
+    "bank_transactions": ("/api/bank-transactions", {}),
+    "reconciliation_report": ("/api/bank-reconciliation/report", {"statement_balance": 10000}),
+    "purchase_orders": ("/api/purchase-orders", {}),
+    "activity": ("/api/activity", {}),
+}
+# Endpoints whose queries mongomock can't run, with the missing feature
+MONGOMOCK_UNSUPPORTED = {"activity": "$unionWith"}
+
+
+def percentile(sorted_ms: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_ms:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_ms)))
+    return sorted_ms[min(rank, len(sorted_ms)) - 1]
+
+
+async def run_endpoint(client: httpx.AsyncClient, users, path: str, params: dict,
+                       requests: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await client.get(path, params=params, headers=users[i % len(users)])
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.get(path, params=params, headers=users[i % len(users)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "path": path,
+        "params": params,
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def use_database(backend: str, name: str):
+    if backend == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--mongo mongomock needs mongomock-motor: pip install -r backend/requirements-dev.txt")
+        server.db = AsyncMongoMockClient()[name]
+    else:
+        server.db = server.client[name]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict, previous: dict = None):
+    previous_endpoints = (previous or {}).get("endpoints", {})
+    header = f"{'endpoint':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}"
+    print(header + ("  p95 vs previous" if previous else ""))
+    for name, stats in results["endpoints"].items():
+        line = (f"{name:<24}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats['throughput_rps']:>10.1f}{stats['errors']:>8}")
+        before = previous_endpoints.get(name)
+        if before and before["p95_ms"]:
+            line += f"  {(stats['p95_ms'] / before['p95_ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+
+async def run(args) -> dict:
+    volumes = synthetic.volumes_from_args(args)
+    db_name = f"bench_{uuid.uuid4().hex[:12]}"
+    use_database(args.mongo, db_name)
+
+    seed_started = time.perf_counter()
+    users = await synthetic.seed(volumes, args.seed)
+    seed_seconds = time.perf_counter() - seed_started
+    # ASGITransport skips the startup hooks: build the indexes and run the migrations
+    # (the ledger backfill included) here, so endpoints take the paths production takes
+    server.RUN_MIGRATIONS_ON_STARTUP = False  # Run them below, not as a background task
+    await server.ensure_indexes()
+    if not await server.run_migrations(max_docs_per_second=0):
+        raise RuntimeError("Migrations did not complete; see the log")
+    auth_headers = [{"Authorization": f"Bearer {user.token}"} for user in users]
+
+    selected = ENDPOINTS
+    if args.endpoints:
+        wanted = [name.strip() for name in args.endpoints.split(",")]
+        selected = {name: spec for name, spec in ENDPOINTS.items() if any(w in name for w in wanted)}
+    skipped = {}
+    if args.mongo == "mongomock":
+        skipped = {name: f"mongomock lacks {MONGOMOCK_UNSUPPORTED[name]}" for name in selected if name in MONGOMOCK_UNSUPPORTED}
+        selected = {name: spec for name, spec in selected.items() if name not in skipped}
+        for name, reason in skipped.items():
+            print(f"  {name}: skipped ({reason})", file=sys.stderr)
+
+    transport = httpx.ASGITransport(app=server.app)
+    endpoints = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name, (path, params) in selected.items():
+                endpoints[name] = await run_endpoint(
+                    client, auth_headers, path, params, args.requests, args.concurrency, args.warmup,
+                )
+                print(f"  {name}: p95 {endpoints[name]['p95_ms']:.2f} ms", file=sys.stderr)
+    finally:
+        if args.mongo == "url" and not args.keep:
+            await server.client.drop_database(db_name)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "mongo": args.mongo,
+            "database": db_name,
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "warmup": args.warmup,
+            "volumes": asdict(volumes),
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+            "ledger_ready": await server.ledger_ready(),
+            "skipped": skipped,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", choices=["url", "mongomock"], default="url")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database (url mode)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint")
+    parser.add_argument("--endpoints", default="", help=f"Comma-separated name filters: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--output", type=Path, default=None, help="Defaults to results/endpoints-<timestamp>.json")
+    parser.add_argument("--compare", type=Path, default=None, help="Earlier result file to compare p95 against")
+    synthetic.add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    # One access log line per request would dominate the run
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+
+    output = args.output or RESULTS_DIR / f"endpoints-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    print_results(results, previous)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Import-time benchmark for server.py.
+
+Runs ``python -X importtime -c "import server"`` in a fresh interpreter and reports
+the cumulative import time of the app plus its slowest dependencies. Exits non-zero
+when the import exceeds ``--max-ms`` or when a lazily loaded module (pandas,
+pdfplumber) is imported at startup, so regressions can fail CI.
+
+Usage:
+    python backend/benchmarks/bench_import_time.py [--runs 5] [--max-ms 1000] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LAZY_MODULES = ("pandas", "pdfplumber", "pdfminer")
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure_once() -> dict:
+    """Return {module: (cumulative_us, depth)} for one fresh interpreter"""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Importing server failed:\n{proc.stderr}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules[name] = (int(cumulative), (len(indent) - 1) // 2)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when the median import exceeds this")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    server_ms = statistics.median(run["server"][0] for run in runs) / 1000
+
+    # Direct dependencies of server, ranked by cumulative time in the last run
+    last = runs[-1]
+    top_level = sorted(
+        ((name, cumulative) for name, (cumulative, depth) in last.items() if depth == 1),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+    print(f"import server (median of {args.runs}): {server_ms:8.1f} ms")
+    print("\nSlowest direct imports (last run):")
+    for name, cumulative in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = sorted(name for name in last if name.split(".")[0] in LAZY_MODULES)
+    if eager:
+        failures.append(f"lazily loaded modules imported at startup: {', '.join(eager[:5])}")
+    if args.max_ms is not None and server_ms > args.max_ms:
+        failures.append(f"import took {server_ms:.1f} ms, budget is {args.max_ms:.1f} ms")
+
+    if failures:
+        print("\nFAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Serialization benchmark for list endpoints.
+
+Compares the default FastAPI path (validate every row against ``response_model``,
+then ``jsonable_encoder`` + ``json.dumps``) with the trusted-projection path
+(``ORJSONResponse`` over the projected Mongo documents).
+
+Usage:
+    python backend/benchmarks/bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import server  # noqa: E402
+
+
+def make_sales(rows: int) -> List[dict]:
+    user_id = str(uuid.uuid4())
+    categories = [str(uuid.uuid4()) for _ in range(8)]
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "location_id": "main",
+            "date": f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+            "amount": round(random.uniform(1, 5000), 2),
+            "category_id": random.choice(categories),
+            "payment_method": random.choice(["Efectivo", "Tarjeta", "Transferencia"]),
+            "description": f"Venta #{i}",
+            "source": "manual",
+            "created_at": "2024-01-01T00:00:00+00:00",
+        }
+        for i in range(rows)
+    ]
+
+
+async def validated_path(field, rows: List[dict]) -> bytes:
+    content = await serialize_response(field=field, response_content=rows)
+    return JSONResponse(content).body
+
+
+def trusted_path(rows: List[dict]) -> bytes:
+    return server.SALE_PROJECTION.response(rows).body
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_sales(args.rows)
+    field = create_response_field(name="Response_get_sales", type_=List[server.Sale])
+    loop = asyncio.new_event_loop()
+
+    before = best_of(args.repeat, lambda: loop.run_until_complete(validated_path(field, rows)))
+    after = best_of(args.repeat, lambda: trusted_path(rows))
+
+    print(f"rows:                 {args.rows}")
+    print(f"response_model path:  {before * 1000:8.2f} ms")
+    print(f"trusted orjson path:  {after * 1000:8.2f} ms")
+    print(f"speedup:              {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Bank statement parser benchmark.
+
+Runs ``server.parse_statement_line`` (the logic behind /bank-statements/upload and
+/bank-statements/test-parse) over the text corpus in ``statement_corpus/`` and reports
+lines/sec, how many lines each pattern matched, and accuracy against the expected
+transactions: debit/credit mis-classifications, wrong amounts or dates, missed lines
+and false positives.
+
+Corpus files are anonymized text as pdfplumber extracts it, one file per layout.
+Lines that are real transactions end with an expectation marker giving the true
+direction (debit = money out, credit = money in), amount and, where the layout makes
+dates ambiguous, the ISO date:
+
+    9/8 Zelle to Garcia Ana on 09/08 Ref # Wfct0Z8Q8Z29 550.00 ## debit 550.00
+    02/09/2024 DEPOSITO EN EFECTIVO SUCURSAL 12 1,500.00 ## credit 1500.00 2024-09-02
+
+The marker is stripped before parsing; unmarked lines should yield no transaction.
+Record what the statement says, not what the parser currently does.
+
+Usage:
+    python backend/benchmarks/bench_statement_parser.py [--repeat 20] [--files wells] [--output out.json] [--verbose]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+CORPUS_DIR = Path(__file__).resolve().parent / "statement_corpus"
+MARKER = " ## "
+YEAR = 2024  # Wells Fargo lines carry no year
+
+
+def load_corpus(path: Path):
+    """[(line, expectation or None)] where expectation is {"type", "amount", "date"?}"""
+    entries = []
+    for raw in path.read_text().splitlines():
+        line, _, expected = raw.partition(MARKER)
+        expectation = None
+        if expected:
+            parts = expected.split()
+            expectation = {"type": parts[0], "amount": float(parts[1])}
+            if len(parts) > 2:
+                expectation["date"] = parts[2]
+        entries.append((line, expectation))
+    return entries
+
+
+def time_lines(lines, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            server.parse_statement_line(line, YEAR)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def evaluate(entries, verbose: bool) -> dict:
+    patterns, rejected, errors = Counter(), Counter(), Counter()
+    problems = []
+    correct = 0
+    for line, expected in entries:
+        parsed = server.parse_statement_line(line, YEAR)
+        if parsed is None:
+            patterns["(ignored)"] += 1
+        else:
+            patterns[parsed["pattern"] or "(no match)"] += 1
+            if parsed["rejected"]:
+                rejected[parsed["rejected"]] += 1
+        transaction = parsed and parsed["transaction"]
+
+        issues = []
+        if expected and not transaction:
+            issues.append("missed")
+        elif transaction and not expected:
+            issues.append("false_positive")
+        elif transaction and expected:
+            if transaction["type"] != expected["type"]:
+                issues.append(f"{expected['type']}_as_{transaction['type']}")
+            if abs(transaction["amount"] - expected["amount"]) >= 0.005:
+                issues.append("wrong_amount")
+            if "date" in expected and transaction["date"] != expected["date"]:
+                issues.append("wrong_date")
+        errors.update(issues)
+        if issues:
+            problems.append({"line": line, "issues": issues, "parsed": transaction, "expected": expected})
+        elif expected:
+            correct += 1
+
+    result = {
+        "expected_transactions": sum(1 for _, expected in entries if expected),
+        "correct_transactions": correct,
+        "patterns": dict(patterns.most_common()),
+        "rejected": dict(rejected.most_common()),
+        "errors": dict(errors.most_common()),
+    }
+    if verbose:
+        result["problems"] = problems
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Timing runs per file (best is kept)")
+    parser.add_argument("--files", default="", help="Comma-separated corpus name filters")
+    parser.add_argument("--output", type=Path, default=None, help="Write the full report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="List every mis-parsed line")
+    args = parser.parse_args()
+
+    paths = sorted(CORPUS_DIR.glob("*.txt"))
+    if args.files:
+        wanted = [name.strip() for name in args.files.split(",")]
+        paths = [path for path in paths if any(w in path.stem for w in wanted)]
+
+    report = {"files": {}}
+    total_lines = total_seconds = 0
+    total_patterns, total_rejected, total_errors = Counter(), Counter(), Counter()
+    total_expected = total_correct = 0
+    for path in paths:
+        entries = load_corpus(path)
+        seconds = time_lines([line for line, _ in entries], args.repeat)
+        result = evaluate(entries, args.verbose)
+        result.update(lines=len(entries), lines_per_sec=round(len(entries) / seconds))
+        report["files"][path.stem] = result
+
+        total_lines += len(entries)
+        total_seconds += seconds
+        total_patterns.update(result["patterns"])
+        total_rejected.update(result["rejected"])
+        total_errors.update(result["errors"])
+        total_expected += result["expected_transactions"]
+        total_correct += result["correct_transactions"]
+
+        print(f"{path.stem:<24} {len(entries):>5} lines {result['lines_per_sec']:>10,} lines/s  "
+              f"{result['correct_transactions']:>3}/{result['expected_transactions']:<3} correct  "
+              f"{', '.join(f'{k}={v}' for k, v in result['errors'].items()) or 'no errors'}")
+        for problem in result.get("problems", []):
+            print(f"    {'/'.join(problem['issues']):<28} {problem['line']}")
+
+    report["total"] = {
+        "lines": total_lines,
+        "lines_per_sec": round(total_lines / total_seconds) if total_seconds else 0,
+        "expected_transactions": total_expected,
+        "correct_transactions": total_correct,
+        "patterns": dict(total_patterns.most_common()),
+        "rejected": dict(total_rejected.most_common()),
+        "errors": dict(total_errors.most_common()),
+    }
+
+    print(f"\nTotal: {total_lines} lines, {report['total']['lines_per_sec']:,} lines/s, "
+          f"{total_correct}/{total_expected} transactions correct")
+    print("\nLines per pattern:")
+    for name, count in total_patterns.most_common():
+        print(f"  {count:>5}  {count / total_lines:6.1%}  {name}")
+    if total_rejected:
+        print("\nMatched but rejected: " + ", ".join(f"{k}={v}" for k, v in total_rejected.most_common()))
+    print("\nErrors:")
+    for name, count in total_errors.most_common() or [("none", 0)]:
+        print(f"  {count:>5}  {name}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Synthetic data generator for benchmarks.
+
+Seeds users (with their predefined categories), sales, expenses, checks, bank
+statements with their transactions, and purchase orders. Documents are built with
+the server's own models so they have the same shape as data written through the API.
+Generation is deterministic for a given ``--seed``.
+
+Usage (seeds the database named by MONGO_URL / DB_NAME):
+    python backend/benchmarks/synthetic.py [--users 2] [--sales 5000] [--expenses 3000] ...
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+PAYMENT_METHODS = ["Efectivo", "Tarjeta", "Transferencia", "Zelle"]
+WORDS = [
+    "coffee", "catering", "supplies", "produce", "rent", "payroll", "insurance", "delivery",
+    "uber", "zelle", "lunch", "dinner", "event", "invoice", "vendor", "repair", "cleaning",
+]
+PAYEES = ["Sysco", "Restaurant Depot", "City Utilities", "Landlord LLC", "Camargo Elena", "US Foods"]
+INSERT_BATCH = 5000
+
+
+@dataclass
+class Volumes:
+    """Documents generated per user"""
+    users: int = 2
+    sales: int = 5000
+    expenses: int = 3000
+    checks: int = 300
+    statements: int = 12
+    transactions_per_statement: int = 80
+    purchase_orders: int = 100
+    days: int = 730  # Dates are spread over this many days up to today
+
+
+@dataclass
+class SeededUser:
+    id: str
+    email: str
+    token: str
+
+
+def _random_date(rng: random.Random, days: int) -> str:
+    return (date.today() - timedelta(days=rng.randrange(days))).isoformat()
+
+
+def _description(rng: random.Random, index: int) -> str:
+    return f"{' '.join(rng.sample(WORDS, rng.randint(1, 3)))} #{index}"
+
+
+async def _insert(collection, documents: List[dict]):
+    for start in range(0, len(documents), INSERT_BATCH):
+        await collection.insert_many(documents[start:start + INSERT_BATCH], ordered=False)
+
+
+async def seed_user(volumes: Volumes, rng: random.Random, index: int) -> SeededUser:
+    db = server.db
+    user = server.User(
+        username=f"bench{index}",
+        email=f"bench{index}_{rng.getrandbits(32):08x}@example.com",
+        role=server.UserRole.ADMIN.value,
+        is_active=True,
+    )
+    await db.users.insert_one(user.model_dump())
+    await server.initialize_predefined_categories(user.id)
+
+    categories = await db.categories.find({"user_id": user.id}, {"_id": 0}).to_list(1000)
+    income = [c["id"] for c in categories if c["type"] == "income"]
+    expense = [c["id"] for c in categories if c["type"] == "expense"]
+
+    sales = [
+        server.with_search_tokens(server.Sale(
+            user_id=user.id, location_id="main", date=_random_date(rng, volumes.days),
+            amount=round(rng.uniform(5, 2500), 2), category_id=rng.choice(income),
+            payment_method=rng.choice(PAYMENT_METHODS), description=_description(rng, i),
+        ).model_dump())
+        for i in range(volumes.sales)
+    ]
+    expenses = [
+        server.with_search_tokens(server.Expense(
+            user_id=user.id, location_id="main", date=_random_date(rng, volumes.days),
+            amount=round(rng.uniform(5, 1500), 2), category_id=rng.choice(expense),
+            description=_description(rng, i),
+        ).model_dump())
+        for i in range(volumes.expenses)
+    ]
+    checks = [
+        server.Check(
+            user_id=user.id, check_number=str(1000 + i), date_issued=_random_date(rng, volumes.days),
+            amount=round(rng.uniform(50, 5000), 2), payee=rng.choice(PAYEES),
+            status=rng.choice([server.CheckStatus.PENDING.value, server.CheckStatus.CLEARED.value]),
+        ).model_dump()
+        for i in range(volumes.checks)
+    ]
+
+    statements, transactions = [], []
+    for s in range(volumes.statements):
+        period_end = date.today() - timedelta(days=30 * s)
+        period_start = period_end - timedelta(days=29)
+        statement = server.BankStatement(
+            user_id=user.id, filename=f"statement_{s}.pdf",
+            period_start=period_start.isoformat(), period_end=period_end.isoformat(),
+            starting_balance=0, ending_balance=0, transactions_count=volumes.transactions_per_statement,
+        )
+        statements.append(statement.model_dump())
+        for t in range(volumes.transactions_per_statement):
+            is_check = checks and rng.random() < 0.2
+            check = rng.choice(checks) if is_check else None
+            transactions.append(server.BankTransaction(
+                user_id=user.id, statement_id=statement.id,
+                date=(period_start + timedelta(days=rng.randrange(30))).isoformat(),
+                description=f"CHECK #{check['check_number']}" if check else _description(rng, t),
+                amount=check["amount"] if check else round(rng.uniform(5, 3000), 2),
+                type="debit" if check or rng.random() < 0.6 else "credit",
+                check_number=check["check_number"] if check else None,
+            ).model_dump())
+
+    purchase_orders = []
+    for i in range(volumes.purchase_orders):
+        items = [
+            server.PurchaseOrderItem(description=rng.choice(WORDS), quantity=q, unit_price=p, total=round(q * p, 2))
+            for q, p in ((rng.randint(1, 20), round(rng.uniform(1, 200), 2)) for _ in range(rng.randint(1, 5)))
+        ]
+        subtotal = round(sum(item.total for item in items), 2)
+        purchase_orders.append(server.PurchaseOrder(
+            user_id=user.id, po_number=f"PO-{i:05d}", supplier=rng.choice(PAYEES),
+            date_created=_random_date(rng, volumes.days), items=items, subtotal=subtotal, total=subtotal,
+        ).model_dump())
+
+    for collection, documents in (
+        (db.sales, sales), (db.expenses, expenses), (db.checks, checks),
+        (db.bank_statements, statements), (db.bank_transactions, transactions),
+        (db.purchase_orders, purchase_orders),
+    ):
+        if documents:
+            await _insert(collection, documents)
+
+    return SeededUser(id=user.id, email=user.email, token=server.create_access_token({"sub": user.id}))
+
+
+async def seed(volumes: Volumes, seed: int = 42) -> List[SeededUser]:
+    """Seed `volumes.users` users into server.db and return them with access tokens"""
+    rng = random.Random(seed)
+    return [await seed_user(volumes, rng, i) for i in range(volumes.users)]
+
+
+def add_volume_arguments(parser: argparse.ArgumentParser):
+    for name, default in asdict(Volumes()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def volumes_from_args(args: argparse.Namespace) -> Volumes:
+    return Volumes(**{name: getattr(args, name) for name in asdict(Volumes())})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    users = asyncio.run(seed(volumes_from_args(args), args.seed))
+    for user in users:
+        print(f"{user.email}  id={user.id}\n  token={user.token}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Run or inspect the data migrations (see the Migrations section of server.py).
+
+The API also runs pending migrations in the background at startup unless
+RUN_MIGRATIONS_ON_STARTUP=false. Use this to run them ahead of a deploy, with a
+different batch size or rate, or to check progress. Only one runner works at a time;
+a second one exits while the lease is held. An interrupted run resumes from its last
+checkpoint.
+
+Usage:
+    python backend/migrate.py status
+    python backend/migrate.py run [--only 3,4] [--batch-size 1000] [--rate 5000]
+    python backend/migrate.py reset 12      # forget a step's progress so it runs again
+"""
+import argparse
+import asyncio
+import sys
+
+import server
+
+
+def print_status(steps):
+    print(f"{'version':>7}  {'status':<8}{'processed':>12}  {'updated':<26}name")
+    for step in steps:
+        print(f"{step['version']:>7}  {step['status']:<8}{step['processed']:>12}  "
+              f"{step['updated_at'] or '-':<26}{step['name']}")
+        if step["error"]:
+            print(f"{'':>9}error: {step['error']}")
+
+
+async def run(args) -> int:
+    if args.command == "status":
+        print_status(await server.migration_status())
+        return 0
+    if args.command == "reset":
+        await server.db.migrations.delete_one({"_id": args.version})
+        print(f"Migration {args.version} will run again")
+        return 0
+
+    versions = [int(v) for v in args.only.split(",")] if args.only else None
+    ok = await server.run_migrations(versions, args.batch_size, args.rate)
+    print_status(await server.migration_status())
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show every step and its progress")
+    run_parser = commands.add_parser("run", help="Run pending steps")
+    run_parser.add_argument("--only", default="", help="Comma-separated versions to run")
+    run_parser.add_argument("--batch-size", type=int, default=server.MIGRATION_BATCH_SIZE)
+    run_parser.add_argument("--rate", type=float, default=server.MIGRATION_MAX_DOCS_PER_SECOND,
+                            help="Max documents per second, 0 for unthrottled")
+    reset_parser = commands.add_parser("reset", help="Clear a step's checkpoint")
+    reset_parser.add_argument("version", type=int)
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(run(args)))
+    finally:
+        server.client.close()
+
+
+if __name__ == "__main__":
+    main()
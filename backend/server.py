@@ -1,24 +1,61 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import ORJSONResponse, PlainTextResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.concurrency import run_in_threadpool
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
+import time
+import asyncio
 import logging
+import logging.handlers
+import atexit
+import itertools
+import socket
+import queue
+import copy
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, computed_field
+from typing import List, Optional, Dict, Any, NamedTuple, Tuple, ClassVar
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from functools import lru_cache
+from bisect import bisect_right
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import jwt
 from passlib.context import CryptContext
-import pandas as pd
 import io
-from collections import defaultdict
-import pdfplumber
+from types import SimpleNamespace
+import importlib
+import cProfile
+import pstats
+from collections import OrderedDict, defaultdict, deque
 import re
+try:
+    from re import _parser as regex_parser  # Python 3.11+
+except ImportError:
+    import sre_parse as regex_parser
+from decimal import Decimal, ROUND_HALF_UP
+import unicodedata
+import gzip
+import hashlib
+import base64
+import orjson
+from urllib.parse import urlencode, parse_qs
 from enum import Enum
 
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
 # ============ Roles and Permissions Enums ============
 class UserRole(str, Enum):
     ADMIN = "admin"
@@ -89,9 +126,207 @@ ROLE_PERMISSIONS = {
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ============ MongoDB Connection Pool ============
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks open, checked-out and waiting connections across all pools"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+
+    def _add(self, attr: str, delta: int):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + delta)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "available": max(0, self.open - self.checked_out),
+                "waiting": self.waiting,
+                "checkout_failures": self.checkout_failures,
+            }
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """Keeps the durations of the most recent Mongo commands"""
+
+    def __init__(self, window: int = 1000):
+        self.durations_us = deque(maxlen=window)
+        self.failures = 0
+
+    def started(self, event): pass
+
+    def succeeded(self, event):
+        self.durations_us.append(event.duration_micros)
+
+    def failed(self, event):
+        self.durations_us.append(event.duration_micros)
+        self.failures += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        durations = sorted(self.durations_us)
+        if not durations:
+            return {"samples": 0, "failures": self.failures}
+
+        def percentile(q: float) -> float:
+            return durations[min(len(durations) - 1, int(q * len(durations)))] / 1000
+
+        return {
+            "samples": len(durations),
+            "failures": self.failures,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": durations[-1] / 1000,
+        }
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Counts Mongo commands, failures and time per (collection, command)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, tuple] = {}
+        self.counts = defaultdict(int)
+        self.failures = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        return target if isinstance(target, str) else event.database_name
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (self._collection(event), event.command_name)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            key = self._pending.pop((event.connection_id, event.request_id), None)
+            if key is None:
+                return
+            self.counts[key] += 1
+            self.seconds[key] += event.duration_micros / 1_000_000
+            if failed:
+                self.failures[key] += 1
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def snapshot(self) -> List[tuple]:
+        with self._lock:
+            return [
+                (collection, command, count, self.seconds[(collection, command)], self.failures[(collection, command)])
+                for (collection, command), count in self.counts.items()
+            ]
+
+class QueryBudget:
+    """Mongo round trips and documents returned within one request"""
+
+    __slots__ = ("round_trips", "documents")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.documents = 0
+
+query_budget_var: ContextVar[Optional[QueryBudget]] = ContextVar("query_budget", default=None)
+
+class QueryBudgetListener(monitoring.CommandListener):
+    """Charges each command to the QueryBudget of the request that issued it.
+
+    Motor copies the caller's context into its executor threads, so the
+    ContextVar set by QueryBudgetMiddleware is visible here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        budget = query_budget_var.get()
+        if budget is not None:
+            with self._lock:
+                budget.round_trips += 1
+
+    def succeeded(self, event):
+        budget = query_budget_var.get()
+        cursor = event.reply.get("cursor") if budget is not None else None
+        if cursor:
+            batch = cursor.get("firstBatch", cursor.get("nextBatch", []))
+            with self._lock:
+                budget.documents += len(batch)
+
+    def failed(self, event): pass
+
+@contextmanager
+def track_queries():
+    """Collect the Mongo round trips issued inside the block (nested blocks share the outer budget)"""
+    budget = query_budget_var.get()
+    if budget is not None:
+        yield budget
+        return
+    budget = QueryBudget()
+    token = query_budget_var.set(budget)
+    try:
+        yield budget
+    finally:
+        query_budget_var.reset(token)
+
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+    "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000')),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    "socketTimeoutMS": int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000')),
+}
+# Connections opened concurrently at startup so the first requests don't pay for them
+MONGO_WARMUP_CONNECTIONS = int(os.environ.get('MONGO_WARMUP_CONNECTIONS', str(MONGO_POOL_OPTIONS["minPoolSize"])))
+
+pool_stats = PoolStatsListener()
+command_latency = CommandLatencyListener()
+command_metrics = CommandMetricsListener()
+query_budget_listener = QueryBudgetListener()
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_stats, command_latency, command_metrics, query_budget_listener], **MONGO_POOL_OPTIONS)
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -99,6 +334,21 @@ SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Serve list endpoints straight from projected Mongo documents (no per-item re-validation)
+TRUSTED_PROJECTION = os.environ.get('TRUSTED_PROJECTION', 'true').lower() == 'true'
+
+# Response compression and HTTP caching
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+STATIC_METADATA_MAX_AGE = 60 * 60 * 24  # 1 day
+
+# Batched sub-requests per /api/batch call
+MAX_BATCH_REQUESTS = 20
+
+# pandas and pdfplumber are imported on first use by the CSV import and bank
+# statement routes; set PREWARM_IMPORTS=true to load them in the background at startup
+HEAVY_IMPORTS = ("pandas", "pdfplumber", "numpy")
+PREWARM_IMPORTS = os.environ.get('PREWARM_IMPORTS', 'false').lower() == 'true'
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -110,12 +360,312 @@ app = FastAPI(title="Profit & Loss API")
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Records are handed to a queue and written by a listener thread, so stream I/O
+# never blocks a request. Structured fields go in extra={"fields": {...}}.
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # "text" or "json"
+LOG_SAMPLE_EVERY = int(os.environ.get('LOG_SAMPLE_EVERY', '100'))  # 1 in N per-line parse events
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, as_json: bool):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if not self.as_json:
+            message = super().format(record)
+            return f"{message} | {' '.join(f'{k}={v}' for k, v in fields.items())}" if fields else message
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **fields,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+class LogSampler:
+    """Lets one call in every `every` through, starting with the first"""
+
+    def __init__(self, every: int):
+        self.every = max(1, every)
+        self._calls = itertools.count()
+
+    def __call__(self) -> bool:
+        return next(self._calls) % self.every == 0
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records with the traceback kept apart from the message"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() folds the traceback into msg and drops exc_info, so the
+        # listener's formatter could no longer tell the two apart
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(StructuredFormatter(as_json=LOG_FORMAT == "json"))
+log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler, respect_handler_level=True)
+# The queue side only renders the message; the listener's formatter adds the rest
+logging.basicConfig(level=logging.INFO, handlers=[StructuredQueueHandler(_log_queue)])
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
+statement_line_log_sampler = LogSampler(LOG_SAMPLE_EVERY)
+
+# ============ Money ============
+# Amounts stay floats in the API. Every stored amount also gets an exact integer-cents
+# twin (<field>_cents) that aggregation and matching use instead of float tolerances.
+
+MONEY_FIELDS = {
+    "sales": ("amount",),
+    "expenses": ("amount",),
+    "checks": ("amount",),
+    "bank_transactions": ("amount",),
+    "purchase_orders": ("subtotal", "tax", "total", "amount_paid"),
+}
+
+def to_cents(amount) -> int:
+    """Whole cents for an amount, rounding half away from zero"""
+    return int(Decimal(str(amount)).scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+def cents_of(document: dict, field: str = "amount") -> int:
+    """The stored <field>_cents, or the converted float for documents not yet backfilled"""
+    cents = document.get("amount_cents" if field == "amount" else f"{field}_cents")
+    return cents if cents is not None else to_cents(document.get(field) or 0)
+
+def with_cents(document: dict, fields=("amount",)) -> dict:
+    """Add <field>_cents next to each money field present in a document or $set"""
+    for field in fields:
+        if document.get(field) is not None:
+            document[f"{field}_cents"] = to_cents(document[field])
+    return document
+
+class AmountCentsModel(BaseModel):
+    """Base for models with an `amount`; dumps include the exact amount_cents"""
+
+    @computed_field
+    @property
+    def amount_cents(self) -> int:
+        return to_cents(self.amount)
+
+# ============ Dates ============
+# Dates stay ISO strings in the API. Stored documents also carry the day number since
+# 1970-01-01 (<field>_day) for range queries, date windows and bucketing.
+
+DATE_FIELDS = {
+    "sales": ("date",),
+    "expenses": ("date",),
+    "bank_transactions": ("date",),
+    "checks": ("date_issued",),
+}
+DATE_INPUT_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d-%m-%Y")
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+@lru_cache(maxsize=8192)
+def to_epoch_day(value: Optional[str]) -> Optional[int]:
+    """Days since 1970-01-01 for an ISO date/datetime or a common CSV date, else None"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10]).toordinal() - EPOCH_ORDINAL
+    except ValueError:
+        pass
+    for date_format in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).toordinal() - EPOCH_ORDINAL
+        except ValueError:
+            continue
+    return None
+
+def from_epoch_day(day: int) -> str:
+    return date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+def normalize_date(value: str) -> str:
+    """ISO form of a date in any accepted input format; unparseable values pass through"""
+    day = to_epoch_day(value)
+    return from_epoch_day(day) if day is not None else value
+
+def today_epoch_day() -> int:
+    return datetime.now(timezone.utc).toordinal() - EPOCH_ORDINAL
+
+def day_of(document: dict, field: str = "date") -> Optional[int]:
+    """The stored <field>_day, or the parsed string for documents not yet backfilled"""
+    day = document.get("date_day" if field == "date" else f"{field}_day")
+    return day if day is not None else to_epoch_day(document.get(field))
+
+def with_days(document: dict, fields=("date",)) -> dict:
+    """Add <field>_day next to each date field present in a document or $set"""
+    for field in fields:
+        if document.get(field) is not None:
+            document[f"{field}_day"] = to_epoch_day(document[field])
+    return document
+
+def date_range_filter(start: Optional[str], end: Optional[str], field: str = "date") -> dict:
+    """Query clause for start <= field <= end (either bound optional) on <field>_day.
+
+    Documents without <field>_day yet fall back to comparing the ISO strings.
+    """
+    day_filter, string_filter = {}, {}
+    for operator, value in (("$gte", start), ("$lte", end)):
+        if not value:
+            continue
+        day = to_epoch_day(value)
+        if day is None:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+        day_filter[operator] = day
+        string_filter[operator] = from_epoch_day(day)
+    return {"$or": [
+        {f"{field}_day": day_filter},
+        {f"{field}_day": {"$exists": False}, field: string_filter}
+    ]}
+
+class DateDayModel(BaseModel):
+    """Base for models with a `date`; dumps include its date_day"""
+
+    @computed_field
+    @property
+    def date_day(self) -> Optional[int]:
+        return to_epoch_day(self.date)
+
+# ============ Periods ============
+# Report periods are whole calendar units in the user's time zone: days, ISO weeks
+# (Monday first), months, quarters, years and fiscal years starting in any month.
+
+PERIOD_GRANULARITIES = ("day", "week", "month", "quarter", "year", "fiscal_year")
+
+class Period(BaseModel):
+    label: str
+    start: str  # Inclusive ISO dates
+    end: str
+    start_day: int  # The same bounds as day numbers
+    end_day: int
+
+def parse_zone(name: str) -> Optional[ZoneInfo]:
+    """The zone for an IANA name, or None for unknown or malformed ones"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, OSError):  # OSError: names of tzdata directories ("America")
+        return None
+
+def user_zone(user: dict) -> ZoneInfo:
+    return parse_zone(user.get("time_zone") or "UTC") or ZoneInfo("UTC")
+
+def local_today(user: dict) -> date:
+    """Today's date where the user is"""
+    return datetime.now(user_zone(user)).date()
+
+def add_months(day: date, months: int) -> date:
+    """The first of the month `months` after the month of `day`"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def period_start(day: date, granularity: str, fiscal_start_month: int = 1) -> date:
+    """First day of the period containing `day`"""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    if granularity == "year":
+        return date(day.year, 1, 1)
+    if granularity == "fiscal_year":
+        return date(day.year if day.month >= fiscal_start_month else day.year - 1, fiscal_start_month, 1)
+    raise HTTPException(status_code=400, detail=f"Invalid period. Use one of: {', '.join(PERIOD_GRANULARITIES)}")
+
+def shift_period(start: date, granularity: str, count: int) -> date:
+    """Start of the period `count` periods after the one starting at `start`"""
+    if granularity == "day":
+        return start + timedelta(days=count)
+    if granularity == "week":
+        return start + timedelta(weeks=count)
+    months = {"month": 1, "quarter": 3}.get(granularity, 12)
+    return add_months(start, months * count)
+
+def period_label(start: date, granularity: str) -> str:
+    if granularity == "week":
+        iso_year, iso_week, _ = start.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}"
+    if granularity == "month":
+        return start.strftime("%Y-%m")
+    if granularity == "quarter":
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    if granularity == "year":
+        return str(start.year)
+    if granularity == "fiscal_year":
+        # Named after the calendar year it ends in
+        return f"FY{start.year + 1 if start.month > 1 else start.year}"
+    return start.isoformat()
+
+def make_period(start: date, granularity: str) -> Period:
+    end = shift_period(start, granularity, 1) - timedelta(days=1)
+    return Period(
+        label=period_label(start, granularity),
+        start=start.isoformat(),
+        end=end.isoformat(),
+        start_day=start.toordinal() - EPOCH_ORDINAL,
+        end_day=end.toordinal() - EPOCH_ORDINAL
+    )
+
+def last_periods(granularity: str, count: int, today: date, fiscal_start_month: int = 1) -> List[Period]:
+    """The `count` consecutive periods ending with the one containing `today`, oldest first"""
+    current = period_start(today, granularity, fiscal_start_month)
+    return [make_period(shift_period(current, granularity, -i), granularity) for i in range(count - 1, -1, -1)]
+
+def bucket_period_totals(
+    periods: List[Period], sales: List[dict], expenses: List[dict], bank_transactions: List[dict]
+) -> List[Tuple[int, int]]:
+    """(income, expenses) in cents per consecutive period, in one pass over the documents.
+
+    Validated bank credits count as income and debits as expenses, as in the dashboard.
+    Documents outside the periods are ignored.
+    """
+    starts = [period.start_day for period in periods]
+    first_day, last_day = starts[0], periods[-1].end_day
+    income = [0] * len(periods)
+    expense_totals = [0] * len(periods)
+
+    def bucket(document: dict) -> Optional[int]:
+        day = day_of(document)
+        if day is None or day < first_day or day > last_day:
+            return None
+        return bisect_right(starts, day) - 1
+
+    for sale in sales:
+        index = bucket(sale)
+        if index is not None:
+            income[index] += cents_of(sale)
+    for expense in expenses:
+        index = bucket(expense)
+        if index is not None:
+            expense_totals[index] += cents_of(expense)
+    for trans in bank_transactions:
+        index = bucket(trans)
+        if index is None:
+            continue
+        if trans["type"] == "credit":
+            income[index] += cents_of(trans)
+        elif trans["type"] == "debit":
+            expense_totals[index] += cents_of(trans)
+    return list(zip(income, expense_totals))
+
 # ============ Models ============
 
 class User(BaseModel):
@@ -131,6 +681,10 @@ class User(BaseModel):
     activation_token: Optional[str] = None  # Token for password setup
     activation_token_expires: Optional[str] = None  # Token expiration
     active_location_id: Optional[str] = None  # Current active location
+    time_zone: str = "UTC"  # IANA name; report periods follow the user's calendar
+    fiscal_year_start_month: int = 1
+    data_version: int = 0  # Bumped on every successful write, drives ETags
+    rules_version: int = 0  # Bumped on categorization rule changes, keys the cached matcher
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
 class UserCreate(BaseModel):
@@ -207,7 +761,7 @@ class CategoryCreate(BaseModel):
     type: str
     is_cogs: Optional[bool] = False
 
-class Sale(BaseModel):
+class Sale(AmountCentsModel, DateDayModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -227,7 +781,7 @@ class SaleCreate(BaseModel):
     payment_method: str
     description: Optional[str] = None
 
-class Expense(BaseModel):
+class Expense(AmountCentsModel, DateDayModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -244,6 +798,27 @@ class ExpenseCreate(BaseModel):
     category_id: str
     description: Optional[str] = None
 
+class SaleBulkUpdate(SaleCreate):
+    id: str
+
+class BulkSales(BaseModel):
+    # Items are validated one by one in apply_bulk, so a bad row fails only itself
+    create_model: ClassVar[type] = SaleCreate
+    update_model: ClassVar[type] = SaleBulkUpdate
+    create: List[Any] = []  # SaleCreate
+    update: List[Any] = []  # SaleBulkUpdate
+    delete: List[str] = []  # Sale IDs
+
+class ExpenseBulkUpdate(ExpenseCreate):
+    id: str
+
+class BulkExpenses(BaseModel):
+    create_model: ClassVar[type] = ExpenseCreate
+    update_model: ClassVar[type] = ExpenseBulkUpdate
+    create: List[Any] = []  # ExpenseCreate
+    update: List[Any] = []  # ExpenseBulkUpdate
+    delete: List[str] = []  # Expense IDs
+
 
 
 class PurchaseOrderStatus(str, Enum):
@@ -284,6 +859,26 @@ class PurchaseOrder(BaseModel):
     amount_paid: float = 0  # Total pagado
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+    @computed_field
+    @property
+    def subtotal_cents(self) -> int:
+        return to_cents(self.subtotal)
+
+    @computed_field
+    @property
+    def tax_cents(self) -> int:
+        return to_cents(self.tax)
+
+    @computed_field
+    @property
+    def total_cents(self) -> int:
+        return to_cents(self.total)
+
+    @computed_field
+    @property
+    def amount_paid_cents(self) -> int:
+        return to_cents(self.amount_paid)
+
 class PurchaseOrderCreate(BaseModel):
     po_number: str
     supplier: str
@@ -322,18 +917,35 @@ class DashboardSummary(BaseModel):
     sales_by_payment: Dict[str, float]
 
 class MonthComparison(BaseModel):
-    month: str
+    month: str  # Period label: 2024-09, 2024-W37, 2024-Q3, 2024 or FY2025
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
     income: float
     expenses: float
     profit: float
     growth_percentage: Optional[float] = None
 
+class ActivityItem(BaseModel):
+    kind: str  # "sales", "expenses" or "bank_transactions"
+    id: str
+    date: str
+    amount: float
+    category_id: Optional[str] = None
+    description: Optional[str] = None
+    payment_method: Optional[str] = None  # Sales
+    type: Optional[str] = None  # Bank transactions: "debit" or "credit"
+    validated: Optional[bool] = None  # Bank transactions
+
+class ActivityPage(BaseModel):
+    items: List[ActivityItem]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
 class CheckStatus(str, Enum):
     PENDING = "pending"  # Cheque emitido, no cobrado
     CLEARED = "cleared"  # Cheque cobrado (matched con banco)
     CANCELLED = "cancelled"  # Cheque cancelado
 
-class Check(BaseModel):
+class Check(AmountCentsModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -347,6 +959,11 @@ class Check(BaseModel):
     bank_transaction_id: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+    @computed_field
+    @property
+    def date_issued_day(self) -> Optional[int]:
+        return to_epoch_day(self.date_issued)
+
 class CheckCreate(BaseModel):
     check_number: str
     date_issued: str
@@ -354,7 +971,7 @@ class CheckCreate(BaseModel):
     payee: str
     description: Optional[str] = None
 
-class BankTransaction(BaseModel):
+class BankTransaction(AmountCentsModel, DateDayModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -367,6 +984,7 @@ class BankTransaction(BaseModel):
     matched_check_id: Optional[str] = None
     matched_expense_id: Optional[str] = None
     category_id: Optional[str] = None
+    rule_id: Optional[str] = None  # Categorization rule that set category_id, if any
     validated: bool = False
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
@@ -386,6 +1004,51 @@ class BankTransactionUpdate(BaseModel):
     category_id: Optional[str] = None
     validated: Optional[bool] = None
 
+class BankTransactionValidation(BaseModel):
+    id: str
+    type: str  # "debit" or "credit"
+    category_id: Optional[str] = None
+
+class BankTransactionFilter(BaseModel):
+    statement_id: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    type: Optional[str] = None
+    description: Optional[str] = None  # Case-insensitive substring
+    include_validated: bool = False
+
+class BulkBankValidation(BaseModel):
+    # Either explicit (id, type, category) tuples...
+    transactions: List[BankTransactionValidation] = []
+    # ...or every transaction matching a filter, keeping its type, gets category_id
+    filter: Optional[BankTransactionFilter] = None
+    category_id: Optional[str] = None
+
+class CategorizationRule(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    name: Optional[str] = None
+    category_id: str
+    # Conditions, all of which must hold; at least one is required
+    description_contains: Optional[str] = None  # Case-insensitive
+    description_regex: Optional[str] = None  # Case-insensitive, searched anywhere in the description
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    type: Optional[str] = None  # "debit" or "credit"
+    priority: int = 0  # Higher first; ties go to the older rule
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class CategorizationRuleCreate(BaseModel):
+    name: Optional[str] = None
+    category_id: str
+    description_contains: Optional[str] = None
+    description_regex: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    type: Optional[str] = None
+    priority: int = 0
+
 class BankStatement(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -408,6 +1071,52 @@ class ReconciliationReport(BaseModel):
     reconciled_balance: float
     difference: float
 
+# ============ Fast Serialization ============
+
+class TrustedProjection:
+    """Projection and defaults for serving a model's documents without re-validating them.
+
+    Documents in our collections are written from these same models, so projecting
+    exactly the declared fields and filling static defaults yields the shape the
+    response model would produce, at a fraction of the cost. Computed fields
+    (amount_cents, date_day, ...) are stored too; documents written before they
+    existed get them computed from the stored fields.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.projection = {"_id": 0}
+        self.projection.update({name: 1 for name in model.model_fields})
+        self.projection.update({name: 1 for name in model.model_computed_fields})
+        self.defaults = {
+            name: field.default
+            for name, field in model.model_fields.items()
+            if not field.is_required() and field.default_factory is None
+        }
+        self.computed = {name: field.wrapped_property.fget for name, field in model.model_computed_fields.items()}
+        self.field_count = len(self.projection) - 1
+
+    def response(self, documents: List[dict]):
+        if not TRUSTED_PROJECTION:
+            return documents  # Validated and serialized through the route's response_model
+        defaults, computed, field_count = self.defaults, self.computed, self.field_count
+        for doc in documents:
+            if len(doc) >= field_count:
+                continue  # Projected documents with every field need nothing filled
+            for key, value in defaults.items():
+                if key not in doc:
+                    doc[key] = value
+            for key, compute in computed.items():
+                if key not in doc:
+                    doc[key] = compute(SimpleNamespace(**doc))
+        return ORJSONResponse(documents)
+
+CATEGORY_PROJECTION = TrustedProjection(Category)
+SALE_PROJECTION = TrustedProjection(Sale)
+EXPENSE_PROJECTION = TrustedProjection(Expense)
+CHECK_PROJECTION = TrustedProjection(Check)
+BANK_TRANSACTION_PROJECTION = TrustedProjection(BankTransaction)
+
 # ============ Helper Functions ============
 
 def hash_password(password: str) -> str:
@@ -423,7 +1132,13 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    # Sub-requests dispatched by /api/batch carry the already authenticated user
+    batch_user = getattr(request.state, "batch_user", None)
+    if batch_user is not None:
+        request.state.user_id = batch_user["id"]
+        return batch_user
+
     try:
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -434,6 +1149,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user = await db.users.find_one({"id": user_id}, {"_id": 0})
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
+        # Lets DataVersionMiddleware bump the user's data version after a write
+        request.state.user_id = user_id
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -474,6 +1191,842 @@ async def require_admin(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+# ============ HTTP Caching & Compression ============
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+async def conditional_get(request: Request, current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency for cacheable GET routes.
+
+    The ETag is derived from the user's data version, so an unchanged listing is
+    answered with 304 before the handler runs any query. The user's local date is
+    part of the tag because several reports are relative to "today".
+    """
+    key = "|".join([
+        current_user["id"],
+        str(current_user.get("data_version", 0)),
+        request.url.path,
+        "&".join(sorted(request.url.query.split("&"))),
+        local_today(current_user).isoformat(),
+    ])
+    etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+    if etag_matches(request, etag):
+        raise NotModified(etag)
+    request.state.etag = etag
+    return current_user
+
+async def bump_data_version(user_id: str):
+    await db.users.update_one({"id": user_id}, {"$inc": {"data_version": 1}})
+    summary_indexes.discard(user_id)
+
+def static_metadata_response(request: Request, payload: dict):
+    """Response for metadata that only changes on deploy, with long-lived cache headers"""
+    body = ORJSONResponse(payload).body
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={STATIC_METADATA_MAX_AGE}"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class DataVersionMiddleware:
+    """Bumps the user's data version after successful writes and attaches ETags to GETs.
+
+    The bump happens before the response start is forwarded, so a client that
+    re-fetches right after a write never gets a 304 for stale data.
+    """
+
+    WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        is_write = scope["method"] in self.WRITE_METHODS
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                if is_write and state.get("user_id") and not state.get("read_only"):
+                    await bump_data_version(state["user_id"])
+                elif state.get("etag"):
+                    MutableHeaders(raw=message["headers"]).append("ETag", state["etag"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+class CompressionMiddleware:
+    """Brotli/gzip compression for complete responses above a size threshold.
+
+    Streaming responses (more_body) are passed through untouched. Large bodies are
+    compressed in the threadpool so the event loop keeps serving other requests.
+    """
+
+    THREADPOOL_THRESHOLD = 256 * 1024
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @staticmethod
+    def negotiate(accept_encoding: str) -> Optional[str]:
+        accepted = set()
+        for part in accept_encoding.split(","):
+            coding, _, params = part.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+                continue
+            accepted.add(coding.strip().lower())
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if message.get("more_body") or len(body) < self.minimum_size or "content-encoding" in headers:
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= self.THREADPOOL_THRESHOLD:
+                body = await run_in_threadpool(self.compress, body, encoding)
+            else:
+                body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+# ============ Description Search ============
+
+MAX_SEARCH_TOKENS = 64
+
+def tokenize_search_text(text: Optional[str]) -> List[str]:
+    """Lowercased, accent-free alphanumeric tokens, deduplicated in order"""
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFKD", text)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+    return list(dict.fromkeys(re.findall(r"[a-z0-9]+", normalized)))[:MAX_SEARCH_TOKENS]
+
+def with_search_tokens(document: dict) -> dict:
+    """Add the multikey-indexed search_tokens array derived from the description"""
+    document["search_tokens"] = tokenize_search_text(document.get("description"))
+    return document
+
+async def find_with_description_search(
+    collection,
+    query: dict,
+    description: Optional[str],
+    search_mode: str,
+    projection: TrustedProjection,
+    limit: int = 10000
+) -> List[dict]:
+    """Run a listing query, optionally narrowed by a description search.
+
+    "substring" mode (the default) is the original unanchored match, with the user
+    input escaped. "indexed" mode is opt-in: it prefix-matches every search term
+    against search_tokens, which an anchored regex can do through the (user_id,
+    search_tokens) index, and ranks results by how many terms match a token exactly.
+    It only finds word prefixes, so "ana" matches "Ana Garcia" but not "banana".
+    """
+    if not description:
+        return await collection.find(query, projection.projection).sort("date", -1).to_list(limit)
+
+    if search_mode == "substring":
+        query["description"] = {"$regex": re.escape(description), "$options": "i"}
+        return await collection.find(query, projection.projection).sort("date", -1).to_list(limit)
+    if search_mode != "indexed":
+        raise HTTPException(status_code=400, detail="Invalid search_mode. Use 'indexed' or 'substring'")
+
+    terms = tokenize_search_text(description)
+    if not terms:
+        return []
+    query["$and"] = [{"search_tokens": re.compile(f"^{re.escape(term)}")} for term in terms]
+    exact_matches = {"$filter": {"input": "$search_tokens", "as": "token", "cond": {"$in": ["$$token", terms]}}}
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"_relevance": {"$size": exact_matches}}},
+        {"$sort": {"_relevance": -1, "date": -1}},
+        {"$limit": limit},
+        {"$project": projection.projection},
+    ]
+    return await collection.aggregate(pipeline).to_list(limit)
+
+# ============ Ledger ============
+# Reports read one normalized collection instead of merging sales, expenses and
+# validated bank transactions. Every source document that counts towards P&L has one
+# entry, with _id "<source>:<source id>", rewritten whenever the document changes:
+# account ("income" or "expense"), amount_cents signed (+income, -expense), category,
+# COGS flag, payment method (sales) and date.
+
+LEDGER_SOURCES = ("sales", "expenses", "bank_transactions")
+# Poll interval while the ledger backfill migrations are still running elsewhere
+LEDGER_READY_POLL_SECONDS = int(os.environ.get('LEDGER_READY_POLL_SECONDS', '30'))
+
+def ledger_id(source: str, source_id: str) -> str:
+    return f"{source}:{source_id}"
+
+def ledger_account(source: str, document: dict) -> Optional[str]:
+    """The account a source document posts to, or None when it doesn't count (yet)"""
+    if source == "sales":
+        return "income"
+    if source == "expenses":
+        return "expense"
+    # Bank transactions count once validated and categorized
+    if not document.get("validated") or document.get("category_id") is None:
+        return None
+    return {"credit": "income", "debit": "expense"}.get(document.get("type"))
+
+def ledger_entry(source: str, document: dict, cogs_categories: set) -> Optional[dict]:
+    account = ledger_account(source, document)
+    if account is None:
+        return None
+    cents = cents_of(document)
+    return {
+        "_id": ledger_id(source, document["id"]),
+        "user_id": document["user_id"],
+        "source": source,
+        "source_id": document["id"],
+        "account": account,
+        "amount_cents": cents if account == "income" else -cents,
+        "category_id": document.get("category_id"),
+        "is_cogs": account == "expense" and document.get("category_id") in cogs_categories,
+        "payment_method": document.get("payment_method"),
+        "location_id": document.get("location_id"),
+        "date": document.get("date"),
+        "date_day": day_of(document),
+    }
+
+def ledger_writes(source: str, documents: List[dict], cogs_categories: set) -> list:
+    """Upserts for documents that count, deletes for those that no longer do"""
+    operations = []
+    for document in documents:
+        entry = ledger_entry(source, document, cogs_categories)
+        if entry is None:
+            operations.append(DeleteOne({"_id": ledger_id(source, document["id"])}))
+        else:
+            operations.append(ReplaceOne({"_id": entry["_id"]}, entry, upsert=True))
+    return operations
+
+async def cogs_category_ids(user_ids) -> set:
+    categories = await db.categories.find(
+        {"user_id": {"$in": list(user_ids)}, "is_cogs": True}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    return {category["id"] for category in categories}
+
+async def sync_ledger(source: str, user_id: str, documents: List[dict], deleted_ids: List[str] = ()):
+    """Rewrite the ledger entries of source documents that were just written or deleted"""
+    if not documents and not deleted_ids:
+        return
+    needs_cogs = any(ledger_account(source, document) == "expense" for document in documents)
+    cogs = await cogs_category_ids([user_id]) if needs_cogs else set()
+    operations = ledger_writes(source, documents, cogs)
+    operations += [DeleteOne({"_id": ledger_id(source, source_id)}) for source_id in deleted_ids]
+    await db.ledger_entries.bulk_write(operations, ordered=False)
+
+async def delete_ledger_entries(source: str, source_ids: List[str]):
+    await db.ledger_entries.delete_many({"_id": {"$in": [ledger_id(source, source_id) for source_id in source_ids]}})
+
+def ledger_entries_from(sales: List[dict], expenses: List[dict], bank_transactions: List[dict]) -> List[dict]:
+    """Ledger-shaped entries built in memory from source documents"""
+    entries = []
+    for source, documents in zip(LEDGER_SOURCES, (sales, expenses, bank_transactions)):
+        for document in documents:
+            entry = ledger_entry(source, document, set())
+            if entry is not None:
+                entries.append(entry)
+    return entries
+
+def ledger_columns(entry: dict) -> List[Tuple[Tuple[str, Any], int]]:
+    """The dashboard totals (see DASHBOARD_TOTAL_KINDS) an entry adds to, with positive cents"""
+    cents = abs(entry["amount_cents"])
+    if entry["source"] == "sales":
+        return [(("sale_category", entry["category_id"]), cents), (("sale_payment", entry["payment_method"]), cents)]
+    if entry["source"] == "expenses":
+        return [(("expense_category", entry["category_id"]), cents)]
+    return [(("credit" if entry["account"] == "income" else "debit", entry["category_id"]), cents)]
+
+_ledger_ready: Dict[str, bool] = {}
+_ledger_checked_at: Dict[str, float] = {}
+
+async def ledger_ready() -> bool:
+    """Whether the ledger backfill has completed for this database.
+
+    Until then reports keep reading the source collections. Once seen complete the
+    answer is cached for the life of the process.
+    """
+    if _ledger_ready.get(db.name):
+        return True
+    now = time.monotonic()
+    if now - _ledger_checked_at.get(db.name, float("-inf")) < LEDGER_READY_POLL_SECONDS:
+        return False
+    _ledger_checked_at[db.name] = now
+    done = await db.migrations.count_documents({"_id": {"$in": list(LEDGER_MIGRATIONS)}, "status": "done"})
+    _ledger_ready[db.name] = done == len(LEDGER_MIGRATIONS)
+    return _ledger_ready[db.name]
+
+# ============ Migrations ============
+# Data-shape changes (derived fields, back-references, ...) run as versioned steps over
+# live collections: small unordered bulk writes, throttled, with the position after
+# each batch checkpointed in db.migrations so an interrupted run resumes. They run in
+# the background at startup and from backend/migrate.py. A lease in the same
+# collection keeps two processes from running them at once.
+
+RUN_MIGRATIONS_ON_STARTUP = os.environ.get('RUN_MIGRATIONS_ON_STARTUP', 'true').lower() == 'true'
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '500'))
+# Documents per second across all steps (0 = unthrottled), so API traffic keeps its share
+MIGRATION_MAX_DOCS_PER_SECOND = float(os.environ.get('MIGRATION_MAX_DOCS_PER_SECOND', '2000'))
+# A runner that dies holding the lease blocks others for at most this long
+MIGRATION_LEASE_SECONDS = int(os.environ.get('MIGRATION_LEASE_SECONDS', '300'))
+MIGRATION_LEASE_ID = "lease"
+
+class Migration:
+    """One versioned step over `collection`.
+
+    Documents matching `query` are read in _id order, `batch_size` at a time, and
+    `writes(batch)` returns (or resolves to) the bulk operations for them as
+    {collection name: [ops]}. A `projection` of None reads whole documents.
+    Steps must be idempotent (a batch can be re-applied after a crash) and should
+    stop matching `query` once migrated. `after_writes(batch)`, if given, runs once
+    the batch's writes are applied.
+    """
+
+    def __init__(self, version: int, name: str, collection: str, query: dict, projection: dict, writes,
+                 after_writes=None):
+        self.version = version
+        self.name = name
+        self.collection = collection
+        self.query = query
+        self.projection = {"_id": 1, **projection} if projection is not None else None
+        self.writes = writes
+        self.after_writes = after_writes
+
+def set_fields(collection: str, compute):
+    """writes() that $sets compute(doc) on each document of the batch"""
+    def writes(batch: List[dict]) -> Dict[str, list]:
+        return {collection: [UpdateOne({"_id": doc["_id"]}, {"$set": compute(doc)}) for doc in batch]}
+    return writes
+
+def search_tokens_migration(version: int, collection: str) -> Migration:
+    return Migration(
+        version, f"{collection}.search_tokens", collection,
+        {"search_tokens": {"$exists": False}}, {"description": 1},
+        set_fields(collection, lambda doc: {"search_tokens": tokenize_search_text(doc.get("description"))})
+    )
+
+def derived_fields_migration(version: int, collection: str, fields, suffix: str, convert) -> Migration:
+    """Add <field><suffix> = convert(<field>) wherever a field is set and its twin is missing"""
+    return Migration(
+        version, f"{collection}.{','.join(field + suffix for field in fields)}", collection,
+        {"$or": [{field: {"$ne": None}, f"{field}{suffix}": {"$exists": False}} for field in fields]},
+        {field: 1 for field in fields},
+        set_fields(collection, lambda doc: {
+            f"{field}{suffix}": convert(doc[field]) for field in fields if doc.get(field) is not None
+        })
+    )
+
+PURCHASE_ORDER_LINKS = {
+    "linked_checks": "checks",
+    "linked_expenses": "expenses",
+    "linked_transactions": "bank_transactions",
+}
+
+def purchase_order_back_references(batch: List[dict]) -> Dict[str, list]:
+    """Set purchase_order_id on documents a PO lists as linked but that don't point back"""
+    writes = defaultdict(list)
+    for po in batch:
+        for field, collection in PURCHASE_ORDER_LINKS.items():
+            if po.get(field):
+                writes[collection].append(UpdateMany(
+                    {"id": {"$in": po[field]}, "user_id": po["user_id"], "purchase_order_id": {"$exists": False}},
+                    {"$set": {"purchase_order_id": po["id"]}}
+                ))
+    return writes
+
+def ledger_migration(version: int, source: str) -> Migration:
+    """Backfill ledger entries for `source` while the API keeps writing them.
+
+    API writes sync the ledger themselves, so the backfill only inserts entries that
+    don't exist yet and never overwrites one an edit made after the batch was read.
+    Rows deleted or no longer counting by the time the batch is written lose the
+    entry it inserted for them.
+    """
+    async def writes(batch: List[dict]) -> Dict[str, list]:
+        cogs = await cogs_category_ids({doc["user_id"] for doc in batch})
+        entries = [entry for entry in (ledger_entry(source, doc, cogs) for doc in batch) if entry]
+        return {"ledger_entries": [
+            UpdateOne({"_id": entry["_id"]}, {"$setOnInsert": {k: v for k, v in entry.items() if k != "_id"}}, upsert=True)
+            for entry in entries
+        ]}
+
+    async def drop_stale_entries(batch: List[dict]):
+        current = {
+            doc["_id"]: doc
+            for doc in await db[source].find({"_id": {"$in": [doc["_id"] for doc in batch]}}).to_list(None)
+        }
+        stale = [
+            doc for doc in batch
+            if ledger_account(source, doc) is not None
+            and (doc["_id"] not in current or ledger_account(source, current[doc["_id"]]) is None)
+        ]
+        if stale:
+            # Only the entry as the backfill wrote it: a different one came from a later API write
+            await db.ledger_entries.bulk_write([
+                DeleteOne({key: entry[key] for key in ("_id", "amount_cents", "category_id", "date_day")})
+                for entry in (ledger_entry(source, doc, set()) for doc in stale)
+            ], ordered=False)
+
+    return Migration(version, f"{source}.ledger_entries", source, {}, None, writes, drop_stale_entries)
+
+# Append only: versions are recorded in db.migrations and must never be renumbered
+MIGRATIONS = [
+    search_tokens_migration(1, "sales"),
+    search_tokens_migration(2, "expenses"),
+    *[
+        derived_fields_migration(version, collection, MONEY_FIELDS[collection], "_cents", to_cents)
+        for version, collection in enumerate(
+            ("sales", "expenses", "checks", "bank_transactions", "purchase_orders"), start=3
+        )
+    ],
+    *[
+        derived_fields_migration(version, collection, DATE_FIELDS[collection], "_day", to_epoch_day)
+        for version, collection in enumerate(("sales", "expenses", "bank_transactions", "checks"), start=8)
+    ],
+    Migration(
+        12, "purchase_orders.back_references", "purchase_orders",
+        {"$or": [{f"{field}.0": {"$exists": True}} for field in PURCHASE_ORDER_LINKS]},
+        {"id": 1, "user_id": 1, **{field: 1 for field in PURCHASE_ORDER_LINKS}},
+        purchase_order_back_references
+    ),
+    *[ledger_migration(version, source) for version, source in enumerate(LEDGER_SOURCES, start=13)],
+]
+LEDGER_MIGRATIONS = (13, 14, 15)
+
+async def acquire_migration_lease(owner: str) -> bool:
+    """Take or renew the runner lease; False while another live runner holds it"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.migrations.update_one(
+            {"_id": MIGRATION_LEASE_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now.isoformat()}}]},
+            {"$set": {"owner": owner, "expires_at": (now + timedelta(seconds=MIGRATION_LEASE_SECONDS)).isoformat()}},
+            upsert=True
+        )
+    except DuplicateKeyError:  # Held by someone else: the upsert collided with their lease
+        return False
+    return True
+
+async def release_migration_lease(owner: str):
+    await db.migrations.delete_one({"_id": MIGRATION_LEASE_ID, "owner": owner})
+
+async def run_migration(migration: Migration, owner: str, batch_size: int, max_docs_per_second: float) -> int:
+    """Apply one step from its last checkpoint; returns the documents processed this run"""
+    state = await db.migrations.find_one({"_id": migration.version}) or {}
+    if state.get("status") == "done":
+        return 0
+    now = datetime.now(timezone.utc).isoformat()
+    await db.migrations.update_one(
+        {"_id": migration.version},
+        {"$set": {"name": migration.name, "status": "running", "error": None, "updated_at": now},
+         "$setOnInsert": {"started_at": now, "processed": 0}},
+        upsert=True
+    )
+
+    collection = db[migration.collection]
+    last_id = state.get("last_id")
+    processed = 0
+    while True:
+        started = time.monotonic()
+        query = dict(migration.query)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, migration.projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        writes = migration.writes(batch)
+        if asyncio.iscoroutine(writes):
+            writes = await writes
+        for name, operations in writes.items():
+            if operations:
+                await db[name].bulk_write(operations, ordered=False)
+        if migration.after_writes:
+            await migration.after_writes(batch)
+
+        last_id = batch[-1]["_id"]
+        processed += len(batch)
+        await db.migrations.update_one(
+            {"_id": migration.version},
+            {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc).isoformat()},
+             "$inc": {"processed": len(batch)}}
+        )
+        if not await acquire_migration_lease(owner):
+            raise RuntimeError("Migration lease lost to another runner")
+        # Yield to API traffic, and sleep off whatever the batch left of its rate budget
+        pause = len(batch) / max_docs_per_second - (time.monotonic() - started) if max_docs_per_second else 0
+        await asyncio.sleep(max(pause, 0))
+
+    done = datetime.now(timezone.utc).isoformat()
+    await db.migrations.update_one(
+        {"_id": migration.version},
+        {"$set": {"status": "done", "completed_at": done, "updated_at": done}}
+    )
+    return processed
+
+async def run_migrations(
+    versions: Optional[List[int]] = None,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    max_docs_per_second: float = MIGRATION_MAX_DOCS_PER_SECOND
+) -> bool:
+    """Run pending steps in version order. False if another runner holds the lease or a step failed."""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    if not await acquire_migration_lease(owner):
+        logger.info("Migrations are being run by another process")
+        return False
+    try:
+        for migration in MIGRATIONS:
+            if versions and migration.version not in versions:
+                continue
+            started = time.perf_counter()
+            try:
+                processed = await run_migration(migration, owner, batch_size, max_docs_per_second)
+            except Exception as e:
+                await db.migrations.update_one({"_id": migration.version}, {"$set": {"status": "failed", "error": str(e)}})
+                logger.error(f"Migration {migration.version} ({migration.name}) failed: {str(e)}", exc_info=True)
+                return False  # Later steps may depend on this one
+            if processed:
+                logger.info(f"Migration {migration.version} ({migration.name}): "
+                            f"{processed} documents in {time.perf_counter() - started:.1f}s")
+    finally:
+        await release_migration_lease(owner)
+    if not versions:
+        _ledger_ready[db.name] = True  # Every step, the ledger backfill included, is done
+    return True
+
+async def migration_status() -> List[dict]:
+    """Every registered step with its recorded progress"""
+    states = {
+        state["_id"]: state
+        for state in await db.migrations.find({"_id": {"$ne": MIGRATION_LEASE_ID}}).to_list(1000)
+    }
+    return [
+        {
+            "version": migration.version,
+            "name": migration.name,
+            "status": states.get(migration.version, {}).get("status", "pending"),
+            "processed": states.get(migration.version, {}).get("processed", 0),
+            "updated_at": states.get(migration.version, {}).get("updated_at"),
+            "error": states.get(migration.version, {}).get("error"),
+        }
+        for migration in MIGRATIONS
+    ]
+
+# ============ Metrics ============
+
+# Report per-request Mongo round trips in X-Query-Count / X-Query-Documents headers
+QUERY_BUDGET_HEADERS = os.environ.get('QUERY_BUDGET_HEADERS', 'false').lower() == 'true'
+# Log a warning when one request issues more round trips than this
+QUERY_BUDGET_WARN = int(os.environ.get('QUERY_BUDGET_WARN', '100'))
+
+# On-demand profiles (admin requests with X-Profile: 1 or ?_profile=1) are stored here
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', '/tmp/pl_profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '50'))
+
+# Only loopback clients can scrape /metrics unless explicitly opened up
+METRICS_ALLOW_REMOTE = os.environ.get('METRICS_ALLOW_REMOTE', 'false').lower() == 'true'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            running += count
+            yield bound, running
+
+route_latency: Dict[tuple, LatencyHistogram] = defaultdict(LatencyHistogram)
+route_responses: Dict[tuple, int] = defaultdict(int)
+
+class RouteMetricsMiddleware:
+    """Records latency per (method, route template) and response counts per status"""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = None
+
+    def route_template(self, scope) -> str:
+        if self._templates is None:
+            self._templates = {
+                route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")
+            }
+        return self._templates.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            template = self.route_template(scope)
+            route_latency[(scope["method"], template)].observe(time.perf_counter() - started)
+            route_responses[(scope["method"], template, status_code)] += 1
+
+class QueryBudgetMiddleware:
+    """Tracks Mongo round trips per request to surface N+1 query patterns"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as budget:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and QUERY_BUDGET_HEADERS:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers["X-Query-Count"] = str(budget.round_trips)
+                    headers["X-Query-Documents"] = str(budget.documents)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if budget.round_trips > QUERY_BUDGET_WARN:
+            logger.warning(
+                f"{scope['method']} {scope['path']} issued {budget.round_trips} Mongo round trips "
+                f"({budget.documents} documents)"
+            )
+
+class ProfilingMiddleware:
+    """Runs flagged admin requests under cProfile and stores the pstats dump.
+
+    Requests without the flag only pay for a header/query scan. cProfile is a
+    per-thread profiler, so other coroutines that run on the event loop while a
+    profiled request awaits also show up in its profile. Only one request is
+    profiled at a time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._active = False
+
+    @staticmethod
+    def is_flagged(scope) -> bool:
+        query_string = scope.get("query_string", b"")
+        if b"_profile" in query_string and parse_qs(query_string.decode("latin-1")).get("_profile") == ["1"]:
+            return True
+        return any(name == b"x-profile" and value == b"1" for name, value in scope["headers"])
+
+    @staticmethod
+    async def is_admin(scope) -> bool:
+        authorization = Headers(scope=scope).get("authorization", "")
+        if not authorization.lower().startswith("bearer "):
+            return False
+        try:
+            payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+        except Exception:
+            return False
+        user = await db.users.find_one({"id": payload.get("sub")}, {"_id": 0, "role": 1})
+        return bool(user) and user.get("role") == UserRole.ADMIN.value
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.is_flagged(scope) or self._active or not await self.is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-")[:60]
+        name = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{scope['method']}_{slug}_{uuid.uuid4().hex[:8]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"])["X-Profile-Id"] = name
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            await run_in_threadpool(self.save, profiler, name, scope, elapsed_ms)
+
+    @staticmethod
+    def save(profiler: cProfile.Profile, name: str, scope, elapsed_ms: float):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(PROFILE_DIR / f"{name}.prof")
+        (PROFILE_DIR / f"{name}.json").write_text(orjson.dumps({
+            "name": name,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode(),
+            "elapsed_ms": elapsed_ms,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }).decode())
+        profiles = sorted(PROFILE_DIR.glob("*.prof"))
+        for stale in profiles[:max(0, len(profiles) - PROFILE_MAX_FILES)]:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix(".json").unlink(missing_ok=True)
+
+def prometheus_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus_metrics() -> str:
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route template",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(route_latency.items()):
+        labels = f'method="{method}",route="{prometheus_label(route)}"'
+        for bound, count in histogram.cumulative():
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.total}")
+        lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+    lines += ["# HELP http_responses_total Responses by route template and status", "# TYPE http_responses_total counter"]
+    for (method, route, status_code), count in sorted(route_responses.items()):
+        lines.append(f'http_responses_total{{method="{method}",route="{prometheus_label(route)}",status="{status_code}"}} {count}')
+
+    mongo_commands = command_metrics.snapshot()
+    lines += ["# HELP mongodb_commands_total Mongo commands by collection and command", "# TYPE mongodb_commands_total counter"]
+    for collection, command, count, _, _ in mongo_commands:
+        lines.append(f'mongodb_commands_total{{collection="{prometheus_label(collection)}",command="{command}"}} {count}')
+    lines += ["# HELP mongodb_command_seconds_total Time spent in Mongo commands", "# TYPE mongodb_command_seconds_total counter"]
+    for collection, command, _, seconds, _ in mongo_commands:
+        lines.append(f'mongodb_command_seconds_total{{collection="{prometheus_label(collection)}",command="{command}"}} {seconds}')
+    lines += ["# HELP mongodb_command_failures_total Failed Mongo commands", "# TYPE mongodb_command_failures_total counter"]
+    for collection, command, _, _, failures in mongo_commands:
+        lines.append(f'mongodb_command_failures_total{{collection="{prometheus_label(collection)}",command="{command}"}} {failures}')
+
+    lines += ["# HELP mongodb_pool_connections Connection pool state", "# TYPE mongodb_pool_connections gauge"]
+    for state, value in pool_stats.snapshot().items():
+        lines.append(f'mongodb_pool_connections{{state="{state}"}} {value}')
+
+    lines += ["# HELP coalesced_requests_total Single-flight executions and coalesced waiters", "# TYPE coalesced_requests_total counter"]
+    for route, counts in sorted(single_flight.stats.items()):
+        for outcome, value in counts.items():
+            lines.append(f'coalesced_requests_total{{route="{route}",outcome="{outcome}"}} {value}')
+
+    return "\n".join(lines) + "\n"
+
+# ============ Request Coalescing ============
+
+class SingleFlight:
+    """Shares one in-flight computation between identical concurrent calls.
+
+    Only calls that overlap in time are coalesced; nothing is cached once the
+    computation finishes. The computation runs as its own task so a caller that
+    disconnects doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self.stats = defaultdict(lambda: {"executed": 0, "coalesced": 0})
+
+    async def run(self, key: tuple, compute):
+        route = key[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats[route]["executed"] += 1
+        else:
+            self.stats[route]["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "routes": {route: dict(counts) for route, counts in self.stats.items()}
+        }
+
+single_flight = SingleFlight()
+
+def coalesce_key(current_user: dict, route: str, **params) -> tuple:
+    """Key for single-flight: user, route, normalized params and the user's data version.
+
+    Including the data version means a request that arrives after a write never
+    joins a computation that started before it.
+    """
+    normalized = tuple(sorted((name, str(value)) for name, value in params.items() if value is not None))
+    return (current_user["id"], route, normalized, current_user.get("data_version", 0))
+
 async def initialize_predefined_categories(user_id: str):
     """Initialize predefined categories for new user"""
     predefined_income = [
@@ -655,9 +2208,11 @@ async def validate_activation_token(token: str):
 # ============ Category Routes ============
 
 @api_router.get("/categories", response_model=List[Category])
-async def get_categories(current_user: dict = Depends(get_current_user)):
-    categories = await db.categories.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
-    return categories
+async def get_categories(current_user: dict = Depends(conditional_get)):
+    categories = await db.categories.find(
+        {"user_id": current_user["id"]}, CATEGORY_PROJECTION.projection
+    ).to_list(1000)
+    return CATEGORY_PROJECTION.response(categories)
 
 @api_router.post("/categories", response_model=Category)
 async def create_category(category_data: CategoryCreate, current_user: dict = Depends(get_current_user)):
@@ -690,6 +2245,11 @@ async def update_category(category_id: str, category_data: CategoryCreate, curre
         {"id": category_id, "user_id": current_user["id"]},
         {"$set": update_data}
     )
+    if update_data["is_cogs"] != existing.get("is_cogs", False):
+        await db.ledger_entries.update_many(
+            {"user_id": current_user["id"], "category_id": category_id, "account": "expense"},
+            {"$set": {"is_cogs": update_data["is_cogs"]}}
+        )
     
     updated = await db.categories.find_one({"id": category_id}, {"_id": 0})
     return updated
@@ -706,11 +2266,143 @@ async def delete_category(category_id: str, current_user: dict = Depends(get_cur
     await db.categories.delete_one({"id": category_id, "user_id": current_user["id"]})
     return {"message": "Category deleted successfully"}
 
+# ============ Bulk Writes ============
+# A day's receipts or a correction of hundreds of rows in one request. Items are
+# checked in one pass (a single query loads the rows being updated or deleted), the
+# accepted ones go out in one unordered bulk_write and their ledger entries in
+# another. Every item gets its own result, so one bad row doesn't fail the rest.
+
+MAX_BULK_ITEMS = int(os.environ.get('MAX_BULK_ITEMS', '1000'))
+
+def bulk_result(op: str, index: int, item_id: Optional[str] = None, error: Optional[str] = None) -> dict:
+    return {"op": op, "index": index, "id": item_id, "ok": error is None, "error": error}
+
+def require_active_location(user: dict, action: str) -> str:
+    """The user's active location, which new sales and expenses belong to; 400 without one"""
+    location_id = user.get("active_location_id")
+    if not location_id:
+        raise HTTPException(status_code=400, detail=f"Select an active location before {action}")
+    return location_id
+
+def validation_message(error: ValidationError) -> str:
+    first = error.errors()[0]
+    return f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}"
+
+async def apply_bulk(request: Request, source: str, model, payload, current_user: dict, defaults: dict) -> dict:
+    """Creates, updates and deletes of one collection; creates get `defaults` (location, ...)"""
+    user_id = current_user["id"]
+    collection = db[source]
+    total = len(payload.create) + len(payload.update) + len(payload.delete)
+    if not total:
+        raise HTTPException(status_code=400, detail="Nothing to do")
+    if total > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ITEMS} items")
+
+    # Items arrive unvalidated so that a malformed one fails only its own result
+    updates = []  # (update model or None, raw item, validation error or None)
+    for raw in payload.update:
+        try:
+            updates.append((payload.update_model.model_validate(raw), raw, None))
+        except ValidationError as e:
+            updates.append((None, raw, validation_message(e)))
+
+    targets = list({item.id for item, _, _ in updates if item} | set(payload.delete))
+    existing = {}
+    if targets:
+        documents = await collection.find({"user_id": user_id, "id": {"$in": targets}}, {"_id": 0}).to_list(None)
+        existing = {document["id"]: document for document in documents}
+
+    # (result, operation, ledger document or None for a delete), in request order
+    results, applied, claimed = [], [], set()
+    for index, raw in enumerate(payload.create):
+        try:
+            fields = payload.create_model.model_validate(raw).model_dump()
+        except ValidationError as e:
+            results.append(bulk_result("create", index, error=validation_message(e)))
+            continue
+        if to_epoch_day(fields["date"]) is None:
+            results.append(bulk_result("create", index, error=f"Invalid date: {fields['date']}"))
+            continue
+        fields["date"] = normalize_date(fields["date"])
+        try:
+            document = with_search_tokens(model(user_id=user_id, **defaults, **fields).model_dump())
+        except ValidationError as e:
+            results.append(bulk_result("create", index, error=validation_message(e)))
+            continue
+        result = bulk_result("create", index, document["id"])
+        results.append(result)
+        applied.append((result, InsertOne(document), document))
+
+    for index, (item, raw, invalid) in enumerate(updates):
+        if invalid:
+            raw_id = raw.get("id") if isinstance(raw, dict) else None
+            results.append(bulk_result("update", index, raw_id if isinstance(raw_id, str) else None, invalid))
+            continue
+        fields = item.model_dump(exclude={"id"})
+        if item.id not in existing:
+            error = "Not found"
+        elif item.id in claimed:
+            error = "Already updated or deleted in this request"
+        elif to_epoch_day(fields["date"]) is None:
+            error = f"Invalid date: {fields['date']}"
+        else:
+            error = None
+        if error:
+            results.append(bulk_result("update", index, item.id, error))
+            continue
+        claimed.add(item.id)
+        fields["date"] = normalize_date(fields["date"])
+        changes = with_search_tokens(with_days(with_cents(fields)))
+        result = bulk_result("update", index, item.id)
+        results.append(result)
+        applied.append((result, UpdateOne({"id": item.id, "user_id": user_id}, {"$set": changes}),
+                        {**existing[item.id], **changes}))
+
+    for index, item_id in enumerate(payload.delete):
+        error = "Not found" if item_id not in existing else (
+            "Already updated or deleted in this request" if item_id in claimed else None
+        )
+        if error:
+            results.append(bulk_result("delete", index, item_id, error))
+            continue
+        claimed.add(item_id)
+        result = bulk_result("delete", index, item_id)
+        results.append(result)
+        applied.append((result, DeleteOne({"id": item_id, "user_id": user_id}), None))
+
+    if applied:
+        try:
+            await collection.bulk_write([operation for _, operation, _ in applied], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details["writeErrors"]:
+                result = applied[write_error["index"]][0]
+                result.update(ok=False, error=write_error["errmsg"])
+        succeeded = [(result, document) for result, _, document in applied if result["ok"]]
+        await sync_ledger(
+            source, user_id,
+            [document for _, document in succeeded if document is not None],
+            [result["id"] for result, document in succeeded if document is None],
+        )
+
+    counts = {"create": 0, "update": 0, "delete": 0}
+    for result in results:
+        if result["ok"]:
+            counts[result["op"]] += 1
+    if not any(counts.values()):
+        request.state.read_only = True  # Nothing was written: keep the data version
+    return {
+        "created": counts["create"],
+        "updated": counts["update"],
+        "deleted": counts["delete"],
+        "failed": sum(1 for result in results if not result["ok"]),
+        "results": results,
+    }
+
 # ============ Sales Routes ============
 
 @api_router.get("/sales", response_model=List[Sale])
 async def get_sales(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(conditional_get),
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     category_id: Optional[str] = None,
@@ -718,20 +2410,15 @@ async def get_sales(
     source: Optional[str] = None,
     min_amount: Optional[float] = None,
     max_amount: Optional[float] = None,
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    search_mode: str = "substring"  # "substring" (anywhere in the text) or "indexed" (token prefix, by relevance)
 ):
     """Get sales with optional filters"""
     query = {"user_id": current_user["id"]}
     
     # Date range filter
     if date_from or date_to:
-        date_filter = {}
-        if date_from:
-            date_filter["$gte"] = date_from
-        if date_to:
-            date_filter["$lte"] = date_to
-        if date_filter:
-            query["date"] = date_filter
+        query.update(date_range_filter(date_from, date_to))
     
     # Category filter
     if category_id:
@@ -755,12 +2442,8 @@ async def get_sales(
         if amount_filter:
             query["amount"] = amount_filter
     
-    # Description search (case-insensitive)
-    if description:
-        query["description"] = {"$regex": description, "$options": "i"}
-    
-    sales = await db.sales.find(query, {"_id": 0}).sort("date", -1).to_list(10000)
-    return sales
+    sales = await find_with_description_search(db.sales, query, description, search_mode, SALE_PROJECTION)
+    return SALE_PROJECTION.response(sales)
 
 @api_router.post("/sales", response_model=Sale)
 async def create_sale(sale_data: SaleCreate, current_user: dict = Depends(get_current_user)):
@@ -773,7 +2456,9 @@ async def create_sale(sale_data: SaleCreate, current_user: dict = Depends(get_cu
         description=sale_data.description,
         source="manual"
     )
-    await db.sales.insert_one(sale.model_dump())
+    sale_dict = with_search_tokens(sale.model_dump())
+    await db.sales.insert_one(sale_dict)
+    await sync_ledger("sales", current_user["id"], [sale_dict])
     return sale
 
 @api_router.put("/sales/{sale_id}", response_model=Sale)
@@ -784,10 +2469,11 @@ async def update_sale(sale_id: str, sale_data: SaleCreate, current_user: dict =
     
     await db.sales.update_one(
         {"id": sale_id, "user_id": current_user["id"]},
-        {"$set": sale_data.model_dump()}
+        {"$set": with_search_tokens(with_days(with_cents(sale_data.model_dump())))}
     )
     
     updated = await db.sales.find_one({"id": sale_id}, {"_id": 0})
+    await sync_ledger("sales", current_user["id"], [updated])
     return updated
 
 @api_router.delete("/sales/{sale_id}")
@@ -795,34 +2481,53 @@ async def delete_sale(sale_id: str, current_user: dict = Depends(get_current_use
     result = await db.sales.delete_one({"id": sale_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Sale not found")
+    await delete_ledger_entries("sales", [sale_id])
     return {"message": "Sale deleted successfully"}
 
+def parse_sales_csv(text: str, user_id: str, location_id: Optional[str]) -> List[dict]:
+    """Sale documents for every row of an uploaded sales CSV"""
+    import pandas as pd
+
+    df = pd.read_csv(io.StringIO(text))
+    
+    # Expected columns: date, amount, category_id, payment_method, description
+    required_columns = ['date', 'amount', 'category_id', 'payment_method']
+    if not all(col in df.columns for col in required_columns):
+        raise HTTPException(status_code=400, detail=f"CSV must contain columns: {', '.join(required_columns)}")
+    
+    sales = []
+    for _, row in df.iterrows():
+        sale = Sale(
+            user_id=user_id,
+            location_id=location_id,
+            date=normalize_date(str(row['date'])),
+            amount=float(row['amount']),
+            category_id=str(row['category_id']),
+            payment_method=str(row['payment_method']),
+            description=str(row.get('description', '')),
+            source="csv"
+        )
+        sales.append(with_search_tokens(sale.model_dump()))
+    return sales
+
+@api_router.post("/sales/bulk")
+async def bulk_sales(payload: BulkSales, request: Request, current_user: dict = Depends(get_current_user)):
+    """Create, update and delete many sales at once, with a result per item"""
+    location_id = require_active_location(current_user, "adding sales") if payload.create else None
+    return ORJSONResponse(await apply_bulk(
+        request, "sales", Sale, payload, current_user, {"location_id": location_id, "source": "manual"}
+    ))
+
 @api_router.post("/sales/import-csv")
 async def import_csv_sales(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    location_id = require_active_location(current_user, "importing sales")
     try:
         contents = await file.read()
-        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        
-        # Expected columns: date, amount, category_id, payment_method, description
-        required_columns = ['date', 'amount', 'category_id', 'payment_method']
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"CSV must contain columns: {', '.join(required_columns)}")
-        
-        sales = []
-        for _, row in df.iterrows():
-            sale = Sale(
-                user_id=current_user["id"],
-                date=str(row['date']),
-                amount=float(row['amount']),
-                category_id=str(row['category_id']),
-                payment_method=str(row['payment_method']),
-                description=str(row.get('description', '')),
-                source="csv"
-            )
-            sales.append(sale.model_dump())
+        sales = parse_sales_csv(contents.decode('utf-8'), current_user["id"], location_id)
         
         if sales:
             await db.sales.insert_many(sales)
+            await sync_ledger("sales", current_user["id"], sales)
         
         return {"message": f"Successfully imported {len(sales)} sales", "count": len(sales)}
     except Exception as e:
@@ -833,26 +2538,21 @@ async def import_csv_sales(file: UploadFile = File(...), current_user: dict = De
 
 @api_router.get("/expenses", response_model=List[Expense])
 async def get_expenses(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(conditional_get),
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     category_id: Optional[str] = None,
     min_amount: Optional[float] = None,
     max_amount: Optional[float] = None,
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    search_mode: str = "substring"  # "substring" (anywhere in the text) or "indexed" (token prefix, by relevance)
 ):
     """Get expenses with optional filters"""
     query = {"user_id": current_user["id"]}
     
     # Date range filter
     if date_from or date_to:
-        date_filter = {}
-        if date_from:
-            date_filter["$gte"] = date_from
-        if date_to:
-            date_filter["$lte"] = date_to
-        if date_filter:
-            query["date"] = date_filter
+        query.update(date_range_filter(date_from, date_to))
     
     # Category filter
     if category_id:
@@ -868,12 +2568,16 @@ async def get_expenses(
         if amount_filter:
             query["amount"] = amount_filter
     
-    # Description search (case-insensitive)
-    if description:
-        query["description"] = {"$regex": description, "$options": "i"}
-    
-    expenses = await db.expenses.find(query, {"_id": 0}).sort("date", -1).to_list(10000)
-    return expenses
+    expenses = await find_with_description_search(db.expenses, query, description, search_mode, EXPENSE_PROJECTION)
+    return EXPENSE_PROJECTION.response(expenses)
+
+@api_router.post("/expenses/bulk")
+async def bulk_expenses(payload: BulkExpenses, request: Request, current_user: dict = Depends(get_current_user)):
+    """Create, update and delete many expenses at once, with a result per item"""
+    location_id = require_active_location(current_user, "adding expenses") if payload.create else None
+    return ORJSONResponse(await apply_bulk(
+        request, "expenses", Expense, payload, current_user, {"location_id": location_id}
+    ))
 
 @api_router.post("/expenses", response_model=Expense)
 async def create_expense(expense_data: ExpenseCreate, current_user: dict = Depends(get_current_user)):
@@ -884,7 +2588,9 @@ async def create_expense(expense_data: ExpenseCreate, current_user: dict = Depen
         category_id=expense_data.category_id,
         description=expense_data.description
     )
-    await db.expenses.insert_one(expense.model_dump())
+    expense_dict = with_search_tokens(expense.model_dump())
+    await db.expenses.insert_one(expense_dict)
+    await sync_ledger("expenses", current_user["id"], [expense_dict])
     return expense
 
 @api_router.put("/expenses/{expense_id}", response_model=Expense)
@@ -895,10 +2601,11 @@ async def update_expense(expense_id: str, expense_data: ExpenseCreate, current_u
     
     await db.expenses.update_one(
         {"id": expense_id, "user_id": current_user["id"]},
-        {"$set": expense_data.model_dump()}
+        {"$set": with_search_tokens(with_days(with_cents(expense_data.model_dump())))}
     )
     
     updated = await db.expenses.find_one({"id": expense_id}, {"_id": 0})
+    await sync_ledger("expenses", current_user["id"], [updated])
     return updated
 
 @api_router.delete("/expenses/{expense_id}")
@@ -906,14 +2613,106 @@ async def delete_expense(expense_id: str, current_user: dict = Depends(get_curre
     result = await db.expenses.delete_one({"id": expense_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Expense not found")
+    await delete_ledger_entries("expenses", [expense_id])
     return {"message": "Expense deleted successfully"}
 
+# ============ Activity Feed ============
+# One date-sorted stream over sales, expenses and bank transactions. Each collection
+# is read newest first through its (user_id, date_day, id) index and cut to the page
+# size before $unionWith merges them, so a page never reads more than
+# (page size + 1) documents per collection. Pages are keyset-paginated on
+# (date_day, id): the cursor is the last row shown, not an offset. Rows without a
+# date_day (an unparseable date) have no place on the timeline and are left out;
+# the per-collection listings still show them.
+
+ACTIVITY_KINDS = ("sales", "expenses", "bank_transactions")
+ACTIVITY_MAX_LIMIT = 200
+ACTIVITY_SORT = {"date_day": -1, "id": -1}
+ACTIVITY_PROJECTION = {"_id": 0, "date_day": 1, **{name: 1 for name in ActivityItem.model_fields if name != "kind"}}
+ACTIVITY_DEFAULTS = {name: None for name, field in ActivityItem.model_fields.items() if not field.is_required()}
+
+def encode_activity_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([row["date_day"], row["id"]])).decode()
+
+def decode_activity_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        day, row_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if isinstance(day, int) and isinstance(row_id, str):
+            return day, row_id
+    except (ValueError, TypeError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def activity_pipeline(kinds: List[str], query: dict, limit: int) -> list:
+    """Aggregation over kinds[0] that unions in the other collections, newest first"""
+    def branch(kind):
+        return [
+            {"$match": query},
+            {"$sort": ACTIVITY_SORT},
+            {"$limit": limit},
+            {"$project": {**ACTIVITY_PROJECTION, "kind": {"$literal": kind}}},
+        ]
+
+    pipeline = branch(kinds[0])
+    for kind in kinds[1:]:
+        pipeline.append({"$unionWith": {"coll": kind, "pipeline": branch(kind)}})
+    pipeline += [{"$sort": ACTIVITY_SORT}, {"$limit": limit}]
+    return pipeline
+
+@api_router.get("/activity", response_model=ActivityPage)
+async def get_activity(
+    current_user: dict = Depends(conditional_get),
+    kinds: Optional[str] = None,  # Comma-separated subset of ACTIVITY_KINDS, all by default
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category_id: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """Sales, expenses and bank transactions as one newest-first page"""
+    selected = [kind.strip() for kind in kinds.split(",")] if kinds else list(ACTIVITY_KINDS)
+    if not selected or any(kind not in ACTIVITY_KINDS for kind in selected):
+        raise HTTPException(status_code=400, detail=f"Invalid kinds. Use any of: {', '.join(ACTIVITY_KINDS)}")
+    if not 1 <= limit <= ACTIVITY_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {ACTIVITY_MAX_LIMIT}")
+
+    clauses = [{"user_id": current_user["id"], "date_day": {"$ne": None}}]
+    if date_from or date_to:
+        clauses.append(date_range_filter(date_from, date_to))
+    if category_id:
+        clauses.append({"category_id": category_id})
+    amount_filter = {}
+    if min_amount is not None:
+        amount_filter["$gte"] = min_amount
+    if max_amount is not None:
+        amount_filter["$lte"] = max_amount
+    if amount_filter:
+        clauses.append({"amount": amount_filter})
+    if cursor:
+        day, row_id = decode_activity_cursor(cursor)
+        clauses.append({"$or": [{"date_day": {"$lt": day}}, {"date_day": day, "id": {"$lt": row_id}}]})
+    query = {"$and": clauses} if len(clauses) > 1 else clauses[0]
+
+    # One extra row tells whether there is a next page
+    rows = await db[selected[0]].aggregate(activity_pipeline(selected, query, limit + 1)).to_list(limit + 1)
+    next_cursor = encode_activity_cursor(rows[limit - 1]) if len(rows) > limit else None
+    items = rows[:limit]
+    for row in items:
+        row.pop("date_day", None)
+        for key, value in ACTIVITY_DEFAULTS.items():
+            row.setdefault(key, value)
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
 # ============ Dashboard & Analytics Routes ============
 
 @api_router.get("/debug/cogs")
 async def debug_cogs(current_user: dict = Depends(get_current_user)):
     """Debug endpoint to check COGS calculation"""
     categories = await db.categories.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
+    if await ledger_ready():
+        return await debug_cogs_from_ledger(current_user["id"], categories)
     expenses = await db.expenses.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(10000)
     
     # Get validated bank transactions
@@ -961,15 +2760,128 @@ async def debug_cogs(current_user: dict = Depends(get_current_user)):
         "total_cogs": total_cogs_from_expenses + total_cogs_from_bank
     }
 
+async def debug_cogs_from_ledger(user_id: str, categories: List[dict]) -> dict:
+    """The debug COGS breakdown from the ledger: totals by aggregation, COGS sources by id"""
+    cogs_categories = [cat for cat in categories if cat.get("is_cogs", False)]
+    cat_map = {cat["id"]: cat["name"] for cat in categories}
+    cogs_rows, bank_entries, total_expenses = await asyncio.gather(
+        db.ledger_entries.aggregate([
+            {"$match": {"user_id": user_id, "is_cogs": True}},
+            {"$group": {"_id": "$source", "amount_cents": {"$sum": "$amount_cents"}, "source_ids": {"$push": "$source_id"}}}
+        ]).to_list(None),
+        db.ledger_entries.find(
+            {"user_id": user_id, "source": "bank_transactions"},
+            {"_id": 0, "source_id": 1, "account": 1, "amount_cents": 1, "category_id": 1, "date": 1}
+        ).to_list(10000),
+        db.expenses.count_documents({"user_id": user_id})
+    )
+    cogs = {row["_id"]: row for row in cogs_rows}
+    empty = {"amount_cents": 0, "source_ids": []}
+    expense_cogs = cogs.get("expenses", empty)
+    bank_cogs = cogs.get("bank_transactions", empty)
+    cogs_expenses, cogs_bank_transactions = await asyncio.gather(
+        db.expenses.find({"user_id": user_id, "id": {"$in": expense_cogs["source_ids"]}}, {"_id": 0}).to_list(None),
+        db.bank_transactions.find({"user_id": user_id, "id": {"$in": bank_cogs["source_ids"]}}, {"_id": 0}).to_list(None)
+    )
+    total_cogs_from_expenses = from_cents(-expense_cogs["amount_cents"])
+    total_cogs_from_bank = from_cents(-bank_cogs["amount_cents"])
+    # Validated, categorized transactions are exactly the ones with a ledger entry
+    bank_trans_with_cats = [
+        {
+            "id": entry["source_id"],
+            "date": entry.get("date"),
+            "amount": from_cents(abs(entry["amount_cents"])),
+            "type": "credit" if entry["account"] == "income" else "debit",
+            "category_id": entry["category_id"],
+            "category_name": cat_map.get(entry["category_id"], "Unknown"),
+        }
+        for entry in bank_entries
+    ]
+    return {
+        "source": "ledger",
+        "total_categories": len(categories),
+        "cogs_categories": cogs_categories,
+        "cogs_category_ids": [cat["id"] for cat in cogs_categories],
+        "total_expenses": total_expenses,
+        "cogs_expenses": cogs_expenses,
+        "total_cogs_from_expenses": total_cogs_from_expenses,
+        "total_bank_transactions": len(bank_entries),
+        "bank_transactions_with_categories": bank_trans_with_cats,
+        "cogs_bank_transactions": cogs_bank_transactions,
+        "total_cogs_from_bank": total_cogs_from_bank,
+        "total_cogs": from_cents(-expense_cogs["amount_cents"] - bank_cogs["amount_cents"])
+    }
+
+@api_router.get("/debug/coalescing")
+async def debug_coalescing(current_user: dict = Depends(require_admin)):
+    """Counters for coalesced dashboard requests (Admin only)"""
+    return single_flight.snapshot()
+
+@api_router.get("/debug/summary-index")
+async def debug_summary_index(current_user: dict = Depends(require_admin)):
+    """Memory and hit counters of the dashboard summary index (Admin only)"""
+    return summary_indexes.snapshot()
+
+@api_router.get("/debug/profiles")
+async def list_profiles(current_user: dict = Depends(require_admin)):
+    """List stored request profiles, newest first (Admin only)"""
+    if not PROFILE_DIR.exists():
+        return {"profiles": []}
+    profiles = []
+    for meta_path in sorted(PROFILE_DIR.glob("*.json"), reverse=True):
+        try:
+            profiles.append(orjson.loads(meta_path.read_bytes()))
+        except (OSError, orjson.JSONDecodeError):
+            continue
+    return {"profiles": profiles}
+
+@api_router.get("/debug/profiles/{name}")
+async def get_profile(
+    name: str,
+    format: str = "text",  # "text" (top functions) or "pstats" (raw dump for snakeviz/flameprof)
+    sort: str = "cumulative",
+    limit: int = 40,
+    current_user: dict = Depends(require_admin)
+):
+    """Show or download a stored request profile (Admin only)"""
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", name) or not (PROFILE_DIR / f"{name}.prof").exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    profile_path = PROFILE_DIR / f"{name}.prof"
+
+    if format == "pstats":
+        return FileResponse(profile_path, media_type="application/octet-stream", filename=profile_path.name)
+    if sort not in ("cumulative", "tottime", "calls"):
+        raise HTTPException(status_code=400, detail="Invalid sort. Use 'cumulative', 'tottime' or 'calls'")
+
+    output = io.StringIO()
+    stats = pstats.Stats(str(profile_path), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return PlainTextResponse(output.getvalue())
+
 @api_router.get("/dashboard/summary", response_model=DashboardSummary)
 async def get_dashboard_summary(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(conditional_get)
 ):
-    query = {"user_id": current_user["id"]}
+    return await single_flight.run(
+        coalesce_key(current_user, "dashboard/summary", start_date=start_date, end_date=end_date),
+        lambda: compute_dashboard_summary(current_user, start_date, end_date)
+    )
+
+async def compute_dashboard_summary(user: dict, start_date: Optional[str], end_date: Optional[str]) -> DashboardSummary:
+    if SUMMARY_INDEX:
+        index = await summary_index_for(user)
+        if start_date and end_date:
+            return index.summary(*day_range(start_date, end_date))
+        return index.summary()
+    if await ledger_ready():
+        return await summarize_ledger(user["id"], start_date, end_date)
+    
+    user_id = user["id"]
+    query = {"user_id": user_id}
     if start_date and end_date:
-        query["date"] = {"$gte": start_date, "$lte": end_date}
+        query.update(date_range_filter(start_date, end_date))
     
     # Get all sales and expenses
     sales = await db.sales.find(query, {"_id": 0}).to_list(10000)
@@ -977,49 +2889,93 @@ async def get_dashboard_summary(
     
     # Get validated bank transactions with categories
     bank_query = {
-        "user_id": current_user["id"],
+        "user_id": user_id,
         "validated": True,
         "category_id": {"$ne": None, "$exists": True}
     }
     if start_date and end_date:
-        bank_query["date"] = {"$gte": start_date, "$lte": end_date}
+        bank_query.update(date_range_filter(start_date, end_date))
     
     bank_transactions = await db.bank_transactions.find(bank_query, {"_id": 0}).to_list(10000)
     
     # Get categories for mapping
-    categories = await db.categories.find({"user_id": current_user["id"]}, {"_id": 0}).to_list(1000)
-    cat_map = {cat["id"]: cat["name"] for cat in categories}
-    cogs_categories = {cat["id"] for cat in categories if cat.get("is_cogs", False)}
+    categories = await db.categories.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
     
-    # Calculate totals including bank transactions
-    total_income = sum(sale["amount"] for sale in sales)
-    # Add credit bank transactions to income
-    total_income += sum(
-        trans["amount"] 
-        for trans in bank_transactions 
-        if trans["type"] == "credit"
-    )
-    
-    total_expenses = sum(expense["amount"] for expense in expenses)
-    # Add debit bank transactions to expenses
-    total_expenses += sum(
-        trans["amount"] 
-        for trans in bank_transactions 
-        if trans["type"] == "debit"
+    return summarize_dashboard(sales, expenses, bank_transactions, categories)
+
+async def summarize_ledger(user_id: str, start_date: Optional[str], end_date: Optional[str]) -> DashboardSummary:
+    """Dashboard summary from one aggregation over the ledger"""
+    match = {"user_id": user_id}
+    if start_date and end_date:
+        start_day, end_day = day_range(start_date, end_date)
+        match["date_day"] = {"$gte": start_day, "$lte": end_day}
+    rows, categories = await asyncio.gather(
+        db.ledger_entries.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {"source": "$source", "account": "$account", "category_id": "$category_id",
+                        "payment_method": "$payment_method"},
+                "amount_cents": {"$sum": "$amount_cents"}
+            }}
+        ]).to_list(None),
+        db.categories.find({"user_id": user_id}, {"_id": 0}).to_list(1000)
     )
+    totals = {kind: defaultdict(int) for kind in DASHBOARD_TOTAL_KINDS}
+    for row in rows:
+        for (kind, key), cents in ledger_columns({**row["_id"], "amount_cents": row["amount_cents"]}):
+            totals[kind][key] += cents
+    return summary_from_totals(totals, categories)
+
+def summarize_dashboard(sales: List[dict], expenses: List[dict], bank_transactions: List[dict], categories: List[dict]) -> DashboardSummary:
+    """Dashboard totals over already fetched documents, summed exactly in cents"""
+    totals = {kind: defaultdict(int) for kind in DASHBOARD_TOTAL_KINDS}
+    sale_categories, sale_payments = totals["sale_category"], totals["sale_payment"]
+    expense_categories = totals["expense_category"]
+    for sale in sales:
+        cents = cents_of(sale)
+        sale_categories[sale["category_id"]] += cents
+        sale_payments[sale["payment_method"]] += cents
+    for expense in expenses:
+        expense_categories[expense["category_id"]] += cents_of(expense)
+    for trans in bank_transactions:
+        if trans["type"] in ("credit", "debit"):
+            totals[trans["type"]][trans.get("category_id")] += cents_of(trans)
+    return summary_from_totals(totals, categories)
+
+# Cents by kind and key: sales by category and by payment method, expenses by
+# category, and bank credits/debits by category (None when uncategorized)
+DASHBOARD_TOTAL_KINDS = ("sale_category", "sale_payment", "expense_category", "credit", "debit")
+
+def summary_from_totals(totals: Dict[str, Dict[Any, int]], categories: List[dict]) -> DashboardSummary:
+    """Build the dashboard summary from cents totals keyed as in DASHBOARD_TOTAL_KINDS"""
+    cat_map = {cat["id"]: cat["name"] for cat in categories}
+    cogs_categories = {cat["id"] for cat in categories if cat.get("is_cogs", False)}
     
-    # Calculate COGS (from expenses and bank transactions)
-    total_cogs = sum(
-        expense["amount"] 
-        for expense in expenses 
-        if expense["category_id"] in cogs_categories
-    )
-    # Add COGS from bank transactions
-    total_cogs += sum(
-        trans["amount"]
-        for trans in bank_transactions
-        if trans["type"] == "debit" and trans.get("category_id") in cogs_categories
-    )
+    income_by_category = defaultdict(int)
+    for category_id, cents in totals["sale_category"].items():
+        income_by_category[cat_map.get(category_id, "Unknown")] += cents
+    sales_by_payment = {method: cents for method, cents in totals["sale_payment"].items() if cents}
+    
+    expenses_by_category = defaultdict(int)
+    total_cogs = 0
+    for category_id, cents in totals["expense_category"].items():
+        expenses_by_category[cat_map.get(category_id, "Unknown")] += cents
+        if category_id in cogs_categories:
+            total_cogs += cents
+    
+    # Credit bank transactions count as income, debits as expenses (and COGS when categorized so)
+    total_income = sum(totals["sale_category"].values())
+    total_expenses = sum(totals["expense_category"].values())
+    for category_id, cents in totals["credit"].items():
+        total_income += cents
+        if category_id:
+            income_by_category[cat_map.get(category_id, "Transacciones Bancarias")] += cents
+    for category_id, cents in totals["debit"].items():
+        total_expenses += cents
+        if category_id:
+            expenses_by_category[cat_map.get(category_id, "Transacciones Bancarias")] += cents
+        if category_id in cogs_categories:
+            total_cogs += cents
     
     # Calculate metrics
     # % COGS = (Gastos COGS / Ingresos Sales) × 100
@@ -1027,94 +2983,296 @@ async def get_dashboard_summary(
     gross_profit = total_income - total_cogs
     gross_margin = (gross_profit / total_income * 100) if total_income > 0 else 0
     
-    # Group by category
-    income_by_category = defaultdict(float)
-    for sale in sales:
-        cat_name = cat_map.get(sale["category_id"], "Unknown")
-        income_by_category[cat_name] += sale["amount"]
-    
-    # Add bank transactions to income by category
-    for trans in bank_transactions:
-        if trans["type"] == "credit" and trans.get("category_id"):
-            cat_name = cat_map.get(trans["category_id"], "Transacciones Bancarias")
-            income_by_category[cat_name] += trans["amount"]
-    
-    expenses_by_category = defaultdict(float)
-    for expense in expenses:
-        cat_name = cat_map.get(expense["category_id"], "Unknown")
-        expenses_by_category[cat_name] += expense["amount"]
-    
-    # Add bank transactions to expenses by category
-    for trans in bank_transactions:
-        if trans["type"] == "debit" and trans.get("category_id"):
-            cat_name = cat_map.get(trans["category_id"], "Transacciones Bancarias")
-            expenses_by_category[cat_name] += trans["amount"]
-    
-    # Group by payment method
-    sales_by_payment = defaultdict(float)
-    for sale in sales:
-        sales_by_payment[sale["payment_method"]] += sale["amount"]
-    
     return DashboardSummary(
-        total_income=total_income,
-        total_expenses=total_expenses,
-        net_profit=total_income - total_expenses,
-        total_cogs=total_cogs,
+        total_income=from_cents(total_income),
+        total_expenses=from_cents(total_expenses),
+        net_profit=from_cents(total_income - total_expenses),
+        total_cogs=from_cents(total_cogs),
         cogs_percentage=cogs_percentage,
-        gross_profit=gross_profit,
+        gross_profit=from_cents(gross_profit),
         gross_margin=gross_margin,
-        income_by_category=dict(income_by_category),
-        expenses_by_category=dict(expenses_by_category),
-        sales_by_payment=dict(sales_by_payment)
+        income_by_category={name: from_cents(cents) for name, cents in income_by_category.items() if cents},
+        expenses_by_category={name: from_cents(cents) for name, cents in expenses_by_category.items() if cents},
+        sales_by_payment={method: from_cents(cents) for method, cents in sales_by_payment.items()}
+    )
+
+# ============ Summary Index ============
+# Per-user columnar cache behind the dashboard summary. Each (kind, key) total of
+# DASHBOARD_TOTAL_KINDS is a row of daily cents stored as prefix sums over the days that
+# have entries, so the totals for any date range are two binary searches and two column
+# reads, and a stray far-off date costs one column rather than every day in between. Built lazily from the database, dropped on the
+# user's next write (or when another worker's write changes their data version), and
+# kept in an LRU bounded by array memory.
+#
+# Built indexes are also written as snapshots under SUMMARY_SNAPSHOT_DIR: the arrays as
+# an .npy that every worker memory-maps read-only (one copy in the page cache, however
+# many workers) and a JSON sidecar with the columns and the data version they reflect.
+
+SUMMARY_INDEX = os.environ.get('SUMMARY_INDEX', 'true').lower() == 'true'
+SUMMARY_INDEX_MAX_BYTES = int(os.environ.get('SUMMARY_INDEX_MAX_BYTES', str(64 * 1024 * 1024)))
+# Local directory shared by the workers of one host; empty disables snapshots
+SUMMARY_SNAPSHOT_DIR = os.environ.get('SUMMARY_SNAPSHOT_DIR', '/tmp/pl_summary_snapshots')
+SUMMARY_SNAPSHOT_FORMAT = 2
+
+class SummaryIndex:
+    """Prefix sums of daily cents per column over the sorted days that have entries."""
+
+    def __init__(self, data_version: int, columns: List[Tuple[str, Any]], days, prefix, undated, categories: List[dict]):
+        self.data_version = data_version
+        self.columns = columns
+        self.days = days  # int64 (n,): distinct dated days, ascending
+        self.prefix = prefix  # int64 (columns, n + 1); prefix[:, i] = total before day days[i]
+        self.undated = undated  # int64 (columns,): documents without a parseable date, all-time only
+        self.categories = categories
+
+    @property
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.prefix.nbytes + self.undated.nbytes
+
+    def totals(self, start_day: Optional[int] = None, end_day: Optional[int] = None):
+        """Column totals for start_day <= day <= end_day, or all time when both are None"""
+        if start_day is None and end_day is None:
+            return self.prefix[:, -1] + self.undated
+        start = int(self.days.searchsorted(start_day, "left"))
+        end = max(int(self.days.searchsorted(end_day, "right")), start)
+        return self.prefix[:, end] - self.prefix[:, start]
+
+    def summary(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> DashboardSummary:
+        totals = {kind: {} for kind in DASHBOARD_TOTAL_KINDS}
+        for (kind, key), cents in zip(self.columns, self.totals(start_day, end_day).tolist()):
+            totals[kind][key] = cents
+        return summary_from_totals(totals, self.categories)
+
+    def period_totals(self, periods: List[Period]) -> List[Tuple[int, int]]:
+        """(income, expenses) in cents per consecutive period, as bucket_period_totals"""
+        bounds = [period.start_day for period in periods] + [periods[-1].end_day + 1]
+        columns = self.days.searchsorted(bounds, "left")
+        per_period = self.prefix[:, columns[1:]] - self.prefix[:, columns[:-1]]
+        kinds = [kind for kind, _ in self.columns]
+        income = [row for row, kind in enumerate(kinds) if kind in ("sale_category", "credit")]
+        expense = [row for row, kind in enumerate(kinds) if kind in ("expense_category", "debit")]
+        return list(zip(
+            per_period[income].sum(axis=0).tolist() if income else [0] * len(periods),
+            per_period[expense].sum(axis=0).tolist() if expense else [0] * len(periods)
+        ))
+
+def build_summary_index(data_version: int, entries: List[dict], categories: List[dict]) -> SummaryIndex:
+    """Index over ledger entries (from db.ledger_entries or ledger_entries_from)"""
+    import numpy as np
+    
+    column_index: Dict[Tuple[str, Any], int] = {}
+    rows, days, amounts = [], [], []
+    for entry in entries:
+        day = entry.get("date_day")
+        for column, cents in ledger_columns(entry):
+            rows.append(column_index.setdefault(column, len(column_index)))
+            days.append(day)
+            amounts.append(cents)
+    
+    dated = [day is not None for day in days]
+    distinct_days, day_positions = np.unique(
+        np.array([day for day in days if day is not None], dtype=np.int64), return_inverse=True
+    )
+    
+    rows_array = np.array(rows, dtype=np.int64)
+    amounts_array = np.array(amounts, dtype=np.int64)
+    dated_mask = np.array(dated, dtype=bool)
+    daily = np.zeros((len(column_index), len(distinct_days)), dtype=np.int64)
+    np.add.at(daily, (rows_array[dated_mask], day_positions), amounts_array[dated_mask])
+    prefix = np.zeros((len(column_index), len(distinct_days) + 1), dtype=np.int64)
+    np.cumsum(daily, axis=1, out=prefix[:, 1:])
+    undated = np.zeros(len(column_index), dtype=np.int64)
+    np.add.at(undated, rows_array[~dated_mask], amounts_array[~dated_mask])
+    
+    return SummaryIndex(data_version, list(column_index), distinct_days, prefix, undated, categories)
+
+class SummaryIndexCache:
+    """LRU of per-user SummaryIndex entries, bounded by the bytes of their arrays"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, SummaryIndex]" = OrderedDict()
+        self.nbytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, user_id: str, data_version: int) -> Optional[SummaryIndex]:
+        entry = self.entries.get(user_id)
+        if entry is not None and entry.data_version == data_version:
+            self.entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry
+        self.discard(user_id)  # Missing or built before a write
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, user_id: str, entry: SummaryIndex):
+        self.discard(user_id)
+        if entry.nbytes > self.max_bytes:
+            return
+        self.entries[user_id] = entry
+        self.nbytes += entry.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.stats["evictions"] += 1
+
+    def discard(self, user_id: str):
+        entry = self.entries.pop(user_id, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"users": len(self.entries), "bytes": self.nbytes, "max_bytes": self.max_bytes, **self.stats}
+
+summary_indexes = SummaryIndexCache(SUMMARY_INDEX_MAX_BYTES)
+
+def summary_snapshot_dir(user_id: str) -> Path:
+    return Path(SUMMARY_SNAPSHOT_DIR) / db.name / user_id
+
+def write_summary_snapshot(user_id: str, index: SummaryIndex):
+    """Write the index for other workers: arrays first, then the sidecar that makes it visible.
+
+    Both files are renamed into place, so readers never see a partial snapshot.
+    Snapshots of older data versions are removed; workers that mapped one keep
+    reading it until they notice the new version.
+    """
+    import numpy as np
+    
+    directory = summary_snapshot_dir(user_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = str(index.data_version)
+    temp = f".{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    
+    # One (columns, days + 2) array: the prefix sums, then the undated totals
+    with open(directory / f"{stem}.npy{temp}", "wb") as array_file:
+        np.save(array_file, np.column_stack([index.prefix, index.undated]))
+    os.replace(directory / f"{stem}.npy{temp}", directory / f"{stem}.npy")
+    with open(directory / f"{stem}.days.npy{temp}", "wb") as days_file:
+        np.save(days_file, index.days)
+    os.replace(directory / f"{stem}.days.npy{temp}", directory / f"{stem}.days.npy")
+    (directory / f"{stem}.json{temp}").write_bytes(orjson.dumps({
+        "format": SUMMARY_SNAPSHOT_FORMAT,
+        "data_version": index.data_version,
+        "columns": index.columns,
+        "categories": index.categories,
+    }))
+    os.replace(directory / f"{stem}.json{temp}", directory / f"{stem}.json")
+    
+    for path in directory.iterdir():
+        version = path.name.split(".")[0]
+        if version.isdigit() and int(version) < index.data_version:
+            path.unlink(missing_ok=True)
+
+def load_summary_snapshot(user_id: str, data_version: int) -> Optional[SummaryIndex]:
+    """Map the snapshot for exactly this data version read-only, if one exists"""
+    import numpy as np
+    
+    directory = summary_snapshot_dir(user_id)
+    try:
+        meta = orjson.loads((directory / f"{data_version}.json").read_bytes())
+        if meta["format"] != SUMMARY_SNAPSHOT_FORMAT or meta["data_version"] != data_version:
+            return None
+        arrays = np.load(directory / f"{data_version}.npy", mmap_mode="r")
+        days = np.load(directory / f"{data_version}.days.npy", mmap_mode="r")
+    except (OSError, ValueError, KeyError):  # Missing, removed meanwhile or unreadable
+        return None
+    return SummaryIndex(
+        data_version, [tuple(column) for column in meta["columns"]], days,
+        arrays[:, :-1], arrays[:, -1], meta["categories"]
+    )
+
+async def cached_summary_index(user: dict) -> Optional[SummaryIndex]:
+    """The user's index from this worker's cache or a shared snapshot, without querying Mongo"""
+    data_version = user.get("data_version", 0)
+    index = summary_indexes.get(user["id"], data_version)
+    if index is None and SUMMARY_SNAPSHOT_DIR:
+        index = await run_in_threadpool(load_summary_snapshot, user["id"], data_version)
+        if index is not None:
+            summary_indexes.put(user["id"], index)
+    return index
+
+async def summary_index_for(user: dict) -> SummaryIndex:
+    """The user's summary index, (re)built from the database when missing or stale"""
+    index = await cached_summary_index(user)
+    if index is not None:
+        return index
+    data_version = user.get("data_version", 0)
+    
+    async def build() -> SummaryIndex:
+        entries_query = query_ledger_entries(user["id"]) if await ledger_ready() else query_source_entries(user["id"])
+        entries, categories = await asyncio.gather(
+            entries_query,
+            db.categories.find({"user_id": user["id"]}, {"_id": 0}).to_list(1000)
+        )
+        index = await run_in_threadpool(build_summary_index, data_version, entries, categories)
+        summary_indexes.put(user["id"], index)
+        if SUMMARY_SNAPSHOT_DIR:
+            try:
+                await run_in_threadpool(write_summary_snapshot, user["id"], index)
+            except OSError as e:
+                logger.warning(f"Could not write summary snapshot: {str(e)}")
+        return index
+    
+    # Concurrent range changes from the same user share one build
+    return await single_flight.run((user["id"], "summary-index", (), data_version), build)
+
+async def query_ledger_entries(user_id: str) -> List[dict]:
+    return await db.ledger_entries.find({"user_id": user_id}, {
+        "_id": 0, "source": 1, "account": 1, "amount_cents": 1, "category_id": 1, "payment_method": 1, "date_day": 1
+    }).to_list(None)
+
+async def query_source_entries(user_id: str) -> List[dict]:
+    """Ledger entries built from the source collections, before the ledger is backfilled"""
+    projection = {"_id": 0, "id": 1, "user_id": 1, "date": 1, "date_day": 1, "amount": 1, "amount_cents": 1, "category_id": 1}
+    sales, expenses, bank_transactions = await asyncio.gather(
+        db.sales.find({"user_id": user_id}, {**projection, "payment_method": 1}).to_list(None),
+        db.expenses.find({"user_id": user_id}, projection).to_list(None),
+        db.bank_transactions.find({
+            "user_id": user_id,
+            "validated": True,
+            "category_id": {"$ne": None, "$exists": True}
+        }, {**projection, "type": 1, "validated": 1}).to_list(None)
     )
+    return ledger_entries_from(sales, expenses, bank_transactions)
+
+def day_range(start_date: str, end_date: str) -> Tuple[int, int]:
+    """Day numbers for inclusive ISO bounds; 400 on an invalid date"""
+    days = []
+    for value in (start_date, end_date):
+        day = to_epoch_day(value)
+        if day is None:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+        days.append(day)
+    return days[0], days[1]
 
 @api_router.get("/dashboard/comparison", response_model=List[MonthComparison])
 async def get_month_comparison(
-    months: int = 12,
-    current_user: dict = Depends(get_current_user)
+    months: int = 12,  # Number of periods
+    period: str = "month",  # day, week, month, quarter, year, fiscal_year
+    current_user: dict = Depends(conditional_get)
 ):
-    comparisons = []
+    if not 1 <= months <= 400:
+        raise HTTPException(status_code=400, detail="months must be between 1 and 400")
+    return await single_flight.run(
+        coalesce_key(current_user, "dashboard/comparison", months=months, period=period),
+        lambda: compute_month_comparison(current_user, months, period)
+    )
+
+async def compute_month_comparison(user: dict, months: int, granularity: str = "month") -> List[MonthComparison]:
+    """Totals for the last `months` periods, newest first.
+
+    Read from the shared summary index when one is current, else one query per collection.
+    """
+    periods = last_periods(granularity, months, local_today(user), user.get("fiscal_year_start_month", 1))
+    index = await cached_summary_index(user) if SUMMARY_INDEX else None
+    if index is not None:
+        totals = index.period_totals(periods)
+    else:
+        totals = await query_period_totals(user["id"], periods)
     
-    for i in range(months - 1, -1, -1):
-        # Calculate month start and end
-        now = datetime.now(timezone.utc)
-        target_date = now - timedelta(days=30 * i)
-        month_start = target_date.replace(day=1).strftime("%Y-%m-%d")
-        
-        # Get next month for end date
-        if target_date.month == 12:
-            next_month = target_date.replace(year=target_date.year + 1, month=1, day=1)
-        else:
-            next_month = target_date.replace(month=target_date.month + 1, day=1)
-        month_end = (next_month - timedelta(days=1)).strftime("%Y-%m-%d")
-        
-        # Query sales and expenses
-        sales = await db.sales.find({
-            "user_id": current_user["id"],
-            "date": {"$gte": month_start, "$lte": month_end}
-        }, {"_id": 0}).to_list(10000)
-        
-        expenses = await db.expenses.find({
-            "user_id": current_user["id"],
-            "date": {"$gte": month_start, "$lte": month_end}
-        }, {"_id": 0}).to_list(10000)
-        
-        # Include validated bank transactions
-        bank_transactions = await db.bank_transactions.find({
-            "user_id": current_user["id"],
-            "validated": True,
-            "category_id": {"$ne": None, "$exists": True},
-            "date": {"$gte": month_start, "$lte": month_end}
-        }, {"_id": 0}).to_list(10000)
-        
-        income = sum(sale["amount"] for sale in sales)
-        # Add credit bank transactions
-        income += sum(trans["amount"] for trans in bank_transactions if trans["type"] == "credit")
-        
-        expense_total = sum(expense["amount"] for expense in expenses)
-        # Add debit bank transactions
-        expense_total += sum(trans["amount"] for trans in bank_transactions if trans["type"] == "debit")
-        profit = income - expense_total
+    comparisons = []
+    for period, (income_cents, expense_cents) in zip(periods, totals):
+        profit = from_cents(income_cents - expense_cents)
         
         # Calculate growth percentage
         growth_percentage = None
@@ -1124,37 +3282,87 @@ async def get_month_comparison(
                 growth_percentage = ((profit - prev_profit) / abs(prev_profit)) * 100
         
         comparisons.append(MonthComparison(
-            month=target_date.strftime("%Y-%m"),
-            income=income,
-            expenses=expense_total,
+            month=period.label,
+            start_date=period.start,
+            end_date=period.end,
+            income=from_cents(income_cents),
+            expenses=from_cents(expense_cents),
             profit=profit,
             growth_percentage=growth_percentage
         ))
     
     return list(reversed(comparisons))
 
+async def query_period_totals(user_id: str, periods: List[Period]) -> List[Tuple[int, int]]:
+    """Period totals from one ledger aggregation, or one query per source collection before
+    the ledger is backfilled"""
+    if await ledger_ready():
+        rows = await db.ledger_entries.aggregate([
+            {"$match": {"user_id": user_id, "date_day": {"$gte": periods[0].start_day, "$lte": periods[-1].end_day}}},
+            {"$group": {"_id": {"day": "$date_day", "account": "$account"}, "amount_cents": {"$sum": "$amount_cents"}}}
+        ]).to_list(None)
+        starts = [period.start_day for period in periods]
+        income, expense_totals = [0] * len(periods), [0] * len(periods)
+        for row in rows:
+            index = bisect_right(starts, row["_id"]["day"]) - 1
+            if row["_id"]["account"] == "income":
+                income[index] += row["amount_cents"]
+            else:
+                expense_totals[index] -= row["amount_cents"]
+        return list(zip(income, expense_totals))
+    
+    date_filter = date_range_filter(periods[0].start, periods[-1].end)
+    sales, expenses, bank_transactions = await asyncio.gather(
+        daily_totals(db.sales, {"user_id": user_id, **date_filter}),
+        daily_totals(db.expenses, {"user_id": user_id, **date_filter}),
+        # Include validated bank transactions
+        daily_totals(db.bank_transactions, {
+            "user_id": user_id,
+            "validated": True,
+            "category_id": {"$ne": None, "$exists": True},
+            **date_filter
+        }, by_type=True)
+    )
+    return bucket_period_totals(periods, sales, expenses, bank_transactions)
+
+async def daily_totals(collection, match: dict, by_type: bool = False) -> List[dict]:
+    """Per-day amount_cents sums, shaped like the documents bucket_period_totals reads.
+
+    Grouped in Mongo so a long history doesn't come back document by document. Documents
+    not yet backfilled are grouped by their date string and amount, and converted here.
+    """
+    def unless_stored(derived: str, raw: str) -> dict:
+        return {"$cond": [{"$eq": [{"$ifNull": [f"${derived}", None]}, None]}, f"${raw}", None]}
+
+    key = {"day": "$date_day", "date": unless_stored("date_day", "date"), "amount": unless_stored("amount_cents", "amount")}
+    if by_type:
+        key["type"] = "$type"
+    rows = await collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": key, "amount_cents": {"$sum": "$amount_cents"}, "count": {"$sum": 1}}}
+    ]).to_list(None)
+    totals = []
+    for row in rows:
+        group = row["_id"]
+        cents = row["amount_cents"]
+        if group.get("amount") is not None:
+            cents += to_cents(group["amount"]) * row["count"]
+        totals.append({"date_day": group.get("day"), "date": group.get("date"), "type": group.get("type"),
+                       "amount_cents": cents})
+    return totals
+
 @api_router.get("/analytics/report")
 async def get_analytics_report(
-    filter_type: str = "month",  # week, month, quarter, year, custom
+    filter_type: str = "month",  # week, month, quarter, year, fiscal_year, custom
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(conditional_get)
 ):
-    now = datetime.now(timezone.utc)
-    
-    if filter_type == "week":
-        start = (now - timedelta(days=7)).strftime("%Y-%m-%d")
-        end = now.strftime("%Y-%m-%d")
-    elif filter_type == "month":
-        start = now.replace(day=1).strftime("%Y-%m-%d")
-        end = now.strftime("%Y-%m-%d")
-    elif filter_type == "quarter":
-        quarter_month = ((now.month - 1) // 3) * 3 + 1
-        start = now.replace(month=quarter_month, day=1).strftime("%Y-%m-%d")
-        end = now.strftime("%Y-%m-%d")
-    elif filter_type == "year":
-        start = now.replace(month=1, day=1).strftime("%Y-%m-%d")
-        end = now.strftime("%Y-%m-%d")
+    if filter_type in ("week", "month", "quarter", "year", "fiscal_year"):
+        # The current period to date, in the user's calendar
+        today = local_today(current_user)
+        start = period_start(today, filter_type, current_user.get("fiscal_year_start_month", 1)).isoformat()
+        end = today.isoformat()
     elif filter_type == "custom":
         if not start_date or not end_date:
             raise HTTPException(status_code=400, detail="start_date and end_date required for custom filter")
@@ -1176,9 +3384,11 @@ async def get_analytics_report(
 # ============ Bank Reconciliation Routes ============
 
 @api_router.get("/checks", response_model=List[Check])
-async def get_checks(current_user: dict = Depends(get_current_user)):
-    checks = await db.checks.find({" user_id": current_user["id"]}, {"_id": 0}).sort("date_issued", -1).to_list(10000)
-    return checks
+async def get_checks(current_user: dict = Depends(conditional_get)):
+    checks = await db.checks.find(
+        {"user_id": current_user["id"]}, CHECK_PROJECTION.projection
+    ).sort("date_issued", -1).to_list(10000)
+    return CHECK_PROJECTION.response(checks)
 
 @api_router.post("/checks", response_model=Check)
 async def create_check(check_data: CheckCreate, current_user: dict = Depends(get_current_user)):
@@ -1202,7 +3412,7 @@ async def update_check(check_id: str, check_data: CheckCreate, current_user: dic
     
     await db.checks.update_one(
         {"id": check_id, "user_id": current_user["id"]},
-        {"$set": check_data.model_dump()}
+        {"$set": with_days(with_cents(check_data.model_dump()), DATE_FIELDS["checks"])}
     )
     
     updated = await db.checks.find_one({"id": check_id}, {"_id": 0})
@@ -1229,9 +3439,11 @@ async def cancel_check(check_id: str, current_user: dict = Depends(get_current_u
 
 # Bank Transactions
 @api_router.get("/bank-transactions", response_model=List[BankTransaction])
-async def get_bank_transactions(current_user: dict = Depends(get_current_user)):
-    transactions = await db.bank_transactions.find({"user_id": current_user["id"]}, {"_id": 0}).sort("date", -1).to_list(10000)
-    return transactions
+async def get_bank_transactions(current_user: dict = Depends(conditional_get)):
+    transactions = await db.bank_transactions.find(
+        {"user_id": current_user["id"]}, BANK_TRANSACTION_PROJECTION.projection
+    ).sort("date", -1).to_list(10000)
+    return BANK_TRANSACTION_PROJECTION.response(transactions)
 
 @api_router.post("/bank-transactions", response_model=BankTransaction)
 async def create_bank_transaction(transaction_data: BankTransactionCreate, current_user: dict = Depends(get_current_user)):
@@ -1257,7 +3469,7 @@ async def update_bank_transaction(
     if not existing:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    update_data = {k: v for k, v in transaction_data.model_dump().items() if v is not None}
+    update_data = with_days(with_cents({k: v for k, v in transaction_data.model_dump().items() if v is not None}))
     
     if update_data:
         await db.bank_transactions.update_one(
@@ -1266,6 +3478,7 @@ async def update_bank_transaction(
         )
     
     updated = await db.bank_transactions.find_one({"id": transaction_id}, {"_id": 0})
+    await sync_ledger("bank_transactions", current_user["id"], [updated])
     return updated
 
 @api_router.delete("/bank-transactions/{transaction_id}")
@@ -1273,6 +3486,7 @@ async def delete_bank_transaction(transaction_id: str, current_user: dict = Depe
     result = await db.bank_transactions.delete_one({"id": transaction_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    await delete_ledger_entries("bank_transactions", [transaction_id])
     return {"message": "Transaction deleted successfully"}
 
 @api_router.post("/bank-transactions/{transaction_id}/validate")
@@ -1299,9 +3513,94 @@ async def validate_bank_transaction(
         {"id": transaction_id},
         {"$set": update_data}
     )
+    await sync_ledger("bank_transactions", current_user["id"], [{**transaction, **update_data}])
     
     return {"message": "Transaction validated successfully"}
 
+BANK_TRANSACTION_TYPES = ("debit", "credit")
+
+def bank_transaction_filter_query(user_id: str, bank_filter: BankTransactionFilter) -> dict:
+    query = {"user_id": user_id}
+    if not bank_filter.include_validated:
+        query["validated"] = {"$ne": True}
+    if bank_filter.statement_id:
+        query["statement_id"] = bank_filter.statement_id
+    if bank_filter.type:
+        query["type"] = bank_filter.type
+    if bank_filter.description:
+        query["description"] = {"$regex": re.escape(bank_filter.description), "$options": "i"}
+    if bank_filter.date_from or bank_filter.date_to:
+        query.update(date_range_filter(bank_filter.date_from, bank_filter.date_to))
+    return query
+
+@api_router.post("/bank-transactions/bulk-validate")
+async def bulk_validate_bank_transactions(
+    payload: BulkBankValidation,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Validate and categorize many bank transactions in one write (e.g. a whole statement)"""
+    user_id = current_user["id"]
+    if bool(payload.transactions) == (payload.filter is not None):
+        raise HTTPException(status_code=400, detail="Send either transactions or a filter with a category_id")
+    if payload.filter is not None and not payload.category_id:
+        raise HTTPException(status_code=400, detail="A filter needs the category_id to apply")
+    if len(payload.transactions) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ITEMS} items")
+
+    errors, updates = [], {}  # transaction id -> $set
+    if payload.filter is not None:
+        query = bank_transaction_filter_query(user_id, payload.filter)
+        transactions = await db.bank_transactions.find(query, {"_id": 0}).to_list(MAX_BULK_ITEMS + 1)
+        if len(transactions) > MAX_BULK_ITEMS:
+            raise HTTPException(
+                status_code=400, detail=f"The filter matches more than {MAX_BULK_ITEMS} transactions, narrow it down"
+            )
+        existing = {transaction["id"]: transaction for transaction in transactions}
+        updates = {transaction_id: {"validated": True, "category_id": payload.category_id} for transaction_id in existing}
+    else:
+        ids = list({item.id for item in payload.transactions})
+        transactions = await db.bank_transactions.find({"user_id": user_id, "id": {"$in": ids}}, {"_id": 0}).to_list(None)
+        existing = {transaction["id"]: transaction for transaction in transactions}
+        for item in payload.transactions:
+            if item.id not in existing:
+                error = "Not found"
+            elif item.id in updates:
+                error = "Already validated in this request"
+            elif item.type not in BANK_TRANSACTION_TYPES:
+                error = f"Invalid type: {item.type}"
+            else:
+                error = None
+            if error:
+                errors.append({"id": item.id, "error": error})
+                continue
+            updates[item.id] = {"type": item.type, "validated": True}
+            if item.category_id:
+                updates[item.id]["category_id"] = item.category_id
+
+    if updates:
+        if payload.filter is not None:
+            # Same $set for every match: one UpdateMany over the ids read above
+            operations = [UpdateMany({"user_id": user_id, "id": {"$in": list(updates)}},
+                                     {"$set": {"validated": True, "category_id": payload.category_id}})]
+        else:
+            operations = [UpdateOne({"id": transaction_id, "user_id": user_id}, {"$set": changes})
+                          for transaction_id, changes in updates.items()]
+        await db.bank_transactions.bulk_write(operations, ordered=False)
+        await sync_ledger(
+            "bank_transactions", user_id,
+            [{**existing[transaction_id], **changes} for transaction_id, changes in updates.items()]
+        )
+    else:
+        request.state.read_only = True  # Nothing was written: keep the data version
+
+    return {
+        "matched": len(existing),
+        "validated": len(updates),
+        "failed": len(errors),
+        "errors": errors,
+    }
+
 # Match check with bank transaction
 @api_router.post("/bank-transactions/{transaction_id}/match-check/{check_id}")
 async def match_check_with_transaction(
@@ -1338,6 +3637,35 @@ async def match_check_with_transaction(
     return {"message": "Check matched successfully"}
 
 # Automatic matching
+def match_checks(transactions: List[dict], checks: List[dict]) -> List[Tuple[dict, dict]]:
+    """Pair each unmatched debit with the first pending check it matches.
+
+    A check matches by check number, or by exact amount in cents with an issue date
+    within 7 days. Checks are looked up by number and by cents instead of scanning
+    every check for every transaction.
+    """
+    by_number = defaultdict(list)
+    by_cents = defaultdict(list)
+    issued_days = []
+    for index, check in enumerate(checks):
+        by_number[check["check_number"]].append(index)
+        by_cents[cents_of(check)].append(index)
+        issued_days.append(day_of(check, "date_issued"))
+    
+    pairs = []
+    for transaction in transactions:
+        transaction_day = day_of(transaction)
+        candidates = sorted(by_number.get(transaction.get("check_number"), []) + by_cents.get(cents_of(transaction), []))
+        for index in candidates:
+            check = checks[index]
+            if transaction.get("check_number") == check["check_number"] or (
+                transaction_day is not None and issued_days[index] is not None
+                and abs(transaction_day - issued_days[index]) <= 7
+            ):
+                pairs.append((transaction, check))
+                break
+    return pairs
+
 @api_router.post("/bank-reconciliation/auto-match")
 async def auto_match_checks(current_user: dict = Depends(get_current_user)):
     # Get unmatched transactions
@@ -1354,48 +3682,40 @@ async def auto_match_checks(current_user: dict = Depends(get_current_user)):
     }).to_list(10000)
     
     matched_count = 0
-    for transaction in transactions:
-        for check in checks:
-            # Match by check number or amount + date proximity
-            if transaction.get("check_number") == check["check_number"] or \
-               (abs(transaction["amount"] - check["amount"]) < 0.01 and \
-                abs((datetime.fromisoformat(transaction["date"].replace('Z', '+00:00')) - 
-                     datetime.fromisoformat(check["date_issued"].replace('Z', '+00:00'))).days) <= 7):
-                
-                # Update transaction
-                await db.bank_transactions.update_one(
-                    {"id": transaction["id"]},
-                    {"$set": {"matched_check_id": check["id"]}}
-                )
-                
-                # Update check
-                await db.checks.update_one(
-                    {"id": check["id"]},
-                    {"$set": {
-                        "status": CheckStatus.CLEARED,
-                        "date_cleared": transaction["date"],
-                        "bank_transaction_id": transaction["id"]
-                    }}
-                )
-                
-                matched_count += 1
-                break
+    for transaction, check in match_checks(transactions, checks):
+        # Update transaction
+        await db.bank_transactions.update_one(
+            {"id": transaction["id"]},
+            {"$set": {"matched_check_id": check["id"]}}
+        )
+        
+        # Update check
+        await db.checks.update_one(
+            {"id": check["id"]},
+            {"$set": {
+                "status": CheckStatus.CLEARED,
+                "date_cleared": transaction["date"],
+                "bank_transaction_id": transaction["id"]
+            }}
+        )
+        
+        matched_count += 1
     
     return {"message": f"Matched {matched_count} checks automatically"}
 
 # Reconciliation report
 @api_router.get("/checks/in-transit-report")
-async def get_checks_in_transit_report(current_user: dict = Depends(get_current_user)):
+async def get_checks_in_transit_report(current_user: dict = Depends(conditional_get)):
     """Get detailed report of checks in transit"""
     outstanding_checks = await db.checks.find({
         "user_id": current_user["id"],
         "status": CheckStatus.PENDING
     }, {"_id": 0}).sort("date_issued", 1).to_list(10000)
     
-    total_amount = sum(check["amount"] for check in outstanding_checks)
+    total_amount = from_cents(sum(cents_of(check) for check in outstanding_checks))
     
     # Group by age
-    now = datetime.now(timezone.utc)
+    today = today_epoch_day()
     by_age = {
         "0-7 days": [],
         "8-30 days": [],
@@ -1404,20 +3724,17 @@ async def get_checks_in_transit_report(current_user: dict = Depends(get_current_
     }
     
     for check in outstanding_checks:
-        try:
-            check_date = datetime.fromisoformat(check["date_issued"].replace('Z', '+00:00'))
-            days_old = (now - check_date).days
-            
-            if days_old <= 7:
-                by_age["0-7 days"].append(check)
-            elif days_old <= 30:
-                by_age["8-30 days"].append(check)
-            elif days_old <= 60:
-                by_age["31-60 days"].append(check)
-            else:
-                by_age["60+ days"].append(check)
-        except:
+        issued_day = day_of(check, "date_issued")
+        days_old = today - issued_day if issued_day is not None else 0
+        
+        if days_old <= 7:
             by_age["0-7 days"].append(check)
+        elif days_old <= 30:
+            by_age["8-30 days"].append(check)
+        elif days_old <= 60:
+            by_age["31-60 days"].append(check)
+        else:
+            by_age["60+ days"].append(check)
     
     return {
         "total_checks": len(outstanding_checks),
@@ -1426,7 +3743,7 @@ async def get_checks_in_transit_report(current_user: dict = Depends(get_current_
         "by_age": {
             key: {
                 "count": len(checks),
-                "amount": sum(c["amount"] for c in checks),
+                "amount": from_cents(sum(cents_of(c) for c in checks)),
                 "checks": checks
             }
             for key, checks in by_age.items()
@@ -1436,7 +3753,7 @@ async def get_checks_in_transit_report(current_user: dict = Depends(get_current_
 @api_router.get("/bank-reconciliation/report", response_model=ReconciliationReport)
 async def get_reconciliation_report(
     statement_balance: float,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(conditional_get)
 ):
     # Get outstanding checks (pending)
     outstanding_checks = await db.checks.find({
@@ -1444,7 +3761,7 @@ async def get_reconciliation_report(
         "status": CheckStatus.PENDING
     }, {"_id": 0}).to_list(10000)
     
-    outstanding_checks_total = sum(check["amount"] for check in outstanding_checks)
+    outstanding_checks_total = from_cents(sum(cents_of(check) for check in outstanding_checks))
     
     # Get deposits in transit (sales not yet in bank)
     # For now, we'll use recent sales not matched with bank transactions
@@ -1453,27 +3770,30 @@ async def get_reconciliation_report(
         "payment_method": {"$in": ["Transferencia", "Cheque"]}
     }, {"_id": 0}).to_list(10000)
     
-    bank_transactions = await db.bank_transactions.find({
+    # Simple matching - deposits not in bank yet. Only credits with one of the
+    # candidate amounts are fetched, by exact cents (plus any not yet backfilled).
+    candidates = recent_sales[-20:]  # Last 20 sales
+    deposited = await db.bank_transactions.find({
         "user_id": current_user["id"],
-        "type": "credit"
-    }, {"_id": 0}).to_list(10000)
+        "type": "credit",
+        "$or": [
+            {"amount_cents": {"$in": list({cents_of(sale) for sale in candidates})}},
+            {"amount_cents": {"$exists": False}}
+        ]
+    }, {"_id": 0, "amount": 1, "amount_cents": 1}).to_list(10000)
+    deposited_cents = {cents_of(trans) for trans in deposited}
     
-    # Simple matching - deposits not in bank yet
-    deposits_in_transit = []
-    for sale in recent_sales[-20:]:  # Last 20 sales
-        matched = False
-        for trans in bank_transactions:
-            if abs(float(sale["amount"]) - float(trans["amount"])) < 0.01:
-                matched = True
-                break
-        if not matched:
-            deposits_in_transit.append({
-                "date": sale["date"],
-                "amount": sale["amount"],
-                "description": sale.get("description", "Venta")
-            })
+    deposits_in_transit = [
+        {
+            "date": sale["date"],
+            "amount": sale["amount"],
+            "description": sale.get("description", "Venta")
+        }
+        for sale in candidates
+        if cents_of(sale) not in deposited_cents
+    ]
     
-    deposits_in_transit_total = sum(d["amount"] for d in deposits_in_transit)
+    deposits_in_transit_total = from_cents(sum(cents_of(d) for d in deposits_in_transit))
     
     # Calculate reconciled balance
     # Bank balance + deposits in transit - outstanding checks = Book balance
@@ -1497,20 +3817,24 @@ async def get_reconciliation_report(
     )
 
 # PDF Upload and parse
+def upload_tmp_path(filename: Optional[str], suffix: str = "") -> str:
+    """A /tmp path named after an upload; only the client's base name is kept, behind a uuid"""
+    name = Path(filename or "").name or "upload"
+    return f"/tmp/{uuid.uuid4().hex}_{name}{suffix}"
+
 @api_router.post("/bank-statements/extract-text")
 async def extract_text_from_pdf(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
     """Extract raw text from PDF for manual review"""
+    import pdfplumber
+
     try:
         contents = await file.read()
-        pdf_path = f"/tmp/{file.filename}"
-        with open(pdf_path, "wb") as f:
-            f.write(contents)
         
         all_text = ""
-        with pdfplumber.open(pdf_path) as pdf:
+        with pdfplumber.open(io.BytesIO(contents)) as pdf:
             for page in pdf.pages:
                 text = page.extract_text()
                 all_text += f"=== Página {pdf.pages.index(page) + 1} ===\n{text}\n\n"
@@ -1524,6 +3848,220 @@ async def extract_text_from_pdf(
         logger.error(f"Error extracting text: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error al extraer texto: {str(e)}")
 
+# Statement parsing shared by /bank-statements/upload and /bank-statements/test-parse
+
+STATEMENT_HEADER_MARKERS = (
+    'DATE', 'DESCRIPTION', 'AMOUNT', 'BALANCE', 'DEPOSITS', 'WITHDRAWALS',
+    'FECHA', 'DESCRIPCION', 'MONTO', 'CHECK NUMBER', 'ENDING DAILY',
+    'TRANSACTION HISTORY', 'PAGE', 'BEGINNING BALANCE', 'ENDING BALANCE',
+    'STATEMENT PERIOD', 'ACCOUNT NUMBER'
+)
+STATEMENT_SUBTOTAL_MARKERS = ('TOTAL', 'SUBTOTAL', 'BALANCE', 'CONTINUED', 'PAGE')
+
+# Wells Fargo style: Date [CheckNum] Description Amount
+# Example: 9/15 Zelle to Camargo Elena on 09/12 Ref # Wfct0Z8Q8Z29 550.00
+# Example: 9/10 Purchase authorized on 09/09 Paypal *Streamline 57.00
+# Allow amounts with 0-2 decimal places
+WELLS_FARGO_LINE = re.compile(r'^(\d{1,2}/\d{1,2})\s+(?:(\d+)\s+)?(.+?)\s+([\d,]+(?:\.\d{1,2})?)\s*$')
+WELLS_FARGO_CREDIT_WORDS = (
+    'ZELLE FROM', 'MOBILE DEPOSIT', 'DEPOSIT', 'ATM CASH DEPOSIT',
+    'PAYMENT RECEIVED', 'TRANSFER IN', 'CREDIT'
+)
+
+# Generic layouts, tried in order: (name, pattern, group order)
+STATEMENT_LINE_PATTERNS = [
+    # Example: 09/15/2024 -500.00 CHECK #1234
+    ('Pattern 1: Date Amount Desc',
+     re.compile(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)'), ('date', 'amount', 'description')),
+    # Example: 09/15/2024 Payment to vendor 500.00
+    ('Pattern 2: Date Desc Amount',
+     re.compile(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+(.+?)\s+([-+]?\$?\s*[\d,]+\.?\d{2})$'), ('date', 'description', 'amount')),
+    # Example: CHECK #1234 09/15/2024 500.00
+    ('Pattern 3: Desc Date Amount',
+     re.compile(r'(.+?)\s+(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})$'), ('description', 'date', 'amount')),
+    # Example: 2024-09-15 -500.00 Description
+    ('Pattern 4: ISO Date',
+     re.compile(r'(\d{4}-\d{1,2}-\d{1,2})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)'), ('date', 'amount', 'description')),
+    # Example: 09/15/2024 09/16/2024 Description 500.00 (transaction and posting date)
+    ('Pattern 5: Two dates',
+     re.compile(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+\d{1,2}/\d{1,2}/\d{2,4}\s+(.+?)\s+([-+]?\$?\s*[\d,]+\.?\d{2})$'), ('date', 'description', 'amount')),
+]
+# Keywords that indicate credit (money in) and debit (money out)
+STATEMENT_CREDIT_WORDS = ('DEPOSIT', 'CREDIT', 'DEPOSITO', 'ABONO', 'INGRESO', 'PAYMENT RECEIVED', 'TRANSFER IN')
+STATEMENT_DEBIT_WORDS = ('WITHDRAWAL', 'DEBIT', 'RETIRO', 'CARGO', 'CHECK', 'CHEQUE', 'FEE', 'PAYMENT', 'PURCHASE', 'ATM')
+STATEMENT_CHECK_NUMBER = re.compile(r'CHECK #?(\d+)', re.IGNORECASE)
+STATEMENT_CHECK_NUMBER_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (r'CHECK\s*#?(\d+)', r'CHK\s*#?(\d+)', r'CHEQUE\s*#?(\d+)', r'#(\d{4,})')
+]
+STATEMENT_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y")
+
+def parse_statement_line(line: str, year: Optional[int] = None) -> Optional[dict]:
+    """Match one statement line against the known layouts.
+
+    Returns None for blank, short and header lines. Otherwise returns
+    {"pattern", "groups", "transaction", "rejected"}: pattern is None when no layout
+    matched; transaction holds date/description/amount/type/check_number when the line
+    parsed, else rejected names the reason ("subtotal", "invalid_date", "invalid_amount").
+    Wells Fargo short dates get `year` (default: the current year).
+    """
+    line = line.strip()
+    if not line or len(line) < 10:
+        return None
+    
+    # Skip header lines and page headers
+    line_upper = line.upper()
+    if any(header in line_upper for header in STATEMENT_HEADER_MARKERS):
+        return None
+    
+    result = {"pattern": None, "groups": (), "transaction": None, "rejected": None}
+    
+    wells_fargo_match = WELLS_FARGO_LINE.search(line)
+    if wells_fargo_match:
+        date_short, check_num, description, amount_str = wells_fargo_match.groups()
+        result.update(pattern="Wells Fargo: Date [Check] Desc Amount", groups=wells_fargo_match.groups())
+        
+        # Build full date - assume current year
+        try:
+            date_obj = datetime.strptime(f"{date_short}/{year or datetime.now(timezone.utc).year}", "%m/%d/%Y")
+        except ValueError:
+            result["rejected"] = "invalid_date"
+            return result
+        
+        try:
+            amount = float(amount_str.replace(',', ''))
+        except ValueError:
+            result["rejected"] = "invalid_amount"
+            return result
+        
+        # Determine transaction type from description
+        desc_upper = description.upper()
+        is_deposit = any(word in desc_upper for word in WELLS_FARGO_CREDIT_WORDS)
+        
+        # Extract check number
+        check_number = check_num if check_num else None
+        if not check_number:
+            check_match = STATEMENT_CHECK_NUMBER.search(description)
+            if check_match:
+                check_number = check_match.group(1)
+        
+        result["transaction"] = {
+            "date": date_obj.strftime("%Y-%m-%d"),
+            "description": description.strip()[:200],
+            "amount": amount,
+            "type": "credit" if is_deposit else "debit",
+            "check_number": check_number,
+        }
+        return result
+    
+    for name, pattern, order in STATEMENT_LINE_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            break
+    else:
+        return result
+    
+    result.update(pattern=name, groups=match.groups())
+    fields = dict(zip(order, match.groups()))
+    description = fields["description"].strip()
+    amount_str = fields["amount"]
+    
+    # Skip if description looks like a subtotal or header
+    desc_upper = description.upper()
+    if any(skip in desc_upper for skip in STATEMENT_SUBTOTAL_MARKERS):
+        result["rejected"] = "subtotal"
+        return result
+    
+    amount_clean = amount_str.replace('$', '').replace(',', '').replace(' ', '').strip()
+    is_negative = '-' in amount_clean or '(' in amount_str
+    
+    # Determine type; positive amounts without keywords are assumed to be debits
+    # (most transactions in statements are debits)
+    if is_negative or any(word in desc_upper for word in STATEMENT_DEBIT_WORDS):
+        trans_type = "debit"
+    elif any(word in desc_upper for word in STATEMENT_CREDIT_WORDS):
+        trans_type = "credit"
+    else:
+        trans_type = "debit"
+    
+    try:
+        amount = abs(float(amount_clean.replace('-', '').replace('(', '').replace(')', '')))
+    except ValueError:
+        result["rejected"] = "invalid_amount"
+        return result
+    
+    check_number = None
+    for check_pattern in STATEMENT_CHECK_NUMBER_PATTERNS:
+        check_match = check_pattern.search(description)
+        if check_match:
+            check_number = check_match.group(1)
+            break
+    
+    # Convert date - try multiple formats
+    date_formatted = None
+    for date_format in STATEMENT_DATE_FORMATS:
+        try:
+            date_formatted = datetime.strptime(fields["date"], date_format).strftime("%Y-%m-%d")
+            break
+        except ValueError:
+            continue
+    if not date_formatted:
+        result["rejected"] = "invalid_date"
+        return result
+    
+    result["transaction"] = {
+        "date": date_formatted,
+        "description": description[:200],  # Limit description length
+        "amount": amount,
+        "type": trans_type,
+        "check_number": check_number,
+    }
+    return result
+
+def parse_statement_pages(page_texts: List[str], user_id: str, collect_unmatched: bool = False) -> Tuple[List[dict], int, List[str]]:
+    """Bank transactions found in the extracted text of each statement page.
+
+    Returns (transactions, skipped_lines, unmatched_lines); lines that look like
+    transactions but match no pattern are only collected when asked.
+    """
+    transactions = []
+    unmatched_lines = []
+    skipped_lines = 0
+    year = datetime.now(timezone.utc).year
+    
+    for page_num, text in enumerate(page_texts):
+        for line_num, line in enumerate(text.split('\n')):
+            try:
+                parsed = parse_statement_line(line, year)
+            except Exception as parse_error:
+                skipped_lines += 1
+                if statement_line_log_sampler():
+                    logger.warning("Error parsing statement line", extra={"fields": {
+                        "line": line_num, "error": str(parse_error)
+                    }})
+                continue
+            if parsed is None:
+                continue
+            
+            parsed_transaction = parsed["transaction"]
+            if parsed_transaction:
+                transaction = BankTransaction(user_id=user_id, statement_id="", **parsed_transaction)
+                transactions.append(transaction.model_dump())
+                if statement_line_log_sampler():
+                    logger.info("Parsed statement transaction", extra={"fields": {
+                        "n": len(transactions), "date": transaction.date,
+                        "type": transaction.type, "amount": transaction.amount
+                    }})
+            elif parsed["rejected"] in ("invalid_date", "invalid_amount"):
+                skipped_lines += 1
+            elif parsed["pattern"] is None and collect_unmatched:
+                line = line.strip()
+                # Lines that might be transactions but didn't match any pattern
+                if any(char.isdigit() for char in line) and len(line) > 15:
+                    unmatched_lines.append(f"p{page_num + 1}:{line_num}: {line}")
+    
+    return transactions, skipped_lines, unmatched_lines
+
 class TextParseRequest(BaseModel):
     text: str
 
@@ -1537,46 +4075,27 @@ async def test_parse_text(
     results = []
     
     for line_num, line in enumerate(lines):
-        line = line.strip()
-        if not line or len(line) < 10:
+        parsed = parse_statement_line(line)
+        if parsed is None:
             continue
         
-        # Try all patterns
-        patterns = [
-            (r'(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)', 'Pattern 1: Date Amount Desc'),
-            (r'(\d{1,2}/\d{1,2}/\d{2,4})\s+(.+?)\s+([-+]?\$?\s*[\d,]+\.?\d{2})$', 'Pattern 2: Date Desc Amount'),
-            (r'(.+?)\s+(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})$', 'Pattern 3: Desc Date Amount'),
-            (r'(\d{4}-\d{1,2}-\d{1,2})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)', 'Pattern 4: ISO Date'),
-            (r'(\d{1,2}/\d{1,2}/\d{2,4})\s+\d{1,2}/\d{1,2}/\d{2,4}\s+(.+?)\s+([-+]?\$?\s*[\d,]+\.?\d{2})$', 'Pattern 5: Two dates'),
-        ]
-        
-        matched = False
-        for pattern, pattern_name in patterns:
-            match = re.search(pattern, line)
-            if match:
-                results.append({
-                    "line_number": line_num + 1,
-                    "line": line,
-                    "matched": True,
-                    "pattern": pattern_name,
-                    "groups": match.groups()
-                })
-                matched = True
-                break
-        
-        if not matched and any(char.isdigit() for char in line):
+        matched = parsed["pattern"] is not None
+        if matched or any(char.isdigit() for char in line):
             results.append({
                 "line_number": line_num + 1,
-                "line": line,
-                "matched": False,
-                "pattern": None,
-                "groups": []
+                "line": line.strip(),
+                "matched": matched,
+                "pattern": parsed["pattern"],
+                "groups": parsed["groups"],
+                "transaction": parsed["transaction"],
+                "rejected": parsed["rejected"]
             })
     
     return {
         "total_lines": len(lines),
         "matched_lines": len([r for r in results if r["matched"]]),
         "unmatched_lines": len([r for r in results if not r["matched"]]),
+        "transactions": len([r for r in results if r["transaction"]]),
         "results": results
     }
 
@@ -1587,239 +4106,32 @@ async def upload_bank_statement(
     period_end: str = "",
     starting_balance: float = 0,
     ending_balance: float = 0,
+    debug_trace: bool = False,  # Keep the extracted text and unmatched lines in /tmp for review
     current_user: dict = Depends(get_current_user)
 ):
+    import pdfplumber
+
     try:
         contents = await file.read()
         
-        # Save PDF temporarily
-        pdf_path = f"/tmp/{file.filename}"
-        with open(pdf_path, "wb") as f:
-            f.write(contents)
-        
-        logger.info(f"Processing PDF: {file.filename}")
+        parse_started = time.perf_counter()
         
         # Extract text from PDF
-        transactions = []
-        all_text = ""
+        page_texts = []
+        with pdfplumber.open(io.BytesIO(contents)) as pdf:
+            for page in pdf.pages:
+                page_texts.append(page.extract_text() or "")
         
-        with pdfplumber.open(pdf_path) as pdf:
-            logger.info(f"PDF has {len(pdf.pages)} pages")
-            for page_num, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                all_text += text + "\n"
-                logger.info(f"Page {page_num + 1} extracted")
-                
-                # Try multiple patterns for different bank formats
-                lines = text.split('\n')
-                for line_num, line in enumerate(lines):
-                    line = line.strip()
-                    if not line or len(line) < 10:
-                        continue
-                    
-                    # Skip header lines and page headers
-                    if any(header in line.upper() for header in [
-                        'DATE', 'DESCRIPTION', 'AMOUNT', 'BALANCE', 'DEPOSITS', 'WITHDRAWALS', 
-                        'FECHA', 'DESCRIPCION', 'MONTO', 'CHECK NUMBER', 'ENDING DAILY',
-                        'TRANSACTION HISTORY', 'PAGE', 'BEGINNING BALANCE', 'ENDING BALANCE',
-                        'STATEMENT PERIOD', 'ACCOUNT NUMBER'
-                    ]):
-                        continue
-                    
-                    # Pattern for Wells Fargo style: Date [CheckNum] Description Amount Amount Balance
-                    # Example: 9/15 Zelle to Camargo Elena on 09/12 Ref # Wfct0Z8Q8Z29 550.00
-                    # Example: 9/10 Purchase authorized on 09/09 Paypal *Streamline 57.00
-                    # Allow amounts with 0-2 decimal places
-                    wells_fargo_match = re.search(r'^(\d{1,2}/\d{1,2})\s+(?:(\d+)\s+)?(.+?)\s+([\d,]+(?:\.\d{1,2})?)\s*$', line)
-                    
-                    if wells_fargo_match:
-                        date_short, check_num, description, amount_str = wells_fargo_match.groups()
-                        
-                        # Build full date - assume current or previous year
-                        try:
-                            current_year = datetime.now(timezone.utc).year
-                            date_str = f"{date_short}/{current_year}"
-                            date_obj = datetime.strptime(date_str, "%m/%d/%Y")
-                            date_formatted = date_obj.strftime("%Y-%m-%d")
-                        except:
-                            continue
-                        
-                        # Parse amount
-                        try:
-                            amount = float(amount_str.replace(',', ''))
-                        except:
-                            continue
-                        
-                        # Determine transaction type from description
-                        desc_upper = description.upper()
-                        is_deposit = any(word in desc_upper for word in [
-                            'ZELLE FROM', 'MOBILE DEPOSIT', 'DEPOSIT', 'ATM CASH DEPOSIT',
-                            'PAYMENT RECEIVED', 'TRANSFER IN', 'CREDIT'
-                        ])
-                        
-                        is_withdrawal = any(word in desc_upper for word in [
-                            'ZELLE TO', 'PURCHASE', 'PAYMENT', 'WITHDRAWAL', 'DEBIT', 
-                            'TRANSFER DEBIT', 'ACH PMT', 'ATM', 'CHECK'
-                        ])
-                        
-                        trans_type = "credit" if is_deposit else "debit"
-                        
-                        # Extract check number
-                        check_number = check_num if check_num else None
-                        if not check_number:
-                            check_match = re.search(r'CHECK #?(\d+)', description, re.IGNORECASE)
-                            if check_match:
-                                check_number = check_match.group(1)
-                        
-                        transaction = BankTransaction(
-                            user_id=current_user["id"],
-                            statement_id="",
-                            date=date_formatted,
-                            description=description.strip()[:200],
-                            amount=amount,
-                            type=trans_type,
-                            check_number=check_number
-                        )
-                        transactions.append(transaction.model_dump())
-                        logger.info(f"✓ Transaction #{len(transactions)}: {date_formatted} | {trans_type.upper()} | ${amount} | {description[:50]}")
-                        continue
-                    
-                    # Pattern 1: Date at start, amount with $ or - sign
-                    # Example: 09/15/2024 -500.00 CHECK #1234
-                    match1 = re.search(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)', line)
-                    
-                    # Pattern 2: Date at start, description, then amount at end
-                    # Example: 09/15/2024 Payment to vendor 500.00
-                    match2 = re.search(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+(.+?)\s+([-+]?\$?\s*[\d,]+\.?\d{2})$', line)
-                    
-                    # Pattern 3: Description first, date, then amount
-                    # Example: CHECK #1234 09/15/2024 500.00
-                    match3 = re.search(r'(.+?)\s+(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})$', line)
-                    
-                    # Pattern 4: ISO date format
-                    # Example: 2024-09-15 -500.00 Description
-                    match4 = re.search(r'(\d{4}-\d{1,2}-\d{1,2})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)', line)
-                    
-                    # Pattern 5: Two dates in line (transaction date and posting date)
-                    # Example: 09/15/2024 09/16/2024 Description 500.00
-                    match5 = re.search(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+\d{1,2}/\d{1,2}/\d{2,4}\s+(.+?)\s+([-+]?\$?\s*[\d,]+\.?\d{2})$', line)
-                    
-                    # Pattern 6: Amount in middle with separators
-                    # Example: 09/15/2024    -500.00    Description here
-                    match6 = re.search(r'(\d{1,2}/\d{1,2}/\d{2,4})\s+([-+]?\$?\s*[\d,]+\.?\d{2})\s+(.+)', line)
-                    
-                    match = match1 or match2 or match3 or match4 or match5 or match6
-                    
-                    if match:
-                        try:
-                            groups = match.groups()
-                            
-                            # Identify which pattern matched
-                            if match1 or match4 or match6:
-                                date_str, amount_str, description = groups
-                            elif match2 or match5:
-                                date_str, description, amount_str = groups
-                            elif match3:
-                                description, date_str, amount_str = groups
-                            else:
-                                continue
-                            
-                            # Clean up description
-                            description = description.strip()
-                            
-                            # Skip if description looks like a subtotal or header
-                            if any(skip in description.upper() for skip in ['TOTAL', 'SUBTOTAL', 'BALANCE', 'CONTINUED', 'PAGE']):
-                                continue
-                            
-                            # Parse amount
-                            amount_clean = amount_str.replace('$', '').replace(',', '').replace(' ', '').strip()
-                            
-                            # Determine if debit or credit
-                            is_negative = '-' in amount_clean or '(' in amount_str
-                            
-                            # Keywords that indicate credit (money in)
-                            credit_keywords = ['DEPOSIT', 'CREDIT', 'DEPOSITO', 'ABONO', 'INGRESO', 'PAYMENT RECEIVED', 'TRANSFER IN']
-                            
-                            # Keywords that indicate debit (money out)
-                            debit_keywords = ['WITHDRAWAL', 'DEBIT', 'RETIRO', 'CARGO', 'CHECK', 'CHEQUE', 'FEE', 'PAYMENT', 'PURCHASE', 'ATM']
-                            
-                            # Check description for hints
-                            desc_upper = description.upper()
-                            has_credit_keyword = any(word in desc_upper for word in credit_keywords)
-                            has_debit_keyword = any(word in desc_upper for word in debit_keywords)
-                            
-                            # Determine type
-                            if is_negative or has_debit_keyword:
-                                trans_type = "debit"
-                            elif has_credit_keyword:
-                                trans_type = "credit"
-                            else:
-                                # Default: assume positive amounts are debits unless otherwise indicated
-                                # (most transactions in statements are debits)
-                                trans_type = "debit"
-                            
-                            try:
-                                amount = abs(float(amount_clean.replace('-', '').replace('(', '').replace(')', '')))
-                            except ValueError:
-                                logger.warning(f"Could not parse amount: {amount_str}")
-                                continue
-                            
-                            # Extract check number if present
-                            check_patterns = [
-                                r'CHECK\s*#?(\d+)',
-                                r'CHK\s*#?(\d+)',
-                                r'CHEQUE\s*#?(\d+)',
-                                r'#(\d{4,})'
-                            ]
-                            check_number = None
-                            for pattern in check_patterns:
-                                check_match = re.search(pattern, description, re.IGNORECASE)
-                                if check_match:
-                                    check_number = check_match.group(1)
-                                    break
-                            
-                            # Convert date - try multiple formats
-                            date_formatted = None
-                            date_formats = ["%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y"]
-                            for date_format in date_formats:
-                                try:
-                                    date_obj = datetime.strptime(date_str, date_format)
-                                    date_formatted = date_obj.strftime("%Y-%m-%d")
-                                    break
-                                except:
-                                    continue
-                            
-                            if not date_formatted:
-                                logger.warning(f"Could not parse date: {date_str}")
-                                continue
-                            
-                            transaction = BankTransaction(
-                                user_id=current_user["id"],
-                                statement_id="",
-                                date=date_formatted,
-                                description=description.strip()[:200],  # Limit description length
-                                amount=amount,
-                                type=trans_type,
-                                check_number=check_number
-                            )
-                            transactions.append(transaction.model_dump())
-                            logger.info(f"✓ Transaction #{len(transactions)}: {date_formatted} | {trans_type.upper()} | ${amount} | {description[:50]}")
-                            
-                        except Exception as parse_error:
-                            logger.warning(f"✗ Error parsing line {line_num}: {line[:100]} | Error: {str(parse_error)}")
-                            continue
-                    else:
-                        # Log lines that didn't match any pattern (only if they look like they might be transactions)
-                        if any(char.isdigit() for char in line) and len(line) > 15:
-                            logger.debug(f"⊘ Line {line_num} didn't match patterns: {line[:80]}")
+        transactions, skipped_lines, unmatched_lines = parse_statement_pages(page_texts, current_user["id"], debug_trace)
         
-        logger.info(f"Total transactions extracted: {len(transactions)}")
+        all_text = "\n".join(page_texts)
+        parse_ms = (time.perf_counter() - parse_started) * 1000
         
-        # Save extracted text for debugging
-        debug_path = f"/tmp/{file.filename}_debug.txt"
-        with open(debug_path, "w") as f:
-            f.write(all_text)
-        logger.info(f"Saved debug text to: {debug_path}")
+        debug_path = None
+        if debug_trace:
+            debug_path = upload_tmp_path(file.filename, "_debug.txt")
+            trace = all_text + "\n\n=== Unmatched lines ===\n" + "\n".join(unmatched_lines)
+            await run_in_threadpool(Path(debug_path).write_text, trace)
         
         # Create statement record
         statement = BankStatement(
@@ -1833,28 +4145,307 @@ async def upload_bank_statement(
         )
         
         await db.bank_statements.insert_one(statement.model_dump())
-        logger.info(f"Statement saved with ID: {statement.id}")
         
         # Update transactions with statement_id
         for trans in transactions:
             trans["statement_id"] = statement.id
         
+        # Pre-fill categories from the user's rules; validation stays with the user
+        matcher = await rule_matcher_for(current_user)
+        auto_categorized = 0
+        for trans, rule in zip(transactions, await matcher.match_all_in_threadpool(transactions)):
+            if rule is not None:
+                trans["category_id"], trans["rule_id"] = rule.category_id, rule.id
+                auto_categorized += 1
+        
         # Insert transactions
         if transactions:
             await db.bank_transactions.insert_many(transactions)
-            logger.info(f"Inserted {len(transactions)} transactions")
         
-        return {
+        logger.info("Bank statement processed", extra={"fields": {
+            "statement_id": statement.id,
+            "filename": file.filename,
+            "pages": len(page_texts),
+            "transactions": len(transactions),
+            "auto_categorized": auto_categorized,
+            "skipped_lines": skipped_lines,
+            "parse_ms": round(parse_ms, 1),
+            "debug_trace": debug_path,
+        }})
+        
+        response = {
             "message": f"Estado de cuenta procesado. Se extrajeron {len(transactions)} transacciones.",
             "statement_id": statement.id,
             "transactions_count": len(transactions),
+            "auto_categorized": auto_categorized,
             "debug_info": f"Se extrajo texto de {len(all_text)} caracteres. Si no se encontraron transacciones, el formato del PDF puede no ser compatible."
         }
+        if debug_path:
+            response["debug_trace"] = debug_path
+        return response
     except Exception as e:
         logger.error(f"Error uploading bank statement: {str(e)}", exc_info=True)
         raise HTTPException(status_code=400, detail=f"Error al procesar PDF: {str(e)}")
 
 
+# ============ Categorization Rules ============
+# Per-user rules that pre-fill the category of imported bank transactions. A user's
+# rules are compiled once into a RuleMatcher (cheap checks first, substrings matched
+# on a casefolded description, regexes precompiled) and cached per worker until the
+# user's rules_version changes. Applied on statement upload and on demand through
+# /categorization-rules/apply; neither validates, so the ledger is untouched.
+#
+# Rule regexes run on the stdlib backtracking engine, so patterns that can backtrack
+# exponentially (a quantifier over something that itself repeats or alternates, or a
+# backreference) are rejected, and matching runs in the threadpool under a time budget.
+
+RULE_MATCHER_CACHE_SIZE = int(os.environ.get('RULE_MATCHER_CACHE_SIZE', '1024'))
+MAX_RULE_PATTERN_LENGTH = 200
+# Only the start of a description is searched by regexes, bounding polynomial patterns
+MAX_RULE_TEXT_LENGTH = 512
+# Wall time for matching one batch; transactions past it stay uncategorized
+RULE_MATCH_BUDGET_SECONDS = float(os.environ.get('RULE_MATCH_BUDGET_SECONDS', '5'))
+REPEAT_OPS = ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+
+class CompiledRule(NamedTuple):
+    id: str
+    category_id: str
+    type: Optional[str]
+    min_cents: Optional[int]
+    max_cents: Optional[int]
+    contains: Optional[str]
+    search: Optional[Any]  # Bound re.Pattern.search
+
+class RuleMatcher:
+    """A user's rules in evaluation order, ready to match many transactions"""
+
+    def __init__(self, rules_version: int, rules: List[dict]):
+        self.rules_version = rules_version
+        ordered = sorted(rules, key=lambda rule: (-rule.get("priority", 0), rule.get("created_at", "")))
+        self.rules = []
+        for rule in ordered:
+            # Rules saved before a pattern check existed are skipped rather than run
+            problem = rule.get("description_regex") and regex_problem(rule["description_regex"])
+            if problem:
+                logger.warning(f"Skipping categorization rule {rule['id']}: {problem}")
+                continue
+            self.rules.append(compile_rule(rule))
+        self.needs_text = any(rule.contains for rule in self.rules)
+
+    def match(self, description: Optional[str], cents: int, kind: Optional[str]) -> Optional[CompiledRule]:
+        description = description or ""
+        text = description.casefold() if self.needs_text else description
+        for rule in self.rules:
+            if rule.type is not None and rule.type != kind:
+                continue
+            if rule.min_cents is not None and cents < rule.min_cents:
+                continue
+            if rule.max_cents is not None and cents > rule.max_cents:
+                continue
+            if rule.contains is not None and rule.contains not in text:
+                continue
+            if rule.search is not None and rule.search(description, 0, MAX_RULE_TEXT_LENGTH) is None:
+                continue
+            return rule
+        return None
+
+    def match_all(self, transactions: List[dict], budget_seconds: Optional[float] = None) -> List[Optional[CompiledRule]]:
+        """The matching rule per transaction; shorter than `transactions` if the budget ran out"""
+        if not self.rules:
+            return [None] * len(transactions)
+        match = self.match
+        if budget_seconds is None:
+            return [match(t.get("description"), cents_of(t), t.get("type")) for t in transactions]
+        deadline = time.monotonic() + budget_seconds
+        matches = []
+        for start in range(0, len(transactions), 256):
+            if time.monotonic() > deadline:
+                break
+            matches += [match(t.get("description"), cents_of(t), t.get("type")) for t in transactions[start:start + 256]]
+        return matches
+
+    async def match_all_in_threadpool(self, transactions: List[dict]) -> List[Optional[CompiledRule]]:
+        matches = await run_in_threadpool(self.match_all, transactions, RULE_MATCH_BUDGET_SECONDS)
+        if len(matches) < len(transactions):
+            logger.warning(f"Categorization rules ran out of time after {len(matches)} of {len(transactions)} transactions")
+        return matches
+
+def compile_rule(rule: dict) -> CompiledRule:
+    contains = rule.get("description_contains")
+    pattern = rule.get("description_regex")
+    return CompiledRule(
+        id=rule["id"],
+        category_id=rule["category_id"],
+        type=rule.get("type"),
+        min_cents=to_cents(rule["min_amount"]) if rule.get("min_amount") is not None else None,
+        max_cents=to_cents(rule["max_amount"]) if rule.get("max_amount") is not None else None,
+        contains=contains.casefold() if contains else None,
+        search=re.compile(pattern, re.IGNORECASE).search if pattern else None,
+    )
+
+def check_rule(rule_data: CategorizationRuleCreate):
+    """400 unless the rule has a condition and every condition is well-formed"""
+    conditions = (rule_data.description_contains, rule_data.description_regex,
+                  rule_data.min_amount, rule_data.max_amount, rule_data.type)
+    if all(condition is None or condition == "" for condition in conditions):
+        raise HTTPException(status_code=400, detail="A rule needs at least one condition")
+    if rule_data.type is not None and rule_data.type not in BANK_TRANSACTION_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid type. Use 'debit' or 'credit'")
+    if (rule_data.min_amount is not None and rule_data.max_amount is not None
+            and rule_data.min_amount > rule_data.max_amount):
+        raise HTTPException(status_code=400, detail="min_amount is greater than max_amount")
+    if rule_data.description_regex:
+        problem = regex_problem(rule_data.description_regex)
+        if problem:
+            raise HTTPException(status_code=400, detail=f"Invalid description_regex: {problem}")
+
+def regex_problem(pattern: str) -> Optional[str]:
+    """Why a rule regex is refused (too long, invalid, or can backtrack exponentially), or None"""
+    if len(pattern) > MAX_RULE_PATTERN_LENGTH:
+        return f"longer than {MAX_RULE_PATTERN_LENGTH} characters"
+    try:
+        parsed = regex_parser.parse(pattern)
+    except re.error as e:
+        return str(e)
+
+    def walk(items, repeated: bool) -> Optional[str]:
+        for op, value in items:
+            name = str(op)
+            if name in ("GROUPREF", "GROUPREF_EXISTS"):
+                return "backreferences are not supported"
+            if name in REPEAT_OPS:
+                low, high, body = value
+                if repeated and high > 1:
+                    return "nested quantifiers are not supported"
+                problem = walk(body, repeated or high > 1)
+            elif name == "BRANCH":
+                if repeated:
+                    return "alternation inside a repeated group is not supported"
+                problem = next(filter(None, (walk(branch, repeated) for branch in value[1])), None)
+            elif name == "SUBPATTERN":
+                problem = walk(value[-1], repeated)
+            elif name in ("ASSERT", "ASSERT_NOT"):
+                problem = walk(value[1], repeated)
+            elif name == "ATOMIC_GROUP":
+                problem = walk(value, repeated)
+            else:
+                problem = None
+            if problem:
+                return problem
+        return None
+
+    return walk(parsed, False)
+
+_rule_matchers: "OrderedDict[str, RuleMatcher]" = OrderedDict()
+
+async def rule_matcher_for(user: dict) -> RuleMatcher:
+    """The user's compiled rules, from this worker's cache while rules_version is unchanged"""
+    version = user.get("rules_version", 0)
+    matcher = _rule_matchers.get(user["id"])
+    if matcher is not None and matcher.rules_version == version:
+        _rule_matchers.move_to_end(user["id"])
+        return matcher
+    rules = await db.categorization_rules.find({"user_id": user["id"]}, {"_id": 0}).to_list(None)
+    matcher = RuleMatcher(version, rules)
+    _rule_matchers[user["id"]] = matcher
+    while len(_rule_matchers) > RULE_MATCHER_CACHE_SIZE:
+        _rule_matchers.popitem(last=False)
+    return matcher
+
+async def bump_rules_version(user_id: str):
+    await db.users.update_one({"id": user_id}, {"$inc": {"rules_version": 1}})
+
+@api_router.get("/categorization-rules", response_model=List[CategorizationRule])
+async def get_categorization_rules(current_user: dict = Depends(conditional_get)):
+    """The user's rules in evaluation order"""
+    rules = await db.categorization_rules.find(
+        {"user_id": current_user["id"]}, {"_id": 0}
+    ).sort([("priority", -1), ("created_at", 1)]).to_list(None)
+    return rules
+
+@api_router.post("/categorization-rules", response_model=CategorizationRule)
+async def create_categorization_rule(rule_data: CategorizationRuleCreate, current_user: dict = Depends(get_current_user)):
+    check_rule(rule_data)
+    rule = CategorizationRule(user_id=current_user["id"], **rule_data.model_dump())
+    await db.categorization_rules.insert_one(rule.model_dump())
+    await bump_rules_version(current_user["id"])
+    return rule
+
+@api_router.put("/categorization-rules/{rule_id}", response_model=CategorizationRule)
+async def update_categorization_rule(
+    rule_id: str,
+    rule_data: CategorizationRuleCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    check_rule(rule_data)
+    result = await db.categorization_rules.update_one(
+        {"id": rule_id, "user_id": current_user["id"]}, {"$set": rule_data.model_dump()}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    await bump_rules_version(current_user["id"])
+    return await db.categorization_rules.find_one({"id": rule_id}, {"_id": 0})
+
+@api_router.delete("/categorization-rules/{rule_id}")
+async def delete_categorization_rule(rule_id: str, current_user: dict = Depends(get_current_user)):
+    result = await db.categorization_rules.delete_one({"id": rule_id, "user_id": current_user["id"]})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    await bump_rules_version(current_user["id"])
+    return {"message": "Rule deleted successfully"}
+
+@api_router.post("/categorization-rules/apply")
+async def apply_categorization_rules(
+    request: Request,
+    overwrite: bool = False,  # Also re-categorize transactions that already have a category
+    after: Optional[str] = None,  # next_cursor of a run that timed out: continue after that transaction
+    current_user: dict = Depends(get_current_user)
+):
+    """Run the rules over the user's unvalidated bank transactions, in id order"""
+    matcher = await rule_matcher_for(current_user)
+    result = {"checked": 0, "categorized": 0, "by_rule": {}, "timed_out": False, "next_cursor": None}
+    if not matcher.rules:
+        request.state.read_only = True
+        return result
+
+    query = {"user_id": current_user["id"], "validated": {"$ne": True}}
+    if not overwrite:
+        query["category_id"] = None
+    if after:
+        query["id"] = {"$gt": after}
+    transactions = await db.bank_transactions.find(
+        query, {"_id": 0, "id": 1, "description": 1, "amount": 1, "amount_cents": 1, "type": 1, "category_id": 1}
+    ).sort("id", 1).to_list(None)
+
+    # One UpdateMany per rule over the ids it matched
+    matched = defaultdict(list)
+    matches = await matcher.match_all_in_threadpool(transactions)
+    for transaction, rule in zip(transactions, matches):
+        if rule is not None and transaction.get("category_id") != rule.category_id:
+            matched[rule].append(transaction["id"])
+    if matched:
+        await db.bank_transactions.bulk_write([
+            UpdateMany({"user_id": current_user["id"], "id": {"$in": ids}},
+                       {"$set": {"category_id": rule.category_id, "rule_id": rule.id}})
+            for rule, ids in matched.items()
+        ], ordered=False)
+    else:
+        request.state.read_only = True
+
+    # Out of time: the last checked id, to pass back as `after`. Without it a rerun would
+    # start over with the rows no rule matched, which stay uncategorized
+    next_cursor = None
+    if len(matches) < len(transactions):
+        next_cursor = transactions[len(matches) - 1]["id"] if matches else after
+    result.update(
+        checked=len(matches),
+        timed_out=len(matches) < len(transactions),
+        next_cursor=next_cursor,
+        categorized=sum(len(ids) for ids in matched.values()),
+        by_rule={rule.id: len(ids) for rule, ids in matched.items()},
+    )
+    return result
+
 # ============ User Management Routes (Admin Only) ============
 
 @api_router.get("/users", response_model=List[Dict[str, Any]])
@@ -1983,6 +4574,8 @@ async def delete_user(user_id: str, current_user: dict = Depends(require_admin))
     await db.sales.delete_many({"user_id": user_id})
     await db.expenses.delete_many({"user_id": user_id})
     await db.bank_transactions.delete_many({"user_id": user_id})
+    await db.ledger_entries.delete_many({"user_id": user_id})
+    await db.categorization_rules.delete_many({"user_id": user_id})
     await db.checks.delete_many({"user_id": user_id})
     await db.bank_statements.delete_many({"user_id": user_id})
     
@@ -1995,7 +4588,7 @@ async def delete_user(user_id: str, current_user: dict = Depends(require_admin))
 @api_router.get("/purchase-orders", response_model=List[Dict[str, Any]])
 async def get_purchase_orders(
     status: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(conditional_get)
 ):
     """Get all purchase orders for current user"""
     query = {"user_id": current_user["id"]}
@@ -2006,7 +4599,7 @@ async def get_purchase_orders(
     return pos
 
 @api_router.get("/purchase-orders/{po_id}", response_model=Dict[str, Any])
-async def get_purchase_order(po_id: str, current_user: dict = Depends(get_current_user)):
+async def get_purchase_order(po_id: str, current_user: dict = Depends(conditional_get)):
     """Get specific purchase order"""
     po = await db.purchase_orders.find_one({"id": po_id, "user_id": current_user["id"]}, {"_id": 0})
     if not po:
@@ -2081,9 +4674,9 @@ async def create_purchase_order(po_data: PurchaseOrderCreate, current_user: dict
             po_dict["amount_paid"] = check["amount"]
             
             # Update status based on payment
-            if check["amount"] >= total:
+            if cents_of(check) >= to_cents(total):
                 po_dict["status"] = PurchaseOrderStatus.PAID
-            elif check["amount"] > 0:
+            elif cents_of(check) > 0:
                 po_dict["status"] = PurchaseOrderStatus.PARTIALLY_PAID
             
             # Link check to PO
@@ -2092,7 +4685,7 @@ async def create_purchase_order(po_data: PurchaseOrderCreate, current_user: dict
                 {"$set": {"purchase_order_id": po_dict["id"]}}
             )
     
-    await db.purchase_orders.insert_one(po_dict)
+    await db.purchase_orders.insert_one(with_cents(po_dict, MONEY_FIELDS["purchase_orders"]))
     return po_dict
 
 @api_router.put("/purchase-orders/{po_id}", response_model=Dict[str, Any])
@@ -2136,7 +4729,7 @@ async def update_purchase_order(
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
     
-    await db.purchase_orders.update_one({"id": po_id}, {"$set": update_data})
+    await db.purchase_orders.update_one({"id": po_id}, {"$set": with_cents(update_data, MONEY_FIELDS["purchase_orders"])})
     
     updated_po = await db.purchase_orders.find_one({"id": po_id}, {"_id": 0})
     return updated_po
@@ -2183,10 +4776,11 @@ async def link_expense_to_po(
     
     # Calculate amount to apply
     amount_to_apply = link_data.amount if link_data.amount else expense["amount"]
-    new_amount_paid = po.get("amount_paid", 0) + amount_to_apply
+    new_amount_paid_cents = cents_of(po, "amount_paid") + to_cents(amount_to_apply)
+    new_amount_paid = from_cents(new_amount_paid_cents)
     
     # Check if overpaying
-    if new_amount_paid > po["total"]:
+    if new_amount_paid_cents > cents_of(po, "total"):
         raise HTTPException(status_code=400, detail="Payment amount exceeds purchase order total")
     
     # Update PO
@@ -2195,9 +4789,9 @@ async def link_expense_to_po(
     
     # Determine new status
     new_status = po["status"]
-    if new_amount_paid >= po["total"]:
+    if new_amount_paid_cents >= cents_of(po, "total"):
         new_status = PurchaseOrderStatus.PAID
-    elif new_amount_paid > 0:
+    elif new_amount_paid_cents > 0:
         new_status = PurchaseOrderStatus.PARTIALLY_PAID
     
     await db.purchase_orders.update_one(
@@ -2206,6 +4800,7 @@ async def link_expense_to_po(
             "$set": {
                 "linked_expenses": linked_expenses,
                 "amount_paid": new_amount_paid,
+                "amount_paid_cents": new_amount_paid_cents,
                 "status": new_status
             }
         }
@@ -2245,10 +4840,11 @@ async def link_transaction_to_po(
     
     # Calculate amount to apply
     amount_to_apply = link_data.amount if link_data.amount else transaction["amount"]
-    new_amount_paid = po.get("amount_paid", 0) + amount_to_apply
+    new_amount_paid_cents = cents_of(po, "amount_paid") + to_cents(amount_to_apply)
+    new_amount_paid = from_cents(new_amount_paid_cents)
     
     # Check if overpaying
-    if new_amount_paid > po["total"]:
+    if new_amount_paid_cents > cents_of(po, "total"):
         raise HTTPException(status_code=400, detail="Payment amount exceeds purchase order total")
     
     # Update PO
@@ -2257,9 +4853,9 @@ async def link_transaction_to_po(
     
     # Determine new status
     new_status = po["status"]
-    if new_amount_paid >= po["total"]:
+    if new_amount_paid_cents >= cents_of(po, "total"):
         new_status = PurchaseOrderStatus.PAID
-    elif new_amount_paid > 0:
+    elif new_amount_paid_cents > 0:
         new_status = PurchaseOrderStatus.PARTIALLY_PAID
     
     await db.purchase_orders.update_one(
@@ -2268,6 +4864,7 @@ async def link_transaction_to_po(
             "$set": {
                 "linked_transactions": linked_transactions,
                 "amount_paid": new_amount_paid,
+                "amount_paid_cents": new_amount_paid_cents,
                 "status": new_status
             }
         }
@@ -2304,10 +4901,11 @@ async def link_check_to_po(
     
     # Calculate amount to apply
     amount_to_apply = link_data.amount if link_data.amount else check["amount"]
-    new_amount_paid = po.get("amount_paid", 0) + amount_to_apply
+    new_amount_paid_cents = cents_of(po, "amount_paid") + to_cents(amount_to_apply)
+    new_amount_paid = from_cents(new_amount_paid_cents)
     
     # Check if overpaying
-    if new_amount_paid > po["total"]:
+    if new_amount_paid_cents > cents_of(po, "total"):
         raise HTTPException(status_code=400, detail="Payment amount exceeds purchase order total")
     
     # Update PO
@@ -2316,9 +4914,9 @@ async def link_check_to_po(
     
     # Determine new status
     new_status = po["status"]
-    if new_amount_paid >= po["total"]:
+    if new_amount_paid_cents >= cents_of(po, "total"):
         new_status = PurchaseOrderStatus.PAID
-    elif new_amount_paid > 0:
+    elif new_amount_paid_cents > 0:
         new_status = PurchaseOrderStatus.PARTIALLY_PAID
     
     await db.purchase_orders.update_one(
@@ -2327,6 +4925,7 @@ async def link_check_to_po(
             "$set": {
                 "linked_checks": linked_checks,
                 "amount_paid": new_amount_paid,
+                "amount_paid_cents": new_amount_paid_cents,
                 "status": new_status
             }
         }
@@ -2357,14 +4956,19 @@ async def unlink_expense_from_po(po_id: str, expense_id: str, current_user: dict
         raise HTTPException(status_code=400, detail="Expense not linked to this purchase order")
     
     linked_expenses.remove(expense_id)
-    new_amount_paid = po.get("amount_paid", 0) - expense["amount"]
+    new_amount_paid_cents = max(0, cents_of(po, "amount_paid") - cents_of(expense))
     
     # Update status
-    new_status = PurchaseOrderStatus.PENDING if new_amount_paid <= 0 else PurchaseOrderStatus.PARTIALLY_PAID
+    new_status = PurchaseOrderStatus.PENDING if new_amount_paid_cents <= 0 else PurchaseOrderStatus.PARTIALLY_PAID
     
     await db.purchase_orders.update_one(
         {"id": po_id},
-        {"$set": {"linked_expenses": linked_expenses, "amount_paid": max(0, new_amount_paid), "status": new_status}}
+        {"$set": {
+            "linked_expenses": linked_expenses,
+            "amount_paid": from_cents(new_amount_paid_cents),
+            "amount_paid_cents": new_amount_paid_cents,
+            "status": new_status
+        }}
     )
     
     await db.expenses.update_one({"id": expense_id}, {"$unset": {"purchase_order_id": ""}})
@@ -2387,13 +4991,18 @@ async def unlink_transaction_from_po(po_id: str, transaction_id: str, current_us
         raise HTTPException(status_code=400, detail="Transaction not linked to this purchase order")
     
     linked_transactions.remove(transaction_id)
-    new_amount_paid = po.get("amount_paid", 0) - transaction["amount"]
+    new_amount_paid_cents = max(0, cents_of(po, "amount_paid") - cents_of(transaction))
     
-    new_status = PurchaseOrderStatus.PENDING if new_amount_paid <= 0 else PurchaseOrderStatus.PARTIALLY_PAID
+    new_status = PurchaseOrderStatus.PENDING if new_amount_paid_cents <= 0 else PurchaseOrderStatus.PARTIALLY_PAID
     
     await db.purchase_orders.update_one(
         {"id": po_id},
-        {"$set": {"linked_transactions": linked_transactions, "amount_paid": max(0, new_amount_paid), "status": new_status}}
+        {"$set": {
+            "linked_transactions": linked_transactions,
+            "amount_paid": from_cents(new_amount_paid_cents),
+            "amount_paid_cents": new_amount_paid_cents,
+            "status": new_status
+        }}
     )
     
     await db.bank_transactions.update_one({"id": transaction_id}, {"$unset": {"purchase_order_id": ""}})
@@ -2416,13 +5025,18 @@ async def unlink_check_from_po(po_id: str, check_id: str, current_user: dict = D
         raise HTTPException(status_code=400, detail="Check not linked to this purchase order")
     
     linked_checks.remove(check_id)
-    new_amount_paid = po.get("amount_paid", 0) - check["amount"]
+    new_amount_paid_cents = max(0, cents_of(po, "amount_paid") - cents_of(check))
     
-    new_status = PurchaseOrderStatus.PENDING if new_amount_paid <= 0 else PurchaseOrderStatus.PARTIALLY_PAID
+    new_status = PurchaseOrderStatus.PENDING if new_amount_paid_cents <= 0 else PurchaseOrderStatus.PARTIALLY_PAID
     
     await db.purchase_orders.update_one(
         {"id": po_id},
-        {"$set": {"linked_checks": linked_checks, "amount_paid": max(0, new_amount_paid), "status": new_status}}
+        {"$set": {
+            "linked_checks": linked_checks,
+            "amount_paid": from_cents(new_amount_paid_cents),
+            "amount_paid_cents": new_amount_paid_cents,
+            "status": new_status
+        }}
     )
     
     await db.checks.update_one({"id": check_id}, {"$unset": {"purchase_order_id": ""}})
@@ -2440,6 +5054,8 @@ async def get_my_permissions(current_user: dict = Depends(get_current_user)):
         "email": current_user["email"],
         "role": current_user.get("role", UserRole.SELLER.value),
         "language": current_user.get("language", "en"),
+        "time_zone": current_user.get("time_zone", "UTC"),
+        "fiscal_year_start_month": current_user.get("fiscal_year_start_month", 1),
         "permissions": get_user_permissions(current_user)
     }
 
@@ -2456,12 +5072,40 @@ async def update_my_language(language: str, current_user: dict = Depends(get_cur
     
     return {"message": "Language updated successfully", "language": language}
 
+@api_router.put("/profile/reporting")
+async def update_my_reporting_settings(
+    time_zone: Optional[str] = None,
+    fiscal_year_start_month: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Update the time zone and fiscal year start used for report periods"""
+    update_data = {}
+    if time_zone is not None:
+        if parse_zone(time_zone) is None:
+            raise HTTPException(status_code=400, detail=f"Unknown time zone: {time_zone}")
+        update_data["time_zone"] = time_zone
+    if fiscal_year_start_month is not None:
+        if not 1 <= fiscal_year_start_month <= 12:
+            raise HTTPException(status_code=400, detail="fiscal_year_start_month must be between 1 and 12")
+        update_data["fiscal_year_start_month"] = fiscal_year_start_month
+    
+    if update_data:
+        await db.users.update_one({"id": current_user["id"]}, {"$set": update_data})
+    
+    return {
+        "message": "Reporting settings updated successfully",
+        "time_zone": update_data.get("time_zone", current_user.get("time_zone", "UTC")),
+        "fiscal_year_start_month": update_data.get(
+            "fiscal_year_start_month", current_user.get("fiscal_year_start_month", 1)
+        )
+    }
+
 # ============ Roles and Permissions Info Routes ============
 
 @api_router.get("/roles")
-async def get_available_roles(current_user: dict = Depends(require_admin)):
+async def get_available_roles(request: Request, current_user: dict = Depends(require_admin)):
     """Get all available roles and their permissions (Admin only)"""
-    return {
+    return static_metadata_response(request, {
         "roles": [
             {
                 "value": role.value,
@@ -2470,21 +5114,162 @@ async def get_available_roles(current_user: dict = Depends(require_admin)):
             }
             for role in UserRole
         ]
-    }
+    })
 
 @api_router.get("/permissions")
-async def get_available_permissions(current_user: dict = Depends(require_admin)):
+async def get_available_permissions(request: Request, current_user: dict = Depends(require_admin)):
     """Get all available permissions (Admin only)"""
-    return {
+    return static_metadata_response(request, {
         "permissions": [
             {"value": perm.value, "name": perm.name}
             for perm in Permission
         ]
+    })
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus text exposition, served to local scrapers only"""
+    client_host = request.client.host if request.client else None
+    if not METRICS_ALLOW_REMOTE and client_host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="Metrics are only served locally")
+    return PlainTextResponse(render_prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag})
+
+# ============ Health Routes ============
+
+HEALTH_PING_TIMEOUT_SECONDS = 2
+
+@api_router.get("/health")
+async def health_check():
+    """Readiness probe: pings MongoDB and reports connection pool and latency stats"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=HEALTH_PING_TIMEOUT_SECONDS)
+        status_code, mongo = 200, {"status": "ok", "ping_ms": (time.perf_counter() - started) * 1000}
+    except Exception as e:
+        # The driver's message can name hosts and credentials; this endpoint is public
+        logger.warning(f"Health check ping failed: {type(e).__name__}: {str(e)}")
+        status_code, mongo = 503, {"status": "unavailable"}
+
+    return ORJSONResponse(
+        {
+            "status": "ok" if status_code == 200 else "unavailable",
+            "mongo": mongo,
+            "pool": {
+                **pool_stats.snapshot(),
+                "max_pool_size": MONGO_POOL_OPTIONS["maxPoolSize"],
+                "min_pool_size": MONGO_POOL_OPTIONS["minPoolSize"],
+            },
+            "operations": command_latency.snapshot(),
+        },
+        status_code=status_code
+    )
+
+# ============ Batch Routes ============
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str  # Relative to /api, e.g. "/dashboard/comparison"
+    params: Optional[Dict[str, Any]] = None
+    if_none_match: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+async def run_batch_sub_request(request: Request, sub: BatchSubRequest, current_user: dict) -> dict:
+    """Dispatch one sub-request through the ASGI app in-process, reusing the batch's user"""
+    result = {"id": sub.id, "path": sub.path, "status": 200, "headers": {}, "body": None}
+    if sub.method.upper() != "GET":
+        result.update(status=405, body={"detail": "Only GET sub-requests can be batched"})
+        return result
+    if not sub.path.startswith("/") or sub.path.split("?")[0].rstrip("/") == "/batch":
+        result.update(status=400, body={"detail": "Invalid sub-request path"})
+        return result
+
+    path, _, query = sub.path.partition("?")
+    if sub.params:
+        extra = urlencode(sub.params, doseq=True)
+        query = f"{query}&{extra}" if query else extra
+    headers = [(b"authorization", request.headers.get("authorization", "").encode())]
+    if sub.if_none_match:
+        headers.append((b"if-none-match", sub.if_none_match.encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": request.url.scheme,
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": "",
+        "path": f"{api_router.prefix}{path}",
+        "raw_path": f"{api_router.prefix}{path}".encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "state": {"batch_user": current_user},
     }
 
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    chunks = []
+    response_headers = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            response_headers.update(Headers(raw=message["headers"]))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception as e:
+        logger.error(f"Batch sub-request {sub.path} failed: {str(e)}")
+        result["status"] = 500
+
+    body = b"".join(chunks)
+    if "etag" in response_headers:
+        result["headers"]["etag"] = response_headers["etag"]
+    if body and response_headers.get("content-type", "").startswith("application/json"):
+        result["body"] = orjson.loads(body)
+    elif body:
+        result["body"] = body.decode("utf-8", errors="replace")
+    return result
+
+@api_router.post("/batch")
+async def batch_requests(batch: BatchRequest, request: Request, current_user: dict = Depends(get_current_user)):
+    """Run several GET sub-requests concurrently with a single authentication"""
+    if len(batch.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {MAX_BATCH_REQUESTS} requests")
+
+    # Reads only: don't bump the data version like other POSTs
+    request.state.read_only = True
+    responses = await asyncio.gather(
+        *(run_batch_sub_request(request, sub, current_user) for sub in batch.requests)
+    )
+    return ORJSONResponse({"responses": responses})
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(DataVersionMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(RouteMetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -2493,6 +5278,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_up_mongo_pool():
+    """Ping the server and open MONGO_WARMUP_CONNECTIONS connections concurrently"""
+    started = time.perf_counter()
+    try:
+        await db.command("ping")
+        await asyncio.gather(*(db.command("ping") for _ in range(MONGO_WARMUP_CONNECTIONS)))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"MongoDB pool warmed up in {elapsed_ms:.0f} ms: {pool_stats.snapshot()}")
+    except Exception as e:
+        logger.warning(f"MongoDB warmup failed: {str(e)}")
+
+@app.on_event("startup")
+async def ensure_indexes():
+    for collection in (db.sales, db.expenses):
+        await collection.create_index([("user_id", 1), ("search_tokens", 1)])
+    for collection in (db.sales, db.expenses, db.bank_transactions, db.ledger_entries):
+        await collection.create_index([("user_id", 1), ("date_day", 1)])
+    await db.ledger_entries.create_index([("user_id", 1), ("category_id", 1)])
+    for collection in (db.sales, db.expenses, db.bank_transactions):
+        await collection.create_index([("user_id", 1), ("date_day", -1), ("id", -1)])
+    if RUN_MIGRATIONS_ON_STARTUP:
+        asyncio.create_task(run_migrations())
+
+@app.on_event("startup")
+async def prewarm_heavy_imports():
+    if not PREWARM_IMPORTS:
+        return
+
+    async def prewarm():
+        for name in HEAVY_IMPORTS:
+            await run_in_threadpool(importlib.import_module, name)
+        logger.info(f"Pre-warmed imports: {', '.join(HEAVY_IMPORTS)}")
+
+    asyncio.create_task(prewarm())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file
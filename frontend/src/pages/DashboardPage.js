@@ -19,12 +19,18 @@ export default function DashboardPage() {
   const fetchData = async () => {
     try {
       setLoading(true);
-      const [summaryRes, comparisonRes] = await Promise.all([
-        axios.get(`${API}/dashboard/summary`),
-        axios.get(`${API}/dashboard/comparison?months=6`)
-      ]);
-      setSummary(summaryRes.data);
-      setComparison(comparisonRes.data);
+      const { data } = await axios.post(`${API}/batch`, {
+        requests: [
+          { id: 'summary', path: '/dashboard/summary' },
+          { id: 'comparison', path: '/dashboard/comparison', params: { months: 6 } }
+        ]
+      });
+      const [summaryRes, comparisonRes] = data.responses;
+      if (summaryRes.status !== 200 || comparisonRes.status !== 200) {
+        throw new Error('Dashboard batch request failed');
+      }
+      setSummary(summaryRes.body);
+      setComparison(comparisonRes.body);
     } catch (error) {
       toast.error('Error al cargar datos del dashboard');
     } finally {
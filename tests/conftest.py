@@ -0,0 +1,212 @@
+"""Shared pytest fixtures for the backend.
+
+Tests that talk to MongoDB use MONGO_URL (default: a local mongod) and a throwaway
+database, and are skipped when no server is reachable.
+
+Perf tests (marked ``perf``) need no database. They compare the cost of a hot path
+against tests/perf_baselines.json and are opt-in, since timings depend on the machine
+and its load: run them with ``pytest -m perf``. ``--update-perf-baselines`` runs them
+and rewrites the stored costs from the current run.
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "pl_test")
+
+import server  # noqa: E402
+
+PERF_BASELINES = Path(__file__).resolve().parent / "perf_baselines.json"
+# Each timing sample calls the workload enough times to last at least this long...
+PERF_SAMPLE_SECONDS = 0.02
+# ...and a path keeps being sampled for at least this long
+PERF_MIN_SECONDS = 0.3
+_perf_measured = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-perf-baselines", action="store_true",
+        help="Store the costs measured in this run as the new perf baselines",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: compares a hot path against its stored baseline (opt-in: -m perf)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--update-perf-baselines") or "perf" in (config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="perf gate is opt-in, run with -m perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session):
+    if not session.config.getoption("--update-perf-baselines") or not _perf_measured:
+        return
+    baselines = json.loads(PERF_BASELINES.read_text()) if PERF_BASELINES.exists() else {"paths": {}}
+    for name, cost in _perf_measured.items():
+        entry = baselines["paths"].setdefault(name, {})
+        entry["cost"] = float(f"{cost:.3g}")
+    baselines["paths"] = dict(sorted(baselines["paths"].items()))
+    PERF_BASELINES.write_text(json.dumps(baselines, indent=2) + "\n")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def mongo_url():
+    from pymongo import MongoClient
+
+    url = os.environ["MONGO_URL"]
+    try:
+        MongoClient(url, serverSelectionTimeoutMS=500).admin.command("ping")
+    except Exception as e:
+        pytest.skip(f"MongoDB not reachable at {url}: {e}")
+    return url
+
+
+@pytest.fixture
+async def mongo_db(mongo_url):
+    """A fresh database on a client bound to the test's event loop, with query tracking"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url, event_listeners=[server.query_budget_listener])
+    database = client[f"pl_test_{uuid.uuid4().hex[:12]}"]
+    original_db, server.db = server.db, database
+    try:
+        await server.run_migrations(max_docs_per_second=0)  # As at startup: marks the ledger ready
+        yield database
+    finally:
+        server.db = original_db
+        await client.drop_database(database.name)
+        client.close()
+
+
+@pytest.fixture
+async def api_client(mongo_db):
+    """ASGI client authenticated as a freshly registered admin"""
+    import httpx
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/auth/register", json={
+            "username": "budget",
+            "email": f"budget_{uuid.uuid4().hex[:8]}@test.com",
+            "password": "TestPass123!",
+            "role": "admin",
+        })
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        client.user_id = response.json()["user"]["id"]
+        yield client
+
+
+@contextmanager
+def _assert_max_queries(max_round_trips: int, max_documents: int = None):
+    with server.track_queries() as budget:
+        yield budget
+    assert budget.round_trips <= max_round_trips, (
+        f"Expected at most {max_round_trips} Mongo round trips, got {budget.round_trips}"
+    )
+    if max_documents is not None:
+        assert budget.documents <= max_documents, (
+            f"Expected at most {max_documents} documents returned, got {budget.documents}"
+        )
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Context manager asserting an upper bound on Mongo round trips issued inside it.
+
+        with assert_max_queries(6):
+            await api_client.get("/api/dashboard/summary")
+    """
+    return _assert_max_queries
+
+
+def _time_calls(fn, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+
+def _batch_size(fn) -> int:
+    """Calls per sample so a sample lasts PERF_SAMPLE_SECONDS (like timeit's autorange)"""
+    number = 1
+    while _time_calls(fn, number) < PERF_SAMPLE_SECONDS:
+        number *= 2
+    return number
+
+
+def _calibration_workload():
+    totals = {}
+    for i in range(200_000):
+        key = i % 97
+        totals[key] = totals.get(key, 0.0) + i * 0.5
+    return sorted(totals.values())
+
+
+def _relative_cost(fn, repeat: int) -> float:
+    """Best per-call time of `fn` in units of the calibration workload's best time.
+
+    Samples of the two alternate for at least `repeat` rounds and PERF_MIN_SECONDS,
+    so a slow phase of the machine (other load, frequency scaling, a noisy neighbour)
+    slows both sides of the ratio instead of failing whichever path it lands on.
+    Costs are stored in these units so one baseline file works on faster and slower
+    machines alike.
+    """
+    number = _batch_size(fn)
+    best, best_unit = float("inf"), float("inf")
+    rounds, started = 0, time.perf_counter()
+    while rounds < repeat or time.perf_counter() - started < PERF_MIN_SECONDS:
+        best_unit = min(best_unit, _time_calls(_calibration_workload, 1))
+        best = min(best, _time_calls(fn, number) / number)
+        rounds += 1
+    return best / best_unit
+
+
+@pytest.fixture
+def perf_gate(request):
+    """Time `fn` (see _relative_cost) and fail when it costs more than its baseline allows.
+
+        perf_gate("dashboard_summary", lambda: server.summarize_dashboard(...))
+    """
+    updating = request.config.getoption("--update-perf-baselines")
+    baselines = json.loads(PERF_BASELINES.read_text())
+    default_tolerance = baselines.get("default_tolerance", 0.5)
+    min_slack = baselines.get("min_slack", 0.1)
+
+    def check(name: str, fn, repeat: int = 5):
+        cost = _relative_cost(fn, repeat)
+        _perf_measured[name] = cost
+        if updating:
+            return cost
+        baseline = baselines["paths"].get(name)
+        if baseline is None or "cost" not in baseline:
+            pytest.fail(f"No perf baseline for {name!r}; run pytest with --update-perf-baselines")
+        tolerance = baseline.get("tolerance", default_tolerance)
+        # Tiny workloads also get an absolute allowance: a few percent of the unit is noise
+        limit = max(baseline["cost"] * (1 + tolerance), baseline["cost"] + min_slack)
+        assert cost <= limit, (
+            f"{name} regressed: cost {cost:.2f} units, baseline {baseline['cost']:.2f} "
+            f"(+{tolerance:.0%} or +{min_slack} allowed, limit {limit:.2f})"
+        )
+        return cost
+
+    return check
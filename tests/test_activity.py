@@ -0,0 +1,58 @@
+"""Activity feed: the union pipeline, keyset cursors and a full walk through the pages."""
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def test_cursor_round_trip():
+    cursor = server.encode_activity_cursor({"date_day": 19_783, "id": "abc"})
+    assert server.decode_activity_cursor(cursor) == (19_783, "abc")
+    for bad in ("not-base64!", server.encode_activity_cursor({"date_day": "x", "id": "abc"})):
+        with pytest.raises(HTTPException):
+            server.decode_activity_cursor(bad)
+
+
+def test_each_collection_is_cut_before_the_union():
+    pipeline = server.activity_pipeline(["sales", "expenses"], {"user_id": "u"}, 11)
+    union = pipeline[4]["$unionWith"]
+    assert union["coll"] == "expenses"
+    assert {"$limit": 11} in pipeline[:4] and {"$limit": 11} in union["pipeline"]
+    assert union["pipeline"][-1]["$project"]["kind"] == {"$literal": "expenses"}
+    assert pipeline[-2:] == [{"$sort": server.ACTIVITY_SORT}, {"$limit": 11}]
+
+
+@pytest.mark.anyio
+async def test_pages_cover_every_row_once(api_client, mongo_db):
+    rows = []
+    for collection in server.ACTIVITY_KINDS:
+        documents = [
+            server.with_days({"id": f"{collection}-{i}", "user_id": api_client.user_id, "date": f"2024-03-{i % 5 + 1:02d}",
+                              "amount": float(i), "category_id": "c", "type": "credit", "validated": True})
+            for i in range(12)
+        ]
+        await mongo_db[collection].insert_many([dict(document) for document in documents])
+        rows += documents
+    # Unparseable and never-backfilled dates have no place on the timeline
+    await mongo_db.sales.insert_many([
+        {"id": "undated", "user_id": api_client.user_id, "date": "someday", "date_day": None, "amount": 1.0},
+        {"id": "not-backfilled", "user_id": api_client.user_id, "date": "2024-03-09", "amount": 1.0},
+    ])
+    expected = [row["id"] for row in sorted(rows, key=lambda row: (row["date_day"], row["id"]), reverse=True)]
+
+    # 37 puts the page boundary where the undated rows would sort
+    for limit in (7, len(expected) + 1):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            response = await api_client.get("/api/activity", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            seen += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == expected
+
+    page = (await api_client.get("/api/activity", params={"kinds": "expenses", "min_amount": 10})).json()
+    assert [(item["kind"], item["amount"]) for item in page["items"]] == [("expenses", 11.0), ("expenses", 10.0)]
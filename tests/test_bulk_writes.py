@@ -0,0 +1,92 @@
+"""Bulk write endpoints: per-item results and the ledger staying in sync."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def located_client(api_client, mongo_db):
+    await mongo_db.users.update_one({"id": api_client.user_id}, {"$set": {"active_location_id": "main"}})
+    return api_client
+
+
+def sale(**fields):
+    return {"date": "2024-09-01", "amount": 10.5, "category_id": "c", "payment_method": "Zelle", **fields}
+
+
+async def test_bad_items_fail_alone(located_client, mongo_db):
+    response = await located_client.post("/api/sales/bulk", json={
+        "create": [sale(), sale(date="09/02/2024"), sale(date="someday")],
+        "delete": ["missing"],
+    })
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 2)
+    assert [(r["op"], r["ok"], r["error"]) for r in body["results"][2:]] == [
+        ("create", False, "Invalid date: someday"), ("delete", False, "Not found"),
+    ]
+    dates = sorted(s["date"] for s in await mongo_db.sales.find({}, {"_id": 0}).to_list(10))
+    assert dates == ["2024-09-01", "2024-09-02"]
+
+
+async def test_malformed_items_fail_alone(located_client, mongo_db):
+    created = (await located_client.post("/api/expenses/bulk", json={"create": [sale()]})).json()
+    response = await located_client.post("/api/expenses/bulk", json={
+        "create": [sale(amount="abc"), "not an object", sale()],
+        "update": [{"id": created["results"][0]["id"], "amount": 5}],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (1, 3)
+    assert [(r["op"], r["index"], r["ok"]) for r in body["results"]] == [
+        ("create", 0, False), ("create", 1, False), ("create", 2, True), ("update", 0, False),
+    ]
+    assert body["results"][0]["error"].startswith("amount: ")
+    assert body["results"][3]["id"] == created["results"][0]["id"]
+
+
+async def test_creates_need_an_active_location(api_client, mongo_db):
+    response = await api_client.post("/api/sales/bulk", json={"create": [sale()]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Select an active location before adding sales"
+    assert (await api_client.post("/api/sales/bulk", json={"delete": ["missing"]})).json()["failed"] == 1
+
+
+async def test_updates_and_deletes_reach_the_ledger(located_client, mongo_db):
+    created = (await located_client.post("/api/sales/bulk", json={"create": [sale() for _ in range(4)]})).json()
+    ids = [result["id"] for result in created["results"]]
+
+    body = (await located_client.post("/api/sales/bulk", json={
+        "update": [{"id": ids[0], **sale(amount=20)}, {"id": ids[1], **sale(amount=30)}],
+        "delete": [ids[1], ids[2]],
+    })).json()
+    assert (body["updated"], body["deleted"], body["failed"]) == (2, 1, 1)
+    assert body["results"][2]["error"] == "Already updated or deleted in this request"
+
+    entries = {e["source_id"]: e["amount_cents"] for e in await mongo_db.ledger_entries.find().to_list(10)}
+    assert entries == {ids[0]: 2000, ids[1]: 3000, ids[3]: 1050}
+    summary = (await located_client.get("/api/dashboard/summary")).json()
+    assert summary["total_income"] == 60.5
+
+
+async def test_bulk_validate_tuples_and_filter(api_client, mongo_db):
+    await mongo_db.bank_transactions.insert_many([
+        {"id": f"t{i}", "user_id": api_client.user_id, "statement_id": "st", "date": "2024-09-03", "date_day": 19_969,
+         "description": "ZELLE FROM ANA" if i < 3 else "CARD PURCHASE", "amount": 5.0, "amount_cents": 500,
+         "type": "credit", "validated": False}
+        for i in range(6)
+    ])
+    body = (await api_client.post("/api/bank-transactions/bulk-validate", json={"transactions": [
+        {"id": "t0", "type": "credit", "category_id": "income"},
+        {"id": "t3", "type": "debit", "category_id": "supplies"},
+        {"id": "t4", "type": "sideways"},
+        {"id": "missing", "type": "debit"},
+    ]})).json()
+    assert (body["validated"], body["failed"]) == (2, 2)
+
+    body = (await api_client.post("/api/bank-transactions/bulk-validate", json={
+        "filter": {"statement_id": "st", "description": "zelle"}, "category_id": "income",
+    })).json()
+    assert body["validated"] == 2  # t0 is already validated
+
+    entries = {e["source_id"]: e["amount_cents"] for e in await mongo_db.ledger_entries.find().to_list(10)}
+    assert entries == {"t0": 500, "t1": 500, "t2": 500, "t3": -500}
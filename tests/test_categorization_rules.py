@@ -0,0 +1,110 @@
+"""Categorization rules: matching order and conditions, the cached matcher and bulk apply."""
+import time
+
+import pytest
+
+import server
+
+
+def rule(rule_id, **fields):
+    return {"id": rule_id, "category_id": f"cat-{rule_id}", **fields}
+
+
+def transaction(description, amount=10.0, kind="debit"):
+    return {"description": description, "amount": amount, "type": kind}
+
+
+def test_first_matching_rule_by_priority():
+    matcher = server.RuleMatcher(0, [
+        rule("zelle", description_contains="ZELLE TO", type="debit", created_at="2024-01-01"),
+        rule("big", min_amount=1000, priority=5),
+        rule("paypal", description_regex=r"purchase authorized on \d\d/\d\d paypal", max_amount=100),
+        rule("zelle-late", description_contains="zelle", created_at="2024-02-01"),
+    ])
+    matches = matcher.match_all([
+        transaction("Zelle to Garcia Ana"),
+        transaction("Zelle to Garcia Ana", amount=1500),
+        transaction("Zelle from Garcia Ana", kind="credit"),
+        transaction("Purchase authorized on 09/03 PayPal *Adobe"),
+        transaction("Purchase authorized on 09/03 PayPal *Adobe", amount=150),
+        transaction(None),
+    ])
+    assert [m and m.id for m in matches] == ["zelle", "big", "zelle-late", "paypal", None, None]
+
+
+@pytest.mark.parametrize("pattern", ["(a+)+$", r"(\w+\s?)*$", "(a|aa)*$", r"(a)\1", "x" * 201])
+def test_backtracking_patterns_are_refused(pattern):
+    with pytest.raises(server.HTTPException):
+        server.check_rule(server.CategorizationRuleCreate(category_id="c", description_regex=pattern))
+
+
+def test_stored_backtracking_rule_is_skipped():
+    # Saved before the check existed: (a+)+$ on this input backtracks for seconds
+    matcher = server.RuleMatcher(0, [rule("bad", description_regex="(a+)+$"), rule("ok", description_regex="a{3}")])
+    started = time.perf_counter()
+    assert [m.id for m in matcher.match_all([transaction("a" * 27 + "!")])] == ["ok"]
+    assert time.perf_counter() - started < 0.5
+
+
+def test_match_budget_stops_early():
+    matcher = server.RuleMatcher(0, [rule("any", description_contains="zelle")])
+    transactions = [transaction("ZELLE TO ANA")] * 1000
+    assert len(matcher.match_all(transactions, budget_seconds=10)) == 1000
+    assert len(matcher.match_all(transactions, budget_seconds=-1)) == 0
+
+
+def test_rule_checks():
+    for fields in ({}, {"type": "sideways"}, {"min_amount": 5, "max_amount": 1}, {"description_regex": "("}):
+        with pytest.raises(server.HTTPException):
+            server.check_rule(server.CategorizationRuleCreate(category_id="c", **fields))
+
+
+@pytest.mark.anyio
+async def test_apply_and_cache(api_client, mongo_db):
+    created = (await api_client.post("/api/categorization-rules", json={
+        "category_id": "transfers", "description_contains": "zelle to", "type": "debit",
+    })).json()
+    await mongo_db.bank_transactions.insert_many([
+        {"id": f"t{i}", "user_id": api_client.user_id, "statement_id": "st", "date": "2024-09-03",
+         "description": "ZELLE TO ANA", "amount": 5.0, "type": "debit", "validated": i == 0}
+        for i in range(3)
+    ])
+
+    body = (await api_client.post("/api/categorization-rules/apply")).json()
+    assert (body["checked"], body["categorized"], body["by_rule"]) == (2, 2, {created["id"]: 2})
+    assert not body["timed_out"]
+    transactions = await mongo_db.bank_transactions.find({"category_id": "transfers"}, {"_id": 0}).to_list(10)
+    assert sorted((t["id"], t["rule_id"]) for t in transactions) == [("t1", created["id"]), ("t2", created["id"])]
+    assert await mongo_db.ledger_entries.count_documents({}) == 0  # Still unvalidated
+
+    # Editing a rule recompiles the matcher
+    await api_client.put(f"/api/categorization-rules/{created['id']}", json={
+        "category_id": "rent", "description_contains": "zelle to", "type": "debit",
+    })
+    body = (await api_client.post("/api/categorization-rules/apply", params={"overwrite": True})).json()
+    assert body["categorized"] == 2
+    assert await mongo_db.bank_transactions.count_documents({"category_id": "rent"}) == 2
+
+
+@pytest.mark.anyio
+async def test_timed_out_apply_resumes_after_cursor(api_client, mongo_db, monkeypatch):
+    async def two_at_a_time(self, transactions):  # As if the budget ran out after two
+        return self.match_all(transactions)[:2]
+
+    monkeypatch.setattr(server.RuleMatcher, "match_all_in_threadpool", two_at_a_time)
+    await api_client.post("/api/categorization-rules", json={"category_id": "transfers", "description_contains": "zelle"})
+    await mongo_db.bank_transactions.insert_many([
+        {"id": f"t{i}", "user_id": api_client.user_id, "statement_id": "st", "date": "2024-09-03",
+         "description": "ZELLE TO ANA" if i == 4 else "RENT", "amount": 5.0, "type": "debit"}
+        for i in reversed(range(5))
+    ])
+
+    runs, after = [], None
+    while True:
+        body = (await api_client.post("/api/categorization-rules/apply", params={"after": after} if after else {})).json()
+        runs.append((body["checked"], body["timed_out"], body["next_cursor"]))
+        after = body["next_cursor"]
+        if not body["timed_out"]:
+            break
+    assert runs == [(2, True, "t1"), (2, True, "t3"), (1, False, None)]
+    assert await mongo_db.bank_transactions.count_documents({"category_id": "transfers"}) == 1
@@ -0,0 +1,22 @@
+"""Sales CSV import: rows go to the user's active location."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+CSV = "date,amount,category_id,payment_method,description\n2024-09-01,12.50,c,Zelle,Lunch\n"
+
+
+async def test_import_needs_an_active_location(api_client, mongo_db):
+    response = await api_client.post("/api/sales/import-csv", files={"file": ("sales.csv", CSV, "text/csv")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Select an active location before importing sales"
+    assert await mongo_db.sales.count_documents({}) == 0
+
+
+async def test_import_uses_the_active_location(api_client, mongo_db):
+    await mongo_db.users.update_one({"id": api_client.user_id}, {"$set": {"active_location_id": "main"}})
+    response = await api_client.post("/api/sales/import-csv", files={"file": ("sales.csv", CSV, "text/csv")})
+    assert response.json()["count"] == 1
+    sale = await mongo_db.sales.find_one({}, {"_id": 0})
+    assert (sale["location_id"], sale["amount"], sale["source"]) == ("main", 12.5, "csv")
+    assert await mongo_db.ledger_entries.count_documents({"source": "sales", "location_id": "main"}) == 1
@@ -0,0 +1,20 @@
+"""Description search on the sales/expenses listings."""
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_substring_is_the_default_and_indexed_is_opt_in(api_client, mongo_db):
+    await mongo_db.sales.insert_many([
+        server.with_search_tokens({"id": f"s{i}", "user_id": api_client.user_id, "location_id": "main",
+                                   "date": "2024-09-01", "amount": 1.0, "category_id": "c",
+                                   "payment_method": "Zelle", "description": description})
+        for i, description in enumerate(["Banana split", "Zelle Ana Garcia"])
+    ])
+
+    default = (await api_client.get("/api/sales", params={"description": "ana"})).json()
+    assert sorted(sale["id"] for sale in default) == ["s0", "s1"]
+    indexed = (await api_client.get("/api/sales", params={"description": "ana", "search_mode": "indexed"})).json()
+    assert [sale["id"] for sale in indexed] == ["s1"]
@@ -0,0 +1,42 @@
+"""Records that cross the log queue keep their traceback apart from the message."""
+import logging
+import queue
+import sys
+
+import orjson
+import pytest
+
+import server
+
+
+def through_queue(record: logging.LogRecord) -> logging.LogRecord:
+    log_queue = queue.SimpleQueue()
+    server.StructuredQueueHandler(log_queue).handle(record)
+    return log_queue.get_nowait()
+
+
+def failing_record() -> logging.LogRecord:
+    try:
+        raise ValueError("bad statement line")
+    except ValueError:
+        return logging.getLogger("test").makeRecord(
+            "test", logging.ERROR, __file__, 1, "parse failed for %s", ("stmt-1",), sys.exc_info(),
+        )
+
+
+def test_json_keeps_traceback_out_of_message():
+    line = orjson.loads(server.StructuredFormatter(as_json=True).format(through_queue(failing_record())))
+    assert line["message"] == "parse failed for stmt-1"
+    assert "Traceback" in line["exc_info"] and "bad statement line" in line["exc_info"]
+
+
+def test_text_still_appends_traceback():
+    text = server.StructuredFormatter(as_json=False).format(through_queue(failing_record()))
+    assert "parse failed for stmt-1" in text
+    assert text.rstrip().endswith("ValueError: bad statement line")
+
+
+@pytest.mark.parametrize("filename", ["../../etc/passwd", "/abs/statement.pdf", "", None])
+def test_upload_tmp_path_stays_in_tmp(filename):
+    path = server.upload_tmp_path(filename, "_debug.txt")
+    assert path.startswith("/tmp/") and "/" not in path[len("/tmp/"):]
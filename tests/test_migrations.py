@@ -0,0 +1,137 @@
+"""Migration runner: checkpointed resume, the runner lease and the data steps."""
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def fresh_migrations(mongo_db):
+    """The database as before any migration ran (mongo_db runs them all)"""
+    await mongo_db.migrations.delete_many({})
+    return mongo_db
+
+
+async def test_failed_step_resumes_from_checkpoint(fresh_migrations, monkeypatch):
+    mongo_db = fresh_migrations
+    await mongo_db.sales.insert_many([
+        {"id": f"s{i}", "user_id": "u", "date": "2024-09-01", "amount": 1.25, "description": f"venta {i}"}
+        for i in range(25)
+    ])
+    step = next(m for m in server.MIGRATIONS if m.name == "sales.amount_cents")
+    writes, calls = step.writes, []
+
+    def fail_second_batch(batch):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise RuntimeError("interrupted")
+        return writes(batch)
+
+    monkeypatch.setattr(step, "writes", fail_second_batch)
+    assert not await server.run_migrations([step.version], batch_size=10, max_docs_per_second=0)
+    state = await mongo_db.migrations.find_one({"_id": step.version})
+    assert (state["status"], state["processed"]) == ("failed", 10)
+
+    monkeypatch.setattr(step, "writes", writes)
+    assert await server.run_migrations([step.version], batch_size=10, max_docs_per_second=0)
+    state = await mongo_db.migrations.find_one({"_id": step.version})
+    assert (state["status"], state["processed"]) == ("done", 25)
+    assert await mongo_db.sales.count_documents({"amount_cents": 125}) == 25
+
+
+async def test_lease_blocks_second_runner(fresh_migrations):
+    mongo_db = fresh_migrations
+    assert await server.acquire_migration_lease("other-host")
+    assert not await server.run_migrations()
+    assert await mongo_db.migrations.count_documents({"_id": {"$ne": server.MIGRATION_LEASE_ID}}) == 0
+
+    await server.release_migration_lease("other-host")
+    assert await server.run_migrations(max_docs_per_second=0)
+    assert await mongo_db.migrations.find_one({"_id": server.MIGRATION_LEASE_ID}) is None
+
+
+async def test_purchase_order_back_references(fresh_migrations):
+    mongo_db = fresh_migrations
+    await mongo_db.checks.insert_many([
+        {"id": "c1", "user_id": "u", "check_number": "1", "date_issued": "2024-09-01", "amount": 5.0},
+        {"id": "c2", "user_id": "u", "check_number": "2", "date_issued": "2024-09-01", "amount": 6.0,
+         "purchase_order_id": "po-other"},
+    ])
+    await mongo_db.purchase_orders.insert_one({
+        "id": "po-1", "user_id": "u", "po_number": "1", "supplier": "Sysco", "date_created": "2024-09-01",
+        "subtotal": 11.0, "total": 11.0, "linked_checks": ["c1", "c2"], "linked_expenses": [],
+    })
+
+    assert await server.run_migrations(max_docs_per_second=0)
+    checks = {c["id"]: c for c in await mongo_db.checks.find({}, {"_id": 0}).to_list(10)}
+    assert checks["c1"]["purchase_order_id"] == "po-1"
+    assert checks["c2"]["purchase_order_id"] == "po-other"
+
+
+async def test_ledger_backfill(fresh_migrations):
+    mongo_db = fresh_migrations
+    await mongo_db.categories.insert_one({"id": "cogs", "user_id": "u", "name": "Food", "type": "expense", "is_cogs": True})
+    await mongo_db.sales.insert_one({"id": "s1", "user_id": "u", "date": "2024-09-01", "amount": 12.5,
+                                     "category_id": "inc", "payment_method": "Zelle"})
+    await mongo_db.expenses.insert_one({"id": "e1", "user_id": "u", "date": "2024-09-02", "amount": 4.0, "category_id": "cogs"})
+    await mongo_db.bank_transactions.insert_many([
+        {"id": "b1", "user_id": "u", "date": "2024-09-03", "amount": 2.0, "type": "debit", "validated": True,
+         "category_id": "cogs"},
+        {"id": "b2", "user_id": "u", "date": "2024-09-03", "amount": 9.0, "type": "credit", "validated": False},
+    ])
+
+    assert await server.run_migrations(max_docs_per_second=0)
+    entries = {e["_id"]: e for e in await mongo_db.ledger_entries.find().to_list(10)}
+    assert set(entries) == {"sales:s1", "expenses:e1", "bank_transactions:b1"}
+    assert entries["sales:s1"]["amount_cents"] == 1250
+    assert (entries["expenses:e1"]["amount_cents"], entries["expenses:e1"]["is_cogs"]) == (-400, True)
+    assert entries["bank_transactions:b1"]["date_day"] == server.to_epoch_day("2024-09-03")
+
+
+async def test_debug_cogs_from_ledger_matches_sources(api_client, mongo_db):
+    food = (await api_client.post("/api/categories", json={"name": "Food", "type": "expense", "is_cogs": True})).json()["id"]
+    await mongo_db.expenses.insert_one(server.with_cents({
+        "id": "e1", "user_id": api_client.user_id, "date": "2024-09-02", "amount": 4.1, "category_id": food,
+    }))
+    await mongo_db.bank_transactions.insert_one(server.with_cents({
+        "id": "b1", "user_id": api_client.user_id, "date": "2024-09-03", "amount": 2.0, "type": "debit",
+        "validated": True, "category_id": food,
+    }))
+    server._ledger_ready[mongo_db.name] = False
+    server._ledger_checked_at[mongo_db.name] = float("inf")  # Read the sources until the backfill below
+    from_sources = (await api_client.get("/api/debug/cogs")).json()
+    await mongo_db.migrations.delete_many({})
+    assert await server.run_migrations(max_docs_per_second=0)
+    from_ledger = (await api_client.get("/api/debug/cogs")).json()
+
+    assert from_ledger["source"] == "ledger"
+    for key in ("total_cogs_from_expenses", "total_cogs_from_bank", "total_cogs", "total_expenses", "total_bank_transactions"):
+        assert from_ledger[key] == pytest.approx(from_sources[key])
+    assert [e["id"] for e in from_ledger["cogs_expenses"]] == ["e1"]
+    assert [t["id"] for t in from_ledger["cogs_bank_transactions"]] == ["b1"]
+
+
+async def test_ledger_backfill_keeps_api_writes_made_during_a_batch(fresh_migrations, monkeypatch):
+    mongo_db = fresh_migrations
+    await mongo_db.sales.insert_many([
+        {"id": f"s{i}", "user_id": "u", "date": "2024-09-01", "amount": 10.0, "category_id": "inc"} for i in range(3)
+    ])
+    read_cogs = server.cogs_category_ids
+
+    async def edit_during_batch(user_ids):
+        # Runs after the backfill read its batch and before it writes: what a live API request could do
+        monkeypatch.setattr(server, "cogs_category_ids", read_cogs)
+        edited = server.with_days(server.with_cents({"amount": 25.0, "date": "2024-09-02"}))
+        await mongo_db.sales.update_one({"id": "s0"}, {"$set": edited})
+        await server.sync_ledger("sales", "u", [await mongo_db.sales.find_one({"id": "s0"})])
+        await mongo_db.sales.delete_one({"id": "s1"})
+        await server.sync_ledger("sales", "u", [], ["s1"])
+        return await read_cogs(user_ids)
+
+    monkeypatch.setattr(server, "cogs_category_ids", edit_during_batch)
+    assert await server.run_migrations(max_docs_per_second=0)
+    entries = {e["_id"]: e for e in await mongo_db.ledger_entries.find({"source": "sales"}).to_list(10)}
+    assert set(entries) == {"sales:s0", "sales:s2"}
+    assert entries["sales:s0"]["amount_cents"] == 2500
+    assert entries["sales:s0"]["date_day"] == server.to_epoch_day("2024-09-02")
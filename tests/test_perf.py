@@ -0,0 +1,165 @@
+"""Performance regression gate for the hot paths.
+
+Each test times the pure-Python part of an endpoint over in-memory data and
+compares it with tests/perf_baselines.json (see the perf_gate fixture). Nothing here
+needs MongoDB or PDFs, so the gate runs offline; it is opt-in with ``pytest -m perf``.
+After an intended speed-up, lower the baselines with
+``pytest tests/test_perf.py --update-perf-baselines``.
+"""
+import random
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.perf
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+USER_ID = "perf-user"
+
+
+def make_categories():
+    income = [{"id": str(uuid.uuid4()), "name": f"Income {i}", "type": "income", "is_cogs": False} for i in range(6)]
+    expense = [{"id": str(uuid.uuid4()), "name": f"Expense {i}", "type": "expense", "is_cogs": i < 3} for i in range(20)]
+    return income, expense
+
+
+def make_rows(rng, count, category_ids, **fields):
+    start = date(2024, 1, 1)
+    return [
+        server.with_days(server.with_cents({
+            "id": str(uuid.uuid4()),
+            "user_id": USER_ID,
+            "location_id": "main",
+            "date": (start + timedelta(days=rng.randrange(365))).isoformat(),
+            "amount": round(rng.uniform(1, 2000), 2),
+            "category_id": rng.choice(category_ids),
+            "description": f"row {i}",
+            **{name: rng.choice(values) for name, values in fields.items()},
+        }))
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    rng = random.Random(0)
+    income, expense = make_categories()
+    sales = make_rows(rng, 10_000, [c["id"] for c in income], payment_method=["Efectivo", "Tarjeta", "Zelle"])
+    expenses = make_rows(rng, 10_000, [c["id"] for c in expense])
+    bank = make_rows(rng, 2_000, [c["id"] for c in income + expense], type=["credit", "debit"], validated=[True])
+    return {"sales": sales, "expenses": expenses, "bank": bank, "categories": income + expense}
+
+
+def test_dashboard_summary(perf_gate, ledger):
+    summary = server.summarize_dashboard(ledger["sales"], ledger["expenses"], ledger["bank"], ledger["categories"])
+    assert summary.total_income == pytest.approx(
+        sum(s["amount"] for s in ledger["sales"]) + sum(t["amount"] for t in ledger["bank"] if t["type"] == "credit")
+    )
+    perf_gate("dashboard_summary", lambda: server.summarize_dashboard(
+        ledger["sales"], ledger["expenses"], ledger["bank"], ledger["categories"]
+    ))
+
+
+def test_summary_index_ranges(perf_gate, ledger):
+    entries = server.ledger_entries_from(ledger["sales"], ledger["expenses"], ledger["bank"])
+    index = server.build_summary_index(0, entries, ledger["categories"])
+    start, end = server.to_epoch_day("2024-03-10"), server.to_epoch_day("2024-05-20")
+
+    def in_range(rows):
+        return [row for row in rows if start <= row["date_day"] <= end]
+
+    assert index.summary(start, end) == server.summarize_dashboard(
+        in_range(ledger["sales"]), in_range(ledger["expenses"]), in_range(ledger["bank"]), ledger["categories"]
+    )
+    assert index.summary() == server.summarize_dashboard(
+        ledger["sales"], ledger["expenses"], ledger["bank"], ledger["categories"]
+    )
+    # A date-range picker being dragged: 100 different ranges
+    perf_gate("summary_index_ranges", lambda: [index.summary(start + i, end + i) for i in range(100)])
+
+
+def test_month_comparison(perf_gate, ledger):
+    periods = server.last_periods("month", 12, date(2024, 12, 31))
+
+    def compare():
+        return server.bucket_period_totals(periods, ledger["sales"], ledger["expenses"], ledger["bank"])
+
+    income = sum(totals[0] for totals in compare())
+    assert server.from_cents(income) == pytest.approx(server.summarize_dashboard(
+        ledger["sales"], [], ledger["bank"], ledger["categories"]
+    ).total_income)
+    perf_gate("month_comparison", compare)
+
+
+def test_csv_import(perf_gate):
+    pytest.importorskip("pandas")
+    rng = random.Random(1)
+    rows = [
+        f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},{rng.uniform(1, 500):.2f},cat-{rng.randint(1, 5)},"
+        f"Efectivo,Venta mostrador {i}"
+        for i in range(2_000)
+    ]
+    text = "date,amount,category_id,payment_method,description\n" + "\n".join(rows)
+
+    assert len(server.parse_sales_csv(text, USER_ID, "main")) == 2_000
+    perf_gate("csv_import", lambda: server.parse_sales_csv(text, USER_ID, "main"), repeat=3)
+
+
+def test_statement_parsing(perf_gate):
+    page = (FIXTURES / "statement_checking.txt").read_text()
+    pages = [page] * 30
+
+    transactions, _, _ = server.parse_statement_pages([page], USER_ID)
+    assert len(transactions) >= 25
+    perf_gate("statement_parsing", lambda: server.parse_statement_pages(pages, USER_ID))
+
+
+def test_auto_match(perf_gate):
+    rng = random.Random(2)
+    start = date(2024, 1, 1)
+    checks = [
+        server.with_days(server.with_cents({
+            "id": str(uuid.uuid4()), "check_number": str(1000 + i), "amount": round(rng.uniform(50, 5000), 2),
+            "date_issued": (start + timedelta(days=rng.randrange(365))).isoformat(),
+        }), ("date_issued",))
+        for i in range(1_000)
+    ]
+    # A third clear by check number, the rest are unrelated debits
+    transactions = [
+        server.with_days(server.with_cents({
+            "id": str(uuid.uuid4()), "check_number": checks[i // 3]["check_number"] if i % 3 == 0 else None,
+            "amount": round(rng.uniform(1, 40), 2), "date": (start + timedelta(days=rng.randrange(365))).isoformat(),
+        }))
+        for i in range(3_000)
+    ]
+
+    assert len(server.match_checks(transactions, checks)) == 1_000
+    perf_gate("auto_match", lambda: server.match_checks(transactions, checks))
+
+
+def test_rule_matching(perf_gate):
+    rng = random.Random(3)
+    rules = [
+        {"id": f"vendor-{i}", "category_id": "supplies", "description_contains": f"vendor {i} ", "type": "debit"}
+        for i in range(40)
+    ] + [{"id": "paypal", "category_id": "software", "description_regex": r"paypal \*\w+", "max_amount": 100}]
+    matcher = server.RuleMatcher(0, rules)
+    transactions = [
+        {"description": f"Purchase authorized on 09/03 VENDOR {rng.randrange(80)} CITY", "amount_cents": 1000,
+         "type": rng.choice(["debit", "credit"])}
+        for _ in range(20_000)
+    ]
+
+    matches = matcher.match_all(transactions)
+    assert all((rule is not None) == (t["type"] == "debit" and int(t["description"].split()[5]) < 40)
+               for t, rule in zip(transactions, matches))
+    perf_gate("rule_matching", lambda: matcher.match_all(transactions))
+
+
+def test_list_serialization(perf_gate, ledger):
+    rows = [{**sale, "source": "manual", "created_at": "2024-01-01T00:00:00+00:00"} for sale in ledger["sales"]]
+    perf_gate("list_serialization", lambda: server.SALE_PROJECTION.response(rows))
@@ -0,0 +1,87 @@
+"""Report period boundaries and single-pass bucketing."""
+from datetime import date
+
+import pytest
+
+import server
+
+
+def labels(periods):
+    return [period.label for period in periods]
+
+
+def test_months_are_consecutive_across_short_months():
+    # Walking back 30 days at a time from March 31 used to skip February
+    periods = server.last_periods("month", 4, date(2024, 3, 31))
+    assert labels(periods) == ["2023-12", "2024-01", "2024-02", "2024-03"]
+    assert (periods[2].start, periods[2].end) == ("2024-02-01", "2024-02-29")
+
+
+def test_iso_weeks_cross_the_year():
+    periods = server.last_periods("week", 2, date(2025, 1, 1))
+    assert labels(periods) == ["2024-W52", "2025-W01"]
+    assert (periods[1].start, periods[1].end) == ("2024-12-30", "2025-01-05")
+
+
+def test_quarters_and_fiscal_years():
+    assert labels(server.last_periods("quarter", 3, date(2024, 2, 10))) == ["2023-Q3", "2023-Q4", "2024-Q1"]
+
+    fiscal = server.last_periods("fiscal_year", 2, date(2024, 9, 15), fiscal_start_month=7)
+    assert labels(fiscal) == ["FY2024", "FY2025"]
+    assert (fiscal[1].start, fiscal[1].end) == ("2024-07-01", "2025-06-30")
+
+
+def test_invalid_granularity():
+    with pytest.raises(server.HTTPException):
+        server.last_periods("fortnight", 2, date(2024, 1, 1))
+
+
+def test_local_today_follows_user_time_zone():
+    user = {"time_zone": "Pacific/Kiritimati"}  # UTC+14: always ahead of UTC
+    assert server.local_today(user) >= server.local_today({"time_zone": "Etc/GMT+12"})
+    assert server.local_today({"time_zone": "Not/AZone"}) == server.local_today({})
+    assert server.local_today({"time_zone": "America"}) == server.local_today({})  # A tzdata directory
+
+
+@pytest.mark.parametrize("name", ["America", "Etc", "Not/AZone", "../etc/passwd", ""])
+def test_unknown_zone_names_are_rejected(name):
+    assert server.parse_zone(name) is None
+
+
+def test_bucket_period_totals():
+    periods = server.last_periods("month", 2, date(2024, 2, 15))
+    sales = [
+        {"date": "2024-01-31", "amount": 10.0},
+        {"date": "2024-02-01", "amount": 2.5, "amount_cents": 250},
+        {"date": "2023-12-31", "amount": 99.0},  # Before the first period
+    ]
+    expenses = [{"date": "2024-02-29", "date_day": server.to_epoch_day("2024-02-29"), "amount": 1.0}]
+    bank = [
+        {"date": "2024-01-05", "amount": 4.0, "type": "credit"},
+        {"date": "2024-01-06", "amount": 3.0, "type": "debit"},
+    ]
+    assert server.bucket_period_totals(periods, sales, expenses, bank) == [(1400, 300), (250, 100)]
+
+
+@pytest.mark.anyio
+async def test_period_totals_fallback_groups_in_mongo(mongo_db):
+    """Before the ledger is ready the totals come from per-day groups, raw documents included"""
+    periods = server.last_periods("month", 2, date(2024, 2, 15))
+    sales = [
+        {"date": "2024-01-31", "amount": 10.0},
+        {"date": "2024-01-31", "amount": 10.0},
+        {"date": "2024-02-01", "date_day": server.to_epoch_day("2024-02-01"), "amount": 2.5, "amount_cents": 250},
+        {"date": "2023-12-31", "amount": 99.0},
+    ]
+    expenses = [{"date": "2024-02-29", "date_day": server.to_epoch_day("2024-02-29"), "amount": 1.005}]
+    bank = [
+        {"date": "2024-01-05", "amount": 4.0, "type": "credit", "validated": True, "category_id": "c"},
+        {"date": "2024-01-06", "amount": 3.0, "type": "debit", "validated": True, "category_id": "c"},
+        {"date": "2024-01-07", "amount": 8.0, "type": "debit", "validated": False, "category_id": "c"},
+    ]
+    for collection, documents in (("sales", sales), ("expenses", expenses), ("bank_transactions", bank)):
+        await mongo_db[collection].insert_many([{**document, "user_id": "u"} for document in documents])
+    server._ledger_ready[mongo_db.name] = False
+    server._ledger_checked_at[mongo_db.name] = float("inf")
+
+    assert await server.query_period_totals("u", periods) == [(2400, 300), (250, 101)]
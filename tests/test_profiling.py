@@ -0,0 +1,23 @@
+"""Which requests ask for an on-demand profile."""
+import pytest
+
+import server
+
+
+def scope(query_string: bytes = b"", headers=()):
+    return {"type": "http", "query_string": query_string, "headers": list(headers)}
+
+
+@pytest.mark.parametrize("query_string", [b"_profile=1", b"a=2&_profile=1", b"_profile=1&b=3"])
+def test_profile_query_flag(query_string):
+    assert server.ProfilingMiddleware.is_flagged(scope(query_string))
+
+
+@pytest.mark.parametrize("query_string", [b"", b"x_profile=1", b"_profile=10", b"_profile=0", b"q=_profile=1"])
+def test_lookalike_query_strings_are_not_flagged(query_string):
+    assert not server.ProfilingMiddleware.is_flagged(scope(query_string))
+
+
+def test_profile_header_flag():
+    assert server.ProfilingMiddleware.is_flagged(scope(headers=[(b"x-profile", b"1")]))
+    assert not server.ProfilingMiddleware.is_flagged(scope(headers=[(b"x-profile", b"10")]))
@@ -0,0 +1,98 @@
+"""Mongo round-trip budgets for the hot endpoints.
+
+Each budget is the current number of round trips, including the user lookup
+in get_current_user and the data-version bump after writes. Lower a budget
+when an endpoint gets cheaper. Never raise one to make a test pass.
+"""
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def seed_checks_and_transactions(db, user_id: str, count: int):
+    checks, transactions = [], []
+    for i in range(count):
+        number = str(1000 + i)
+        checks.append({
+            "id": str(uuid.uuid4()), "user_id": user_id, "check_number": number,
+            "date_issued": "2024-03-01", "amount": 100.0 + i, "payee": "Vendor", "status": "pending",
+        })
+        transactions.append({
+            "id": str(uuid.uuid4()), "user_id": user_id, "statement_id": "manual", "date": "2024-03-04",
+            "description": f"CHECK #{number}", "amount": 100.0 + i, "type": "debit",
+            "check_number": number, "matched_check_id": None, "validated": False,
+        })
+    await db.checks.insert_many(checks)
+    await db.bank_transactions.insert_many(transactions)
+
+
+async def test_dashboard_summary_budget(api_client, assert_max_queries):
+    with assert_max_queries(3):
+        response = await api_client.get("/api/dashboard/summary")
+    assert response.status_code == 200
+
+
+async def test_month_comparison_budget(api_client, assert_max_queries):
+    with assert_max_queries(2):
+        response = await api_client.get("/api/dashboard/comparison", params={"months": 6})
+    assert response.status_code == 200
+
+
+async def test_auto_match_budget(api_client, mongo_db, assert_max_queries):
+    await seed_checks_and_transactions(mongo_db, api_client.user_id, 3)
+    with assert_max_queries(10):
+        response = await api_client.post("/api/bank-reconciliation/auto-match")
+    assert response.status_code == 200
+    assert response.json()["message"] == "Matched 3 checks automatically"
+
+
+async def test_delete_user_budget(api_client, mongo_db, assert_max_queries):
+    invite = await api_client.post("/api/users/invite", json={
+        "username": "to-delete", "email": f"del_{uuid.uuid4().hex[:8]}@test.com", "role": "seller",
+    })
+    with assert_max_queries(11):
+        response = await api_client.delete(f"/api/users/{invite.json()['user_id']}")
+    assert response.status_code == 200
+
+
+async def test_activity_budget(api_client, mongo_db, assert_max_queries):
+    for collection in ("sales", "expenses", "bank_transactions"):
+        await mongo_db[collection].insert_many([
+            {"id": str(uuid.uuid4()), "user_id": api_client.user_id, "date": "2024-03-01", "date_day": 19_783,
+             "amount": 10.0, "type": "debit", "validated": True}
+            for _ in range(30)
+        ])
+    # The user lookup plus one aggregation returning the page and one look-ahead row
+    with assert_max_queries(2, max_documents=1 + 21):
+        response = await api_client.get("/api/activity", params={"limit": 20})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 20
+
+
+async def test_bulk_expenses_budget(api_client, mongo_db, assert_max_queries):
+    await mongo_db.users.update_one({"id": api_client.user_id}, {"$set": {"active_location_id": "main"}})
+    rows = [{"date": "2024-03-01", "amount": 10.0 + i, "category_id": "c"} for i in range(100)]
+    created = (await api_client.post("/api/expenses/bulk", json={"create": rows})).json()["results"]
+    ids = [result["id"] for result in created]
+
+    # User lookup, one find, one bulk_write, COGS categories, ledger bulk_write, data version
+    with assert_max_queries(6):
+        response = await api_client.post("/api/expenses/bulk", json={
+            "create": rows[:50],
+            "update": [{"id": expense_id, **rows[0]} for expense_id in ids[:50]],
+            "delete": ids[50:],
+        })
+    assert response.status_code == 200
+    assert response.json()["failed"] == 0
+
+
+async def test_bulk_validate_budget(api_client, mongo_db, assert_max_queries):
+    await seed_checks_and_transactions(mongo_db, api_client.user_id, 100)
+    # User lookup, one find, one bulk_write, COGS categories, ledger bulk_write, data version
+    with assert_max_queries(6):
+        response = await api_client.post("/api/bank-transactions/bulk-validate", json={
+            "filter": {"statement_id": "manual"}, "category_id": "supplies",
+        })
+    assert response.json()["validated"] == 100
@@ -0,0 +1,43 @@
+"""Trusted list responses must have the shape response_model serialization produces."""
+from typing import List
+
+import orjson
+import pytest
+from pydantic import TypeAdapter
+
+import server
+
+DOCUMENTS = {
+    "sale": (server.SALE_PROJECTION, server.Sale(
+        user_id="u", location_id="main", date="2024-09-01", amount=10.5, category_id="c", payment_method="Zelle",
+    )),
+    "expense": (server.EXPENSE_PROJECTION, server.Expense(
+        user_id="u", location_id="main", date="2024-09-01", amount=3.25, category_id="c",
+    )),
+    "bank_transaction": (server.BANK_TRANSACTION_PROJECTION, server.BankTransaction(
+        user_id="u", statement_id="s", date="2024-09-01", description="ZELLE", amount=7.0, type="credit",
+    )),
+    "check": (server.CHECK_PROJECTION, server.Check(
+        user_id="u", check_number="1001", date_issued="2024-09-01", amount=99.99, payee="Sysco",
+    )),
+    "category": (server.CATEGORY_PROJECTION, server.Category(user_id="u", name="Ventas", type="income")),
+}
+
+
+def stored(document: dict, projection: server.TrustedProjection, drop=()) -> dict:
+    """The document as a find() with the trusted projection returns it"""
+    document = {**document, "search_tokens": ["x"]}  # Stored-only fields are not projected
+    return {key: value for key, value in document.items() if key in projection.projection and key not in drop}
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+@pytest.mark.parametrize("backfilled", [True, False])
+def test_trusted_and_validated_shapes_match(name, backfilled):
+    projection, model_instance = DOCUMENTS[name]
+    drop = () if backfilled else tuple(projection.model.model_computed_fields)
+    document = stored(model_instance.model_dump(), projection, drop)
+
+    trusted = orjson.loads(projection.response([dict(document)]).body)
+    adapter = TypeAdapter(List[projection.model])  # What the route's response_model does
+    validated = adapter.dump_python(adapter.validate_python([document]), mode="json")
+    assert trusted == validated
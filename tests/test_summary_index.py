@@ -0,0 +1,78 @@
+"""Summary index: range totals, staleness by data version, the LRU and shared snapshots."""
+from datetime import date
+
+import server
+
+
+def build(data_version=0, days=30):
+    sales = [
+        {"id": str(day), "user_id": "u", "date": server.from_epoch_day(19_000 + day), "amount": 10.0,
+         "category_id": "c", "payment_method": "Zelle"}
+        for day in range(days)
+    ]
+    return server.build_summary_index(data_version, server.ledger_entries_from(sales, [], []), [{"id": "c", "name": "Ventas"}])
+
+
+def test_range_totals_and_clamping():
+    index = build()
+    assert index.summary(19_000, 19_009).total_income == 100.0
+    assert index.summary(18_000, 19_001).total_income == 20.0  # Clamped to the first day
+    assert index.summary(20_000, 20_100).total_income == 0.0
+    assert index.summary().income_by_category == {"Ventas": 300.0}
+
+
+def test_stale_entries_are_dropped():
+    cache = server.SummaryIndexCache(max_bytes=1 << 20)
+    cache.put("u", build(data_version=3))
+    assert cache.get("u", 3) is not None
+    assert cache.get("u", 4) is None  # Written since the index was built
+    assert cache.snapshot()["users"] == 0
+
+
+def test_lru_evicts_by_memory():
+    entry_bytes = build().nbytes
+    cache = server.SummaryIndexCache(max_bytes=2 * entry_bytes)
+    for user in ("a", "b"):
+        cache.put(user, build())
+    cache.get("a", 0)  # "b" is now least recently used
+    cache.put("c", build())
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.nbytes == 2 * entry_bytes
+    assert cache.stats["evictions"] == 1
+
+
+def test_period_totals_match_bucketing():
+    sales = [{"id": str(month), "user_id": "u", "date": f"2024-0{month}-15", "amount": 10.0 * month,
+              "category_id": "c", "payment_method": "Zelle"} for month in range(1, 6)]
+    bank = [{"id": "b", "user_id": "u", "date": "2024-03-01", "amount": 4.0, "type": "debit", "category_id": "c",
+             "validated": True}]
+    index = server.build_summary_index(0, server.ledger_entries_from(sales, [], bank), [])
+    periods = server.last_periods("month", 4, date(2024, 6, 1))
+    assert index.period_totals(periods) == server.bucket_period_totals(periods, sales, [], bank)
+
+
+def test_snapshots_round_trip_read_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "SUMMARY_SNAPSHOT_DIR", str(tmp_path))
+    server.write_summary_snapshot("u", build(data_version=1))
+    server.write_summary_snapshot("u", build(data_version=2, days=10))
+
+    assert server.load_summary_snapshot("u", 1) is None  # Superseded and removed
+    loaded = server.load_summary_snapshot("u", 2)
+    assert not loaded.prefix.flags.writeable
+    assert loaded.summary() == build(days=10).summary()
+    assert loaded.summary(19_002, 19_003).total_income == 20.0
+    assert server.load_summary_snapshot("other", 2) is None
+
+
+def test_far_off_date_stays_small():
+    sales = [
+        {"id": "typo", "user_id": "u", "date": "0001-01-01", "amount": 5.0, "category_id": "c", "payment_method": "Zelle"},
+        {"id": "today", "user_id": "u", "date": "2024-09-01", "amount": 10.0, "category_id": "c", "payment_method": "Zelle"},
+    ]
+    index = server.build_summary_index(0, server.ledger_entries_from(sales, [], []), [{"id": "c", "name": "Ventas"}])
+    assert index.nbytes < 1024
+    assert index.summary().total_income == 15.0
+    assert index.summary(*server.day_range("2024-01-01", "2024-12-31")).total_income == 10.0
+    assert index.summary(*server.day_range("0001-01-01", "0001-01-01")).total_income == 5.0
+    periods = server.last_periods("month", 2, date(2024, 9, 15))
+    assert index.period_totals(periods) == server.bucket_period_totals(periods, sales, [], [])